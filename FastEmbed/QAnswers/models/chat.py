@@ -1,4 +1,4 @@
-from typing import Annotated, Optional, TYPE_CHECKING
+from typing import Annotated, List, Optional, TYPE_CHECKING
 
 from sqlmodel import Field, SQLModel, Relationship
 
@@ -21,6 +21,16 @@ class ChatQuery(SQLModel):
     k: int = Field(
         default=5, description="Number of documents to select with highest ranking"
     )
+    n_probe: Optional[int] = Field(
+        default=None,
+        description="Number of IVF partitions searched, "
+        "higher values improve recall at the cost of latency",
+    )
+    document_ids: Optional[List[int]] = Field(
+        default=None,
+        description="Only search the chunks of these documents, "
+        "defaults to every document",
+    )
 
 
 class ChatRead(SQLModel):
@@ -29,4 +39,17 @@ class ChatRead(SQLModel):
     response: str
     source_document_name: str = ""
     source_line: int = 0
+    source_page: Optional[int] = None
     confidence: float = 0
+
+
+class QueryCacheStats(SQLModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    entries: int
+    bytes: int
+    max_entries: int
+    max_bytes: int
+    ttl_seconds: float
@@ -16,9 +16,12 @@ class Document(SQLModel, table=True):
 
 class DocumentChunk(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
-    document_id: int = Field(default=None, foreign_key="document.id")
+    document_id: int = Field(default=None, foreign_key="document.id", index=True)
     document: Document = Relationship(back_populates="chunks")
     line_number: Annotated[int, Field(description="Line number in the source document")]
+    page_number: Optional[int] = Field(
+        default=None, description="Page number in the source PDF document"
+    )
 
     content: Annotated[str, Field(description="Source text")]
     embedding: bytes = Field(description="Embedding of the source text")
@@ -26,6 +29,14 @@ class DocumentChunk(SQLModel, table=True):
     chats: list["Chat"] = Relationship(back_populates="source_document")
 
 
+class ChunkEmbeddingCache(SQLModel, table=True):
+    key: str = Field(
+        primary_key=True,
+        description="SHA-256 of the model ID, embedding prefix and chunk text",
+    )
+    embedding: bytes = Field(description="Serialized embedding of the chunk text")
+
+
 class DocumentCreate(SQLModel):
     name: str
 
@@ -33,3 +44,23 @@ class DocumentCreate(SQLModel):
 class DocumentRead(SQLModel):
     id: int
     name: str
+
+
+class DocumentUploadRead(DocumentRead):
+    chunk_count: int = 0
+    reused_chunk_count: int = Field(
+        default=0, description="Chunks whose embedding was reused from the cache"
+    )
+
+
+class IngestionJobRead(SQLModel):
+    id: str
+    name: str
+    status: str = Field(description="queued, running, completed or failed")
+    embedded_chunks: int = 0
+    total_chunks: Optional[int] = Field(
+        default=None,
+        description="Number of chunks, null until the whole text is extracted",
+    )
+    document: Optional[DocumentUploadRead] = None
+    error: Optional[str] = None
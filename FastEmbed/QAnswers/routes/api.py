@@ -1,6 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 from FastEmbed.QAnswers.routes.document import router as document_router
 from FastEmbed.QAnswers.routes.chat import router as chat_router
+from FastEmbed.core.readiness import get_readiness
 
 router = APIRouter(prefix="/api/v1")
 
@@ -14,3 +15,14 @@ async def get_healthcheck():
     Healthcheck endpoint.
     """
     return {"status": "ok"}
+
+
+@router.get("/readiness")
+async def get_readiness_status(response: Response):
+    """
+    Readiness endpoint, 503 until the model and the vector index are loaded.
+    """
+    status = get_readiness().status()
+    if status["status"] != "ready":
+        response.status_code = 503
+    return status
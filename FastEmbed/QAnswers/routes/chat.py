@@ -1,15 +1,23 @@
-from typing import List
-from fastapi import APIRouter, Depends
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
 from FastEmbed.core.database import get_session
-from FastEmbed.QAnswers.models.chat import Chat, ChatQuery, ChatRead
+from FastEmbed.core.readiness import require_ready
+from FastEmbed.core.streaming import json_array_response
+from FastEmbed.QAnswers.models.chat import (
+    Chat,
+    ChatQuery,
+    ChatRead,
+    QueryCacheStats,
+)
 from FastEmbed.QAnswers.services.chat import ChatService
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 chat_service = ChatService()
 
 
-@router.post("/ask", response_model=ChatRead)
+@router.post("/ask", response_model=ChatRead, dependencies=[Depends(require_ready)])
 async def query_question(
     chat_query: ChatQuery, session: Session = Depends(get_session)
 ) -> ChatRead:
@@ -21,6 +29,38 @@ async def query_question(
     return await chat_service.query_question(chat_query, session)
 
 
+@router.post(
+    "/ask_batch",
+    response_model=List[ChatRead],
+    dependencies=[Depends(require_ready)],
+)
+async def query_questions(
+    chat_queries: List[ChatQuery], session: Session = Depends(get_session)
+) -> List[ChatRead]:
+    """
+    Query many questions at once, answered in the same order.
+    The questions are embedded and ranked together, which is faster than
+    asking them one by one.
+    """
+    return await chat_service.query_questions(chat_queries, session)
+
+
+@router.get("/cache", response_model=QueryCacheStats)
+async def get_query_cache_stats() -> QueryCacheStats:
+    """
+    Get the query embedding cache hit/miss counters.
+    """
+    return chat_service.get_query_cache_stats()
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_chats() -> StreamingResponse:
+    """
+    Stream every chat as a JSON array, ordered by ID.
+    """
+    return json_array_response(chat_service.iter_all_chats())
+
+
 @router.get("/{chat_id}", response_model=ChatRead)
 async def get_chat(chat_id: int, session: Session = Depends(get_session)) -> ChatRead:
     """
@@ -30,8 +70,15 @@ async def get_chat(chat_id: int, session: Session = Depends(get_session)) -> Cha
 
 
 @router.get("/", response_model=List[ChatRead])
-async def get_all_chats(session: Session = Depends(get_session)) -> List[ChatRead]:
+async def get_all_chats(
+    after_id: Optional[int] = Query(
+        default=None, description="ID of the last chat of the previous page"
+    ),
+    limit: int = Query(default=100, ge=1, le=1000, description="Page size"),
+    session: Session = Depends(get_session),
+) -> List[ChatRead]:
     """
-    Get all chats.
+    Get a page of chats, ordered by ID.
+    Pass the ID of the last chat as after_id to get the next page.
     """
-    return await chat_service.get_all_chats(session)
+    return await chat_service.get_all_chats(session, after_id=after_id, limit=limit)
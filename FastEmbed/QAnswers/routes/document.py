@@ -1,38 +1,126 @@
-from fastapi import APIRouter, Depends, File, Query
+from fastapi import APIRouter, Depends, File, Query, Response
+from fastapi.responses import StreamingResponse
 
+from FastEmbed.config import Config
+from FastEmbed.core.chunking import ChunkStrategy
 from FastEmbed.core.database import get_session
-from FastEmbed.QAnswers.models.document import Document, DocumentRead
-from FastEmbed.QAnswers.services.document import DocumentService
+from FastEmbed.core.readiness import require_ready
+from FastEmbed.core.streaming import json_array_response
+from FastEmbed.QAnswers.models.document import (
+    Document,
+    DocumentRead,
+    DocumentUploadRead,
+    IngestionJobRead,
+)
+from FastEmbed.QAnswers.services.document import DocumentService, get_file_size
 from sqlmodel import Session
-from typing import Annotated, List
+from typing import Annotated, List, Optional, Union
 from fastapi import UploadFile
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 document_service = DocumentService()
 
 
-@router.post("/upload", response_model=DocumentRead)
+@router.post(
+    "/upload",
+    response_model=Union[DocumentUploadRead, IngestionJobRead],
+    responses={202: {"model": IngestionJobRead}},
+    dependencies=[Depends(require_ready)],
+)
 def create_document(
     file: Annotated[UploadFile, File(description="The document to upload, TXT or PDF")],
+    response: Response,
     min_word_count: int = Query(
         default=30,
         description="Line minimum word count, "
         "smaller lines are combined into a single line",
     ),
+    chunk_strategy: Optional[ChunkStrategy] = Query(
+        default=None,
+        description="lines, sentences or window, defaults to CHUNK_STRATEGY",
+    ),
+    background: Optional[bool] = Query(
+        default=None,
+        description="Queue the upload and return an ingestion job, "
+        "defaults to files larger than SYNC_UPLOAD_MAX_BYTES",
+    ),
     session: Session = Depends(get_session),
-) -> Document:
+) -> Union[DocumentUploadRead, IngestionJobRead]:
     """
     Upload a document to the system.
+    Large files are queued, the ingestion job is returned with a 202 status.
+    Lines already embedded by a previous upload reuse the cached embedding.
+    """
+    if background is None:
+        background = get_file_size(file) > Config.SYNC_UPLOAD_MAX_BYTES
+
+    if background:
+        response.status_code = 202
+        return document_service.enqueue_document_upload(
+            file, min_length=min_word_count, chunk_strategy=chunk_strategy
+        )
+
+    return document_service.upload_document(
+        file, session, min_length=min_word_count, chunk_strategy=chunk_strategy
+    )
+
+
+@router.post(
+    "/upload/async",
+    response_model=IngestionJobRead,
+    status_code=202,
+    dependencies=[Depends(require_ready)],
+)
+def enqueue_document(
+    file: Annotated[UploadFile, File(description="The document to upload, TXT or PDF")],
+    min_word_count: int = Query(
+        default=30,
+        description="Line minimum word count, "
+        "smaller lines are combined into a single line",
+    ),
+    chunk_strategy: Optional[ChunkStrategy] = Query(
+        default=None,
+        description="lines, sentences or window, defaults to CHUNK_STRATEGY",
+    ),
+) -> IngestionJobRead:
+    """
+    Queue a document upload and return immediately.
+    Poll the returned job to follow the embedding progress.
+    """
+    return document_service.enqueue_document_upload(
+        file, min_length=min_word_count, chunk_strategy=chunk_strategy
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobRead)
+async def get_upload_job(job_id: str) -> IngestionJobRead:
+    """
+    Get the progress of a queued document upload.
     """
-    return document_service.upload_document(file, session, min_length=min_word_count)
+    return document_service.get_upload_job(job_id)
 
 
 @router.get("/", response_model=List[DocumentRead])
-async def get_documents(session: Session = Depends(get_session)) -> List[Document]:
+async def get_documents(
+    after_id: Optional[int] = Query(
+        default=None, description="ID of the last document of the previous page"
+    ),
+    limit: int = Query(default=100, ge=1, le=1000, description="Page size"),
+    session: Session = Depends(get_session),
+) -> List[DocumentRead]:
+    """
+    Get a page of documents, ordered by ID.
+    Pass the ID of the last document as after_id to get the next page.
+    """
+    return await document_service.get_documents(session, after_id=after_id, limit=limit)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_documents() -> StreamingResponse:
     """
-    Get all documents.
+    Stream every document as a JSON array, ordered by ID.
     """
-    return await document_service.get_documents(session)
+    return json_array_response(document_service.iter_all_documents())
 
 
 @router.get("/{document_id}", response_model=DocumentRead)
@@ -45,7 +133,7 @@ async def get_document(
     return await document_service.get_document(document_id, session)
 
 
-@router.delete("/all")
+@router.delete("/all", dependencies=[Depends(require_ready)])
 async def delete_all_documents(session: Session = Depends(get_session)):
     """
     Delete all documents.
@@ -55,7 +143,11 @@ async def delete_all_documents(session: Session = Depends(get_session)):
     return {"message": "All documents deleted"}
 
 
-@router.delete("/{document_id}", response_model=DocumentRead)
+@router.delete(
+    "/{document_id}",
+    response_model=DocumentRead,
+    dependencies=[Depends(require_ready)],
+)
 async def delete_document(
     document_id: int, session: Session = Depends(get_session)
 ) -> Document:
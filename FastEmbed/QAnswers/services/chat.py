@@ -1,12 +1,34 @@
-from typing import List
+import asyncio
+from contextvars import copy_context
+from typing import Iterator, List, Optional, Tuple
 import numpy as np
 from sqlmodel import Session, select
 from fastapi import HTTPException
-from FastEmbed.QAnswers.models.document import DocumentChunk
-from FastEmbed.QAnswers.models.chat import Chat, ChatQuery, ChatRead
+from FastEmbed.QAnswers.models.document import Document, DocumentChunk
+from FastEmbed.QAnswers.models.chat import (
+    Chat,
+    ChatQuery,
+    ChatRead,
+    QueryCacheStats,
+)
+from FastEmbed.config import Config
+from FastEmbed.core.batching import get_query_batcher
+from FastEmbed.core.cache import (
+    get_query_cache,
+    normalize_query_text,
+    query_cache_key,
+)
+from FastEmbed.core.database import get_database_engine
 from FastEmbed.core.embedding import get_embedding_engine
+from FastEmbed.core.metrics import get_metrics
+from FastEmbed.core.vector_index import get_vector_index
 
-embedding_engine = get_embedding_engine()
+metrics = get_metrics()
+query_cache = get_query_cache()
+vector_index = get_vector_index()
+
+# Number of chats read per query while exporting the history
+EXPORT_BATCH_SIZE = 1000
 
 
 class ChatService:
@@ -21,51 +43,44 @@ class ChatService:
             ChatRead: The query result.
         """
 
-        chunks_with_embeddings = session.exec(
-            select(DocumentChunk).where(DocumentChunk.embedding.is_not(None))
-        ).all()
-
-        if len(chunks_with_embeddings) == 0:
+        if len(vector_index) == 0:
             raise HTTPException(
                 status_code=404, detail="No documents found in the system"
             )
 
-        # Embed the query
-        query_embedding = embedding_engine.embed_query_text(query.query)
-        embeddings = [
-            embedding_engine.deserialize_embedding(chunk.embedding)
-            for chunk in chunks_with_embeddings
-        ]
-
-        # Rank and select best chunks
-        documents_embeddings = np.stack(embeddings)
-
-        similarity_scores, ranking_indices = (
-            embedding_engine.rank_documents_by_similarity(
-                query_embedding, documents_embeddings, k=query.k
+        # Embed the query, or reuse the embedding of an identical query,
+        # and rank it against the in-memory index
+        with metrics.timer("query_embedding"):
+            query_embedding = await self._embed_query(query.query)
+        with metrics.timer("search"):
+            similarity_scores, chunk_ids = vector_index.search(
+                query_embedding,
+                k=query.k,
+                n_probe=query.n_probe,
+                document_ids=query.document_ids,
+            )
+        if len(chunk_ids) == 0:
+            raise HTTPException(
+                status_code=404, detail="No chunks found in the selected documents"
             )
-        )
-        selected_chunks = [chunks_with_embeddings[i] for i in ranking_indices]
 
-        # Weighted random selection of chunk based on the similarity scores
-        weights = [
-            min(chunk.content.count(" "), 10) * (1 + similarity_scores[i])
-            for i, chunk in enumerate(selected_chunks)
+        # Fetch only the selected chunks
+        with metrics.timer("fetch_chunks"):
+            chunks_by_id = {
+                chunk.id: chunk
+                for chunk in session.exec(
+                    select(DocumentChunk).where(
+                        DocumentChunk.id.in_(chunk_ids.tolist())
+                    )
+                ).all()
+            }
+        ranked_chunks = [
+            (chunks_by_id[chunk_id], score)
+            for chunk_id, score in zip(chunk_ids.tolist(), similarity_scores)
+            if chunk_id in chunks_by_id
         ]
 
-        selected_chunk = None
-        total = sum(weights)
-        random_value = np.random.uniform(0, total)
-        for i, (weight, chunk) in enumerate(zip(weights, selected_chunks)):
-            random_value -= weight
-            if random_value <= 0:
-                selected_chunk = chunk
-                confidence = similarity_scores[i]
-                break
-
-        if not selected_chunk:
-            # Should never happen
-            raise HTTPException(status_code=500, detail="No source document found")
+        selected_chunk, confidence = _select_chunk(ranked_chunks)
 
         # Save and return
         chat = Chat(
@@ -74,9 +89,10 @@ class ChatService:
             source_line=selected_chunk.line_number,
             confidence=confidence,
         )
-        session.add(chat)
-        session.commit()
-        session.refresh(chat)
+        with metrics.timer("chat_commit"):
+            session.add(chat)
+            session.commit()
+            session.refresh(chat)
 
         if selected_chunk.document:
             source_document_name = selected_chunk.document.name or "none"
@@ -89,9 +105,204 @@ class ChatService:
             response=selected_chunk.content,
             source_document_name=source_document_name,
             source_line=selected_chunk.line_number,
+            source_page=selected_chunk.page_number,
             confidence=confidence,
         )
 
+    async def query_questions(
+        self, queries: List[ChatQuery], session: Session
+    ) -> List[ChatRead]:
+        """
+        Query many questions at once.
+
+        The queries missing from the query embedding cache are embedded with
+        a single inference call, every query is ranked with one matrix
+        product against the index, the chunks of all the queries are read
+        with one query and the chats are saved with one commit.
+
+        Args:
+            queries (List[ChatQuery]): The questions to query.
+            session (Session): Database session.
+
+        Returns:
+            List[ChatRead]: The query results, in the order of the queries.
+        """
+        if len(queries) > Config.CHAT_BATCH_MAX_QUERIES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {Config.CHAT_BATCH_MAX_QUERIES} queries per batch",
+            )
+
+        if len(vector_index) == 0:
+            raise HTTPException(
+                status_code=404, detail="No documents found in the system"
+            )
+
+        if not queries:
+            return []
+
+        with metrics.timer("query_embedding"):
+            query_embeddings = await self._embed_queries(
+                [query.query for query in queries]
+            )
+
+        # Queries searching the same documents are ranked together, larger
+        # k and n_probe values only add candidates, trimmed per query
+        groups = {}
+        for position, query in enumerate(queries):
+            document_ids = (
+                None if query.document_ids is None else tuple(query.document_ids)
+            )
+            groups.setdefault(document_ids, []).append(position)
+
+        results = [None] * len(queries)
+        with metrics.timer("search"):
+            for document_ids, positions in groups.items():
+                n_probes = [
+                    queries[position].n_probe
+                    for position in positions
+                    if queries[position].n_probe
+                ]
+                group_results = vector_index.search_batch(
+                    query_embeddings[positions],
+                    k=max(queries[position].k for position in positions),
+                    n_probe=max(n_probes) if n_probes else None,
+                    document_ids=document_ids,
+                )
+                for position, result in zip(positions, group_results):
+                    results[position] = result
+
+        if any(len(chunk_ids) == 0 for _, chunk_ids in results):
+            raise HTTPException(
+                status_code=404, detail="No chunks found in the selected documents"
+            )
+
+        # Fetch the chunks of every query, with their document names
+        all_chunk_ids = {
+            chunk_id
+            for query, (_, chunk_ids) in zip(queries, results)
+            for chunk_id in chunk_ids[: query.k].tolist()
+        }
+        with metrics.timer("fetch_chunks"):
+            chunks_by_id = {
+                chunk.id: (chunk, document_name)
+                for chunk, document_name in session.exec(
+                    select(DocumentChunk, Document.name)
+                    .outerjoin(Document, DocumentChunk.document_id == Document.id)
+                    .where(DocumentChunk.id.in_(all_chunk_ids))
+                ).all()
+            }
+
+        selections = []
+        for query, (similarity_scores, chunk_ids) in zip(queries, results):
+            ranked_chunks = [
+                (chunks_by_id[chunk_id][0], score)
+                for chunk_id, score in zip(
+                    chunk_ids[: query.k].tolist(), similarity_scores[: query.k]
+                )
+                if chunk_id in chunks_by_id
+            ]
+            selections.append(_select_chunk(ranked_chunks))
+
+        # Save every chat in one transaction, IDs are assigned by the flush
+        chats = [
+            Chat(
+                query=query.query,
+                source_document_id=chunk.id,
+                confidence=confidence,
+            )
+            for query, (chunk, confidence) in zip(queries, selections)
+        ]
+        with metrics.timer("chat_commit"):
+            session.add_all(chats)
+            session.flush()
+            chat_reads = [
+                ChatRead(
+                    id=chat.id,
+                    query=query.query,
+                    response=chunk.content,
+                    source_document_name=chunks_by_id[chunk.id][1] or "none",
+                    source_line=chunk.line_number,
+                    source_page=chunk.page_number,
+                    confidence=confidence,
+                )
+                for chat, query, (chunk, confidence) in zip(chats, queries, selections)
+            ]
+            session.commit()
+
+        return chat_reads
+
+    async def _embed_queries(self, query_texts: List[str]) -> np.ndarray:
+        """
+        Embed query texts, using the query embedding cache.
+
+        The distinct texts missing from the cache are embedded with a single
+        inference call, run in a worker thread.
+
+        Args:
+            query_texts (List[str]): The query texts.
+
+        Returns:
+            np.ndarray: The query embeddings, one row per query text.
+        """
+        cache_keys = [query_cache_key(query_text) for query_text in query_texts]
+        embeddings_by_key = {}
+        for cache_key in cache_keys:
+            query_embedding = query_cache.get(cache_key)
+            if query_embedding is not None:
+                embeddings_by_key[cache_key] = query_embedding
+
+        missing_texts = {
+            cache_key: normalize_query_text(query_text)
+            for cache_key, query_text in zip(cache_keys, query_texts)
+            if cache_key not in embeddings_by_key
+        }
+        if missing_texts:
+            # Run in a copy of the context, for the stage durations of the request
+            new_embeddings = await asyncio.get_running_loop().run_in_executor(
+                None,
+                copy_context().run,
+                get_embedding_engine().embed_queries,
+                list(missing_texts.values()),
+            )
+            for cache_key, query_embedding in zip(missing_texts, new_embeddings):
+                # Cached as a (1, dim) row, as by the query batcher
+                embeddings_by_key[cache_key] = query_embedding[None]
+                query_cache.put(cache_key, embeddings_by_key[cache_key])
+
+        return np.concatenate(
+            [embeddings_by_key[cache_key] for cache_key in cache_keys]
+        )
+
+    async def _embed_query(self, query_text: str) -> np.ndarray:
+        """
+        Embed a query text, using the query embedding cache.
+
+        Args:
+            query_text (str): The query text.
+
+        Returns:
+            np.ndarray: The query embedding.
+        """
+        cache_key = query_cache_key(query_text)
+        query_embedding = query_cache.get(cache_key)
+        if query_embedding is None:
+            query_embedding = await get_query_batcher().embed_query_text(
+                normalize_query_text(query_text)
+            )
+            query_cache.put(cache_key, query_embedding)
+
+        return query_embedding
+
+    def get_query_cache_stats(self) -> QueryCacheStats:
+        """
+        Get the query embedding cache counters.
+
+        Returns:
+            QueryCacheStats: The cache counters.
+        """
+        return QueryCacheStats(**query_cache.stats())
+
     async def get_chat(self, chat_id: int, session: Session) -> ChatRead:
         """
         Get a chat by ID.
@@ -117,28 +328,120 @@ class ChatService:
             response=chat.source_document.content,
             source_document_name=chat.source_document.document.name,
             source_line=chat.source_document.line_number,
+            source_page=chat.source_document.page_number,
             confidence=chat.confidence,
         )
 
-    async def get_all_chats(self, session: Session) -> List[ChatRead]:
+    async def get_all_chats(
+        self, session: Session, after_id: Optional[int] = None, limit: int = 100
+    ) -> List[ChatRead]:
         """
-        Get all chats from the database.
+        Get a page of chats, ordered by ID.
+
+        The chats, their source chunks and documents are read with a single
+        joined query, and the page starts after a given chat ID, so every
+        page costs the same whatever its position in the history.
 
         Args:
             session (Session): The database session.
+            after_id (Optional[int], optional): The ID of the last chat of
+                the previous page. Defaults to the first page.
+            limit (int, optional): The maximum number of chats. Defaults to 100.
 
         Returns:
-            List[ChatRead]: A list of all chats.
-        """
-        chats = session.exec(select(Chat)).all()
-        return [
-            ChatRead(
-                id=chat.id,
-                query=chat.query,
-                response=chat.source_document.content,
-                source_document_name=chat.source_document.document.name,
-                source_line=chat.source_document.line_number,
-                confidence=chat.confidence,
+            List[ChatRead]: The chats of the page.
+        """
+        return self._read_chat_page(session, after_id, limit)
+
+    def iter_all_chats(self, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[ChatRead]:
+        """
+        Iterate over every chat, reading them page by page.
+
+        The iterator uses its own database session, so it can outlive the
+        request, e.g. while a response is streamed.
+
+        Args:
+            batch_size (int, optional): The number of chats read per query.
+
+        Yields:
+            ChatRead: The chats, ordered by ID.
+        """
+        with Session(get_database_engine()) as session:
+            after_id = None
+            while page := self._read_chat_page(session, after_id, batch_size):
+                yield from page
+                after_id = page[-1].id
+
+    def _read_chat_page(
+        self, session: Session, after_id: Optional[int], limit: int
+    ) -> List[ChatRead]:
+        statement = (
+            select(
+                Chat.id,
+                Chat.query,
+                DocumentChunk.content,
+                Document.name,
+                DocumentChunk.line_number,
+                DocumentChunk.page_number,
+                Chat.confidence,
             )
-            for chat in chats
-        ]
+            .outerjoin(DocumentChunk, Chat.source_document_id == DocumentChunk.id)
+            .outerjoin(Document, DocumentChunk.document_id == Document.id)
+            .order_by(Chat.id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            statement = statement.where(Chat.id > after_id)
+
+        return [_chat_read(row) for row in session.exec(statement).all()]
+
+
+def _select_chunk(
+    ranked_chunks: List[Tuple[DocumentChunk, float]],
+) -> Tuple[DocumentChunk, float]:
+    """
+    Pick one of the ranked chunks at random, weighted by similarity.
+
+    Args:
+        ranked_chunks (List[Tuple[DocumentChunk, float]]): The best chunks
+            and their similarity scores.
+
+    Returns:
+        Tuple[DocumentChunk, float]: The selected chunk and its score.
+
+    Raises:
+        HTTPException: If none of the ranked chunks is left in the database,
+            e.g. when the index is stale.
+    """
+    if not ranked_chunks:
+        raise HTTPException(status_code=404, detail="No matching chunks found")
+
+    # Weighted random selection of chunk based on the similarity scores
+    weights = [
+        min(chunk.content.count(" "), 10) * (1 + score)
+        for chunk, score in ranked_chunks
+    ]
+
+    total = sum(weights)
+    random_value = np.random.uniform(0, total)
+    for weight, (chunk, score) in zip(weights, ranked_chunks):
+        random_value -= weight
+        if random_value <= 0:
+            return chunk, float(score)
+
+    # Should never happen
+    raise HTTPException(status_code=500, detail="No source document found")
+
+
+def _chat_read(row: Tuple) -> ChatRead:
+    """Build a ChatRead from a row of the joined chat listing query."""
+    chat_id, query, response, document_name, line, page, confidence = row
+    return ChatRead(
+        id=chat_id,
+        query=query,
+        response=response or "",
+        source_document_name=document_name or "none",
+        source_line=line or 0,
+        source_page=page,
+        confidence=confidence or 0,
+    )
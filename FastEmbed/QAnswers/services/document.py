@@ -1,84 +1,383 @@
-from typing import List
+import os
+import queue
+import shutil
+import tempfile
+from collections import Counter
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+import numpy as np
 from fastapi import UploadFile, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.dml import Insert
 from sqlmodel import Session, select, delete
 
-import pdfplumber
-
-from FastEmbed.QAnswers.models.document import Document, DocumentChunk
+from FastEmbed.QAnswers.models.document import (
+    ChunkEmbeddingCache,
+    Document,
+    DocumentChunk,
+    DocumentRead,
+    DocumentUploadRead,
+    IngestionJobRead,
+)
+from FastEmbed.config import Config
+from FastEmbed.core.cache import chunk_cache_key
+from FastEmbed.core.chunking import Chunker, ChunkStrategy
+from FastEmbed.core.database import get_database_engine
 from FastEmbed.core.embedding import get_embedding_engine
+from FastEmbed.core.embedding_store import get_embedding_store
+from FastEmbed.core.extraction import extract_pdf_file_pages
+from FastEmbed.core.jobs import Job, ProgressCallback, get_job_queue
+from FastEmbed.core.metrics import get_metrics
+from FastEmbed.core.precision import quantize_embeddings
+from FastEmbed.core.vector_index import get_vector_index
+
+metrics = get_metrics()
+vector_index = get_vector_index()
+
+# Maximum number of bound parameters per cache lookup query
+CACHE_LOOKUP_BATCH_SIZE = 500
+
+# Number of lines embedded and added to the document at once
+INGEST_BATCH_SIZE = 256
+
+# Number of documents read per query while exporting them
+EXPORT_BATCH_SIZE = 1000
+
+SUPPORTED_FILE_EXTENSIONS = (".txt", ".pdf")
 
-embedding_engine = get_embedding_engine()
+# Dialects whose insert statements can skip the conflicting rows
+CONFLICT_SKIPPING_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
 
 
 class DocumentService:
     def upload_document(
-        self, file: UploadFile, session: Session, min_length: int = 30
-    ) -> Document:
+        self,
+        file: UploadFile,
+        session: Session,
+        min_length: int = 30,
+        chunk_strategy: Optional[ChunkStrategy] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> DocumentUploadRead:
         """
         Upload a document to the system.
 
+        Lines whose embedding is already in the chunk embedding cache are
+        not embedded again.
+
         Args:
             file (UploadFile): The document to upload.
             session (Session): The database session.
-            min_length (int, optional): The minimum word count of a line,
-                smaller lines are combined into a single line. Defaults to 30.
+            min_length (int, optional): The minimum word count of a chunk,
+                smaller lines or sentences are combined. Defaults to 30.
+            chunk_strategy (Optional[ChunkStrategy], optional): "lines",
+                "sentences" or "window". Defaults to CHUNK_STRATEGY.
+            progress_callback (Optional[ProgressCallback], optional): Called
+                with the number of embedded chunks out of the total, None
+                until the whole text is extracted.
 
         Returns:
-            Document: The uploaded document.
+            DocumentUploadRead: The uploaded document.
         """
+        embedding_engine = get_embedding_engine()
+        pages = self.extract_pages_from_file(file)
+        chunker = Chunker(
+            embedding_engine.tokenizer,
+            max_tokens=embedding_engine.max_document_tokens(),
+            strategy=chunk_strategy or Config.CHUNK_STRATEGY,
+            min_word_count=min_length,
+            overlap_tokens=Config.CHUNK_OVERLAP_TOKENS,
+        )
+
+        # Insert the document row first, its ID is needed by the chunk rows
         document_db = Document(name=file.filename or "none")
+        session.add(document_db)
+        session.flush()
+        document_read = DocumentRead(id=document_db.id, name=document_db.name)
+
+        # Embed the chunks in batches as the pages are extracted, and insert
+        # them in bulk batches, all in the transaction of the document
+        batch_embeddings = []
+        chunk_ids: List[int] = []
+        pending_rows: List[dict] = []
+        chunk_count = 0
+        reused_count = 0
+        for chunks in _batched(chunker.chunk_pages(pages), INGEST_BATCH_SIZE):
+            with metrics.timer("embed_chunks"):
+                embeddings, serialized_embeddings, batch_reused_count = (
+                    self._embed_lines(
+                        [chunk.text for chunk in chunks],
+                        session,
+                        progress_callback,
+                        progress_offset=chunk_count,
+                    )
+                )
+
+            pending_rows += [
+                {
+                    "document_id": document_read.id,
+                    "line_number": chunk.line_number,
+                    "page_number": chunk.page_number,
+                    "content": chunk.text,
+                    "embedding": serialized_embedding,
+                }
+                for chunk, serialized_embedding in zip(chunks, serialized_embeddings)
+            ]
+            if len(pending_rows) >= Config.CHUNK_INSERT_BATCH_SIZE:
+                chunk_ids += self._insert_chunks(pending_rows, session)
+                pending_rows = []
+
+            batch_embeddings.append(embeddings)
+            chunk_count += len(chunks)
+            reused_count += batch_reused_count
+
+        # The pages are extracted as they are chunked, the total is known now
+        if progress_callback:
+            progress_callback(chunk_count, chunk_count)
+
+        with metrics.timer("document_commit"):
+            chunk_ids += self._insert_chunks(pending_rows, session)
+            session.commit()
+
+        # Make the new chunks searchable, IDs are in insertion order
+        if chunk_count:
+            embeddings = np.concatenate(batch_embeddings)
+            with metrics.timer("index_add"):
+                vector_index.add(
+                    chunk_ids, embeddings, [document_read.id] * len(chunk_ids)
+                )
 
-        content = self.extract_text_from_file(file)
-
-        lines = content.splitlines(keepends=False)
-
-        # Preprocess the lines by combining short lines into a single line
-        preprocessed_lines = []
-        line_number = 1
-        line_buffer = ""
-        for line in lines:
-            stripped_line = line.strip()
-            if (
-                len(stripped_line.split()) < min_length
-                and len(line_buffer.split()) < min_length
-            ):
-                line_buffer += stripped_line + " "
-            else:
-                if line_buffer:
-                    preprocessed_lines.append((line_buffer.strip(), line_number))
-                    line_buffer = ""
-                else:
-                    preprocessed_lines.append((stripped_line, line_number))
-
-            line_number += 1
-
-        if line_buffer:
-            preprocessed_lines.append((line_buffer.strip(), line_number))
-
-        # Embed and store the lines in the database
-        for line_text, line_number in preprocessed_lines:
-            if not line_text.strip():
-                continue
-
-            document_db.chunks.append(
-                DocumentChunk(
-                    line_number=line_number,
-                    content=line_text,
-                    embedding=embedding_engine.serialize_embedding(
-                        embedding_engine.embed_document_text(line_text)
-                    ),
+            embedding_store = get_embedding_store()
+            if embedding_store is not None:
+                embedding_store.append(
+                    np.array(chunk_ids, dtype=np.int64),
+                    *quantize_embeddings(embeddings, embedding_store.precision),
                 )
+
+        return DocumentUploadRead(
+            **document_read.model_dump(),
+            chunk_count=chunk_count,
+            reused_chunk_count=reused_count,
+        )
+
+    def _insert_chunks(self, rows: List[dict], session: Session) -> List[int]:
+        """
+        Insert chunk rows with bulk Core statements, bypassing the ORM.
+
+        Args:
+            rows (List[dict]): The chunk column values.
+            session (Session): The database session.
+
+        Returns:
+            List[int]: The IDs of the inserted chunks, in the order of rows.
+        """
+        chunk_ids = []
+        batch_size = max(Config.CHUNK_INSERT_BATCH_SIZE, 1)
+        statement = insert(DocumentChunk).returning(
+            DocumentChunk.id, sort_by_parameter_order=True
+        )
+        for start in range(0, len(rows), batch_size):
+            chunk_ids += session.exec(
+                statement, params=rows[start : start + batch_size]
+            ).scalars()
+        return chunk_ids
+
+    def enqueue_document_upload(
+        self,
+        file: UploadFile,
+        min_length: int = 30,
+        chunk_strategy: Optional[ChunkStrategy] = None,
+    ) -> IngestionJobRead:
+        """
+        Queue a document upload, processed by the ingestion workers.
+
+        The file is copied to a temporary file, as the uploaded file is
+        closed once the request is answered.
+
+        Args:
+            file (UploadFile): The document to upload.
+            min_length (int, optional): The minimum word count of a chunk,
+                smaller lines or sentences are combined. Defaults to 30.
+            chunk_strategy (Optional[ChunkStrategy], optional): "lines",
+                "sentences" or "window". Defaults to CHUNK_STRATEGY.
+
+        Returns:
+            IngestionJobRead: The queued ingestion job.
+        """
+        if not file or not file.filename:
+            raise HTTPException(status_code=400, detail="No file name provided")
+
+        file_name = file.filename
+        extension = os.path.splitext(file_name)[1]
+        if extension not in SUPPORTED_FILE_EXTENSIONS:
+            raise HTTPException(status_code=400, detail="File format not supported")
+
+        with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as copy:
+            shutil.copyfileobj(file.file, copy)
+
+        def ingest(progress_callback: ProgressCallback) -> DocumentUploadRead:
+            try:
+                with open(copy.name, "rb") as copy_file, Session(
+                    get_database_engine()
+                ) as session:
+                    return self.upload_document(
+                        UploadFile(copy_file, filename=file_name),
+                        session,
+                        min_length=min_length,
+                        chunk_strategy=chunk_strategy,
+                        progress_callback=progress_callback,
+                    )
+            finally:
+                os.remove(copy.name)
+
+        try:
+            job = get_job_queue().submit(file_name, ingest)
+        except queue.Full:
+            os.remove(copy.name)
+            raise HTTPException(
+                status_code=503, detail="Ingestion queue is full, retry later"
             )
 
-        session.add(document_db)
-        session.commit()
-        session.refresh(document_db)
+        return self._job_read(job)
 
-        return document_db
+    def get_upload_job(self, job_id: str) -> IngestionJobRead:
+        """
+        Get the progress of a queued document upload.
 
-    def extract_text_from_file(self, file: UploadFile) -> str:
+        Args:
+            job_id (str): The ID of the ingestion job.
+
+        Returns:
+            IngestionJobRead: The ingestion job.
         """
-        Extracts the text from a file.
+        job = get_job_queue().get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        return self._job_read(job)
+
+    def _job_read(self, job: Job) -> IngestionJobRead:
+        return IngestionJobRead(
+            id=job.id,
+            name=job.name,
+            status=job.status,
+            embedded_chunks=job.completed,
+            total_chunks=job.total,
+            document=job.result,
+            error=job.error,
+        )
+
+    def _embed_lines(
+        self,
+        texts: List[str],
+        session: Session,
+        progress_callback: Optional[ProgressCallback] = None,
+        progress_offset: int = 0,
+    ) -> Tuple[np.ndarray, List[bytes], int]:
+        """
+        Embed document lines, reusing the cached embeddings of identical lines.
+
+        Only the lines missing from the chunk embedding cache are embedded,
+        once per distinct text, and their embeddings are added to the cache
+        in the current transaction.
+
+        Args:
+            texts (List[str]): The line texts.
+            session (Session): The database session.
+            progress_callback (Optional[ProgressCallback], optional): Called
+                with the number of embedded lines, the total is not known.
+            progress_offset (int, optional): The number of lines embedded
+                before these ones, added to the reported progress.
+
+        Returns:
+            Tuple[np.ndarray, List[bytes], int]: The embeddings, their
+                serialized form and the number of lines that were not embedded.
+        """
+        embedding_engine = get_embedding_engine()
+        prefix = embedding_engine.document_prefix()
+        keys = [
+            chunk_cache_key(
+                embedding_engine.model_id,
+                prefix,
+                text,
+                quantization=embedding_engine.quantization,
+                precision=embedding_engine.embedding_precision,
+            )
+            for text in texts
+        ]
+
+        # Look up the cached embeddings
+        unique_keys = list(dict.fromkeys(keys))
+        serialized_by_key = {}
+        for start in range(0, len(unique_keys), CACHE_LOOKUP_BATCH_SIZE):
+            serialized_by_key.update(
+                session.exec(
+                    select(
+                        ChunkEmbeddingCache.key, ChunkEmbeddingCache.embedding
+                    ).where(
+                        ChunkEmbeddingCache.key.in_(
+                            unique_keys[start : start + CACHE_LOOKUP_BATCH_SIZE]
+                        )
+                    )
+                ).all()
+            )
+
+        # Embed the distinct missing texts and cache them
+        missing_texts = {
+            key: text for key, text in zip(keys, texts) if key not in serialized_by_key
+        }
+        if missing_texts:
+            key_counts = Counter(keys)
+            embedded_count = len(keys) - sum(key_counts[key] for key in missing_texts)
+            if progress_callback:
+                progress_callback(progress_offset + embedded_count, None)
+
+            def report_progress(completed: int, total: int) -> None:
+                progress_callback(progress_offset + embedded_count + completed, None)
+
+            # One call for the whole batch so similar lengths are bucketed together
+            new_embeddings = embedding_engine.embed_documents(
+                list(missing_texts.values()),
+                progress_callback=report_progress if progress_callback else None,
+            )
+            for key, embedding in zip(missing_texts, new_embeddings):
+                serialized_by_key[key] = embedding_engine.serialize_embedding(
+                    embedding
+                )
+
+            session.exec(
+                cache_insert_statement(session.get_bind().dialect.name),
+                params=[
+                    {"key": key, "embedding": serialized_by_key[key]}
+                    for key in missing_texts
+                ],
+            )
+
+        if progress_callback:
+            progress_callback(progress_offset + len(keys), None)
+
+        serialized_embeddings = [serialized_by_key[key] for key in keys]
+        if not serialized_embeddings:
+            return np.empty((0, 0), dtype=np.float32), [], 0
+
+        with metrics.timer("deserialize"):
+            embeddings = np.stack(
+                [
+                    embedding_engine.deserialize_embedding(serialized_embedding)
+                    for serialized_embedding in serialized_embeddings
+                ]
+            )
+
+        return embeddings, serialized_embeddings, len(keys) - len(missing_texts)
+
+    def extract_pages_from_file(
+        self, file: UploadFile
+    ) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        Extracts the text from a file, one page at a time.
 
         Supported file types: .txt and .pdf
 
@@ -86,7 +385,8 @@ class DocumentService:
             file (UploadFile): The file to extract the text from.
 
         Returns:
-            str: The extracted text.
+            Iterator[Tuple[Optional[int], str]]: The page numbers and texts,
+                text files are a single page without number.
         """
 
         if not file:
@@ -96,35 +396,77 @@ class DocumentService:
             raise HTTPException(status_code=400, detail="No file name provided")
 
         if file.filename.endswith(".txt"):
-            text = file.file.read().decode("utf-8")
+            return iter([(None, file.file.read().decode("utf-8"))])
 
         elif file.filename.endswith(".pdf"):
-            with pdfplumber.open(file.file) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    text += page.extract_text()
+            return extract_pdf_file_pages(file.file)
 
         else:
             raise HTTPException(status_code=400, detail="File format not supported")
 
-        return text
-
-    async def get_documents(self, session: Session) -> List[Document]:
+    async def get_documents(
+        self, session: Session, after_id: Optional[int] = None, limit: int = 100
+    ) -> List[DocumentRead]:
         """
-        Get all documents from the system.
+        Get a page of documents, ordered by ID.
+
+        Only the document columns are read, the page starts after a given
+        document ID, so every page costs the same whatever its position.
 
         Args:
             session (Session): The database session.
+            after_id (Optional[int], optional): The ID of the last document
+                of the previous page. Defaults to the first page.
+            limit (int, optional): The maximum number of documents.
+                Defaults to 100.
 
         Returns:
-            List[Document]: The list of documents.
+            List[DocumentRead]: The documents of the page.
+
+        Raises:
+            HTTPException: If there are no documents at all.
         """
-        documents = session.scalars(select(Document)).all()
-        if not documents:
+        documents = self._read_document_page(session, after_id, limit)
+        if not documents and after_id is None:
             raise HTTPException(status_code=404, detail="No documents found")
 
         return documents
 
+    def iter_all_documents(
+        self, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[DocumentRead]:
+        """
+        Iterate over every document, reading them page by page.
+
+        The iterator uses its own database session, so it can outlive the
+        request, e.g. while a response is streamed.
+
+        Args:
+            batch_size (int, optional): The number of documents read per query.
+
+        Yields:
+            DocumentRead: The documents, ordered by ID.
+        """
+        with Session(get_database_engine()) as session:
+            after_id = None
+            while page := self._read_document_page(session, after_id, batch_size):
+                yield from page
+                after_id = page[-1].id
+
+    def _read_document_page(
+        self, session: Session, after_id: Optional[int], limit: int
+    ) -> List[DocumentRead]:
+        statement = (
+            select(Document.id, Document.name).order_by(Document.id).limit(limit)
+        )
+        if after_id is not None:
+            statement = statement.where(Document.id > after_id)
+
+        return [
+            DocumentRead(id=document_id, name=name)
+            for document_id, name in session.exec(statement).all()
+        ]
+
     async def get_document(self, document_id: int, session: Session) -> Document:
         """
         Get a document from the system.
@@ -157,9 +499,20 @@ class DocumentService:
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
 
+        chunk_ids = session.exec(
+            select(DocumentChunk.id).where(DocumentChunk.document_id == document_id)
+        ).all()
+
         session.delete(document)
         session.commit()
 
+        vector_index.remove(chunk_ids)
+
+        # SQLite reuses the chunk IDs, the stored rows must not outlive them
+        embedding_store = get_embedding_store()
+        if embedding_store is not None:
+            embedding_store.remove(np.array(chunk_ids, dtype=np.int64))
+
         return document
 
     async def delete_all_documents(self, session: Session) -> None:
@@ -175,3 +528,46 @@ class DocumentService:
         session.exec(delete(DocumentChunk))
         session.exec(delete(Document))
         session.commit()
+
+        vector_index.clear()
+
+        embedding_store = get_embedding_store()
+        if embedding_store is not None:
+            embedding_store.clear()
+
+
+def get_file_size(file: UploadFile) -> int:
+    """Get the size in bytes of an uploaded file."""
+    if file.size is not None:
+        return file.size
+
+    position = file.file.tell()
+    size = file.file.seek(0, os.SEEK_END)
+    file.file.seek(position)
+    return size
+
+
+def cache_insert_statement(dialect_name: str) -> Insert:
+    """
+    Build the insert statement of the chunk embedding cache rows.
+
+    A concurrent upload may cache the same text, so the rows already cached
+    are skipped on databases that support it. Other databases only get the
+    rows looked up as missing in the current transaction.
+
+    Args:
+        dialect_name (str): The name of the database dialect.
+
+    Returns:
+        Insert: The insert statement.
+    """
+    dialect_insert = CONFLICT_SKIPPING_INSERTS.get(dialect_name)
+    if dialect_insert is None:
+        return insert(ChunkEmbeddingCache)
+    return dialect_insert(ChunkEmbeddingCache).on_conflict_do_nothing()
+
+
+def _batched(items: Iterable, batch_size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
@@ -1,4 +1,5 @@
 # tests/test_chat_service.py
+import numpy as np
 import pytest
 from unittest.mock import MagicMock
 from sqlmodel import Session
@@ -7,6 +8,8 @@ from fastapi import HTTPException, UploadFile
 from FastEmbed.QAnswers.services.chat import ChatService, ChatQuery
 from FastEmbed.QAnswers.models.chat import Chat, ChatRead
 from FastEmbed.QAnswers.models.document import DocumentChunk, Document
+from FastEmbed.core.embedding import get_embedding_engine
+from FastEmbed.core.vector_index import get_vector_index
 
 
 @pytest.mark.asyncio
@@ -68,37 +71,29 @@ async def test_get_chat_not_found():
 @pytest.mark.asyncio
 async def test_get_all_chats():
     # Init
-    mock_chunk1 = DocumentChunk(
-        line_number=5,
-        content="Hello world",
-        embedding="Hello world".encode("utf-8"),
-    )
-
-    mock_chunk2 = DocumentChunk(
-        line_number=10,
-        content="Another chunk",
-        embedding="Another chunk".encode("utf-8"),
-    )
-    mock_document = Document(name="TestDoc", chunks=[mock_chunk1, mock_chunk2])
-
-    chat1 = Chat(id=1, query="Query 1", source_document=mock_chunk1, confidence=0.8)
-    chat2 = Chat(id=2, query="Query 2", source_document=mock_chunk2, confidence=0.95)
+    rows = [
+        (1, "Query 1", "Hello world", "TestDoc", 5, None, 0.8),
+        (2, "Query 2", "Another chunk", "TestDoc", 10, 2, 0.95),
+    ]
 
     mock_session = MagicMock(spec=Session)
     mock_exec = mock_session.exec.return_value
-    mock_exec.all.return_value = [chat1, chat2]
+    mock_exec.all.return_value = rows
 
     service = ChatService()
 
     # Test
-    results = await service.get_all_chats(mock_session)
+    results = await service.get_all_chats(mock_session, after_id=0, limit=2)
 
     # Assert
+    mock_session.exec.assert_called_once()
     assert len(results) == 2
     assert results[0].id == 1
     assert results[0].response == "Hello world"
+    assert results[0].source_document_name == "TestDoc"
     assert results[1].id == 2
     assert results[1].response == "Another chunk"
+    assert results[1].source_page == 2
 
 
 @pytest.mark.asyncio
@@ -125,6 +120,7 @@ async def test_query_question():
 
     mock_query = ChatQuery(query="Which planet is known as the Red Planet?", k=1)
     mock_mars_chunk = DocumentChunk(
+        id=1,
         line_number=74,
         content="Mars, known for its reddish appearance, is often referred to as the Red Planet.",
         embedding=open(
@@ -134,11 +130,10 @@ async def test_query_question():
 
     mock_document = Document(name="Mars Facts", chunks=[mock_mars_chunk])
 
-    mock_session = MagicMock(spec=Session)
-    mock_session.add.side_effect = fake_add
-    mock_session.exec.return_value.all.return_value = [
+    chunks = [
         mock_mars_chunk,
         DocumentChunk(
+            id=2,
             line_number=31,
             content="Venus is often called Earth's twin because of its similar size and proximity.",
             embedding=open(
@@ -146,6 +141,7 @@ async def test_query_question():
             ).read(),
         ),
         DocumentChunk(
+            id=3,
             line_number=100,
             content="Jupiter, the largest planet in our solar system, has a prominent red spot.",
             embedding=open(
@@ -153,6 +149,16 @@ async def test_query_question():
             ).read(),
         ),
     ]
+    get_vector_index().load(
+        [chunk.id for chunk in chunks],
+        np.stack(
+            [np.frombuffer(chunk.embedding, dtype=np.float32) for chunk in chunks]
+        ),
+    )
+
+    mock_session = MagicMock(spec=Session)
+    mock_session.add.side_effect = fake_add
+    mock_session.exec.return_value.all.return_value = chunks
 
     service = ChatService()
 
@@ -167,11 +173,71 @@ async def test_query_question():
     assert result.source_line == mock_mars_chunk.line_number
 
 
+@pytest.mark.asyncio
+async def test_query_questions():
+    # Init
+    def fake_add_all(chats):
+        for chat_id, chat in enumerate(chats, start=1):
+            chat.id = chat_id
+
+    queries = [
+        ChatQuery(query="Which planet is known as the Red Planet?", k=1),
+        ChatQuery(query="What is the largest planet in the solar system?", k=1),
+    ]
+    chunks = [
+        DocumentChunk(id=chunk_id, line_number=line_number, content=content)
+        for chunk_id, line_number, content in [
+            (
+                1,
+                74,
+                "Mars, known for its reddish appearance, "
+                "is often referred to as the Red Planet.",
+            ),
+            (
+                2,
+                31,
+                "Venus is often called Earth's twin "
+                "because of its similar size and proximity.",
+            ),
+            (
+                3,
+                100,
+                "Jupiter, the largest planet in our solar system, "
+                "has a prominent red spot.",
+            ),
+        ]
+    ]
+    get_vector_index().load(
+        [chunk.id for chunk in chunks],
+        get_embedding_engine().embed_documents([chunk.content for chunk in chunks]),
+    )
+
+    mock_session = MagicMock(spec=Session)
+    mock_session.add_all.side_effect = fake_add_all
+    mock_session.exec.return_value.all.return_value = [
+        (chunk, "Planet Facts") for chunk in chunks
+    ]
+
+    service = ChatService()
+
+    # Test
+    results = await service.query_questions(queries, mock_session)
+
+    # Assert
+    mock_session.commit.assert_called_once()
+    assert [result.id for result in results] == [1, 2]
+    assert results[0].response == chunks[0].content
+    assert results[1].response == chunks[2].content
+    assert results[1].source_document_name == "Planet Facts"
+    assert results[1].source_line == 100
+
+
 @pytest.mark.asyncio
 async def test_query_question_no_documents():
     # Init
     mock_query = ChatQuery(query="Which planet is known as the Red Planet?")
     mock_session = MagicMock(spec=Session)
+    get_vector_index().clear()
 
     service = ChatService()
 
@@ -182,3 +248,30 @@ async def test_query_question_no_documents():
     # Assert
     assert exc_info.value.status_code == 404
     assert exc_info.value.detail == "No documents found in the system"
+
+
+@pytest.mark.asyncio
+async def test_query_question_stale_index():
+    # Init
+    mock_query = ChatQuery(query="Which planet is known as the Red Planet?", k=2)
+    contents = [
+        "Mars, known for its reddish appearance, is often referred to as the Red Planet.",
+        "Venus is often called Earth's twin because of its similar size and proximity.",
+    ]
+    get_vector_index().load([1, 2], get_embedding_engine().embed_documents(contents))
+
+    # The indexed chunks were deleted from the database
+    mock_session = MagicMock(spec=Session)
+    mock_session.exec.return_value.all.return_value = []
+
+    service = ChatService()
+
+    # Test
+    with pytest.raises(HTTPException) as exc_info:
+        await service.query_question(mock_query, mock_session)
+
+    # Assert
+    assert exc_info.value.status_code == 404
+    assert exc_info.value.detail == "No matching chunks found"
+    mock_session.add.assert_not_called()
+    get_vector_index().clear()
@@ -0,0 +1,360 @@
+"""
+Command line tools.
+
+Usage:
+    python -m FastEmbed.cli convert-embeddings --source-precision float32
+    python -m FastEmbed.cli fetch-model
+    python -m FastEmbed.cli verify-model --full
+    python -m FastEmbed.cli quantize-model
+    python -m FastEmbed.cli compare-quantization --n-texts 256
+    python -m FastEmbed.cli compact-embedding-store
+"""
+
+import argparse
+import json
+from typing import List, Set, Tuple, Type
+
+from sqlalchemy import bindparam, delete, update
+from sqlmodel import Session, SQLModel, select
+
+from FastEmbed.QAnswers.models.document import ChunkEmbeddingCache, DocumentChunk
+from FastEmbed.config import Config
+from FastEmbed.core.cache import chunk_cache_key
+from FastEmbed.core.database import create_database_engine
+from FastEmbed.core.embedding import EmbeddingEngine, create_embedding_engine
+from FastEmbed.core.embedding_store import (
+    get_embedding_store,
+    stored_chunk_ids,
+    sync_embedding_store,
+)
+from FastEmbed.core.model_files import (
+    fetch_model,
+    resolve_model_files,
+    verify_model_dir,
+)
+from FastEmbed.core.model_quantization import (
+    compare_embeddings,
+    measure_throughput,
+    quantize_model,
+)
+from FastEmbed.core.precision import (
+    Precision,
+    decode_embeddings,
+    dequantize_embeddings,
+    encode_embedding,
+)
+
+# Number of rows converted per query
+CONVERSION_BATCH_SIZE = 1000
+
+
+def convert_embeddings(args: argparse.Namespace) -> None:
+    """
+    Re-encode the stored embeddings in another precision.
+
+    Every chunk and chunk cache embedding is converted in a single
+    transaction, so the database is never left with mixed precisions. The
+    chunk cache keys hash the precision, so the cache rows are given the
+    key of the target precision.
+    """
+    source_precision = args.source_precision
+    target_precision = args.target_precision or Config.EMBEDDING_PRECISION
+    if source_precision == target_precision:
+        print(f"Embeddings are already stored as {target_precision}")
+        return
+
+    with Session(create_database_engine()) as session:
+        for model, key_name in ((DocumentChunk, "id"), (ChunkEmbeddingCache, "key")):
+            converted_count = _convert_table(
+                session, model, key_name, source_precision, target_precision
+            )
+            print(
+                f"Converted {converted_count} {model.__tablename__} embeddings "
+                f"from {source_precision} to {target_precision}"
+            )
+
+        rekeyed_count, removed_count = _rekey_chunk_cache(
+            session, source_precision, target_precision
+        )
+        print(
+            f"Moved {rekeyed_count} cached embeddings to the {target_precision} "
+            f"keys, removed {removed_count} of texts no longer stored"
+        )
+
+        session.commit()
+
+
+def _convert_table(
+    session: Session,
+    model: Type[SQLModel],
+    key_name: str,
+    source_precision: Precision,
+    target_precision: Precision,
+) -> int:
+    """
+    Re-encode the embedding column of a table, one batch of rows at a time.
+
+    Returns:
+        int: The number of converted rows.
+    """
+    key_column = getattr(model, key_name)
+    converted_count = 0
+    last_key = None
+    while True:
+        query = select(key_column, model.embedding).order_by(key_column)
+        if last_key is not None:
+            query = query.where(key_column > last_key)
+        rows = session.exec(query.limit(CONVERSION_BATCH_SIZE)).all()
+        if not rows:
+            return converted_count
+
+        embeddings = dequantize_embeddings(
+            *decode_embeddings([row[1] for row in rows], source_precision)
+        )
+        session.execute(
+            update(model),
+            [
+                {
+                    key_name: row[0],
+                    "embedding": encode_embedding(embedding, target_precision),
+                }
+                for row, embedding in zip(rows, embeddings)
+            ],
+        )
+
+        converted_count += len(rows)
+        last_key = rows[-1][0]
+
+
+def _rekey_chunk_cache(
+    session: Session, source_precision: Precision, target_precision: Precision
+) -> Tuple[int, int]:
+    """
+    Replace the chunk cache keys of the source precision by the target ones.
+
+    The keys are hashes, so they are computed again from the stored chunk
+    texts. The rows of texts no longer stored as chunks cannot be matched
+    and are removed.
+
+    Returns:
+        Tuple[int, int]: The numbers of rekeyed and removed cache rows.
+    """
+    prefix = EmbeddingEngine.PREFIXES["document"].format(title="none")
+
+    def cache_key(text: str, precision: Precision) -> str:
+        return chunk_cache_key(
+            Config.MODEL_ID,
+            prefix,
+            text,
+            quantization=Config.MODEL_QUANTIZATION,
+            precision=precision,
+        )
+
+    cache_table = ChunkEmbeddingCache.__table__
+    rekey = (
+        update(cache_table)
+        .where(cache_table.c.key == bindparam("source_key"))
+        .values(key=bindparam("target_key"))
+    )
+    target_keys: Set[str] = set()
+    rekeyed_count = 0
+    last_id = 0
+    while True:
+        rows = session.exec(
+            select(DocumentChunk.id, DocumentChunk.content)
+            .where(DocumentChunk.id > last_id)
+            .order_by(DocumentChunk.id)
+            .limit(CONVERSION_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        keys = {
+            cache_key(text, source_precision): cache_key(text, target_precision)
+            for _, text in rows
+        }
+        keys = {
+            source_key: target_key
+            for source_key, target_key in keys.items()
+            if target_key not in target_keys
+        }
+        if keys:
+            rekeyed_count += session.connection().execute(
+                rekey,
+                [
+                    {"source_key": source_key, "target_key": target_key}
+                    for source_key, target_key in keys.items()
+                ],
+            ).rowcount
+            target_keys.update(keys.values())
+        last_id = rows[-1][0]
+
+    # Remove the rows whose text was not found
+    removed_count = 0
+    last_key = None
+    while True:
+        query = select(ChunkEmbeddingCache.key).order_by(ChunkEmbeddingCache.key)
+        if last_key is not None:
+            query = query.where(ChunkEmbeddingCache.key > last_key)
+        keys = session.exec(query.limit(CONVERSION_BATCH_SIZE)).all()
+        if not keys:
+            return rekeyed_count, removed_count
+
+        stale_keys = [key for key in keys if key not in target_keys]
+        if stale_keys:
+            session.exec(
+                delete(ChunkEmbeddingCache).where(
+                    ChunkEmbeddingCache.key.in_(stale_keys)
+                )
+            )
+            removed_count += len(stale_keys)
+        last_key = keys[-1]
+
+
+def fetch_embedding_model(args: argparse.Namespace) -> None:
+    """Download the model and tokenizer into MODEL_DIR for offline loading."""
+    model_dir = args.model_dir or Config.MODEL_DIR
+    manifest = fetch_model(args.model_id or Config.MODEL_ID, model_dir)
+    print(f"Fetched {len(manifest['files'])} files to {model_dir}")
+
+
+def verify_embedding_model(args: argparse.Namespace) -> None:
+    """Check the files of MODEL_DIR against its manifest."""
+    problems = verify_model_dir(Config.MODEL_DIR, Config.MODEL_ID, full=args.full)
+    for problem in problems:
+        print(problem)
+    if problems:
+        raise SystemExit(1)
+    print(f"{Config.MODEL_DIR} is valid")
+
+
+def quantize_embedding_model(args: argparse.Namespace) -> None:
+    """Create the int8 variant of the configured model next to the original."""
+    model_path, _ = resolve_model_files(Config.MODEL_ID, Config.MODEL_DIR)
+    print(f"Quantized model saved to {quantize_model(model_path, args.overwrite)}")
+
+
+def compare_quantization(args: argparse.Namespace) -> None:
+    """
+    Compare the int8 model with the float32 model.
+
+    Both models embed the same texts, the report gives the cosine agreement
+    of the embeddings and the latency and throughput of each model.
+    """
+    texts = _comparison_texts(args.texts_file, args.n_texts)
+    if not texts:
+        print("No texts to compare, upload documents or pass --texts-file")
+        return
+
+    report = {"model_id": Config.MODEL_ID, "n_texts": len(texts), "models": {}}
+    embeddings = {}
+    for quantization in ("none", "int8"):
+        engine = create_embedding_engine(quantization=quantization)
+        embeddings[quantization] = engine.embed_documents(texts)
+        report["models"][quantization] = measure_throughput(
+            engine.embed_documents, texts, args.batch_size
+        )
+
+    report["agreement"] = compare_embeddings(embeddings["none"], embeddings["int8"])
+    print(json.dumps(report, indent=2))
+
+
+def _comparison_texts(texts_file: str, n_texts: int) -> List[str]:
+    """Read the comparison texts, defaults to the stored document chunks."""
+    if texts_file:
+        with open(texts_file, encoding="utf-8") as file:
+            return [line.strip() for line in file if line.strip()][:n_texts]
+
+    with Session(create_database_engine()) as session:
+        return list(
+            session.exec(
+                select(DocumentChunk.content).order_by(DocumentChunk.id).limit(n_texts)
+            ).all()
+        )
+
+
+def compact_embedding_store(args: argparse.Namespace) -> None:
+    """Rewrite the embedding store without the rows of deleted chunks."""
+    embedding_store = get_embedding_store()
+    if embedding_store is None:
+        print("EMBEDDING_STORE_DIR is not set")
+        return
+
+    with Session(create_database_engine()) as session:
+        sync_embedding_store(embedding_store, session)
+        removed_count = embedding_store.compact(stored_chunk_ids(session))
+
+    print(f"Removed {removed_count} rows from {embedding_store.path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m FastEmbed.cli")
+    subparsers = parser.add_subparsers(required=True)
+
+    precisions = ["float32", "float16", "int8"]
+    convert_parser = subparsers.add_parser(
+        "convert-embeddings",
+        help="Re-encode the stored embeddings in another precision",
+    )
+    convert_parser.add_argument(
+        "--source-precision",
+        choices=precisions,
+        required=True,
+        help="Precision the embeddings are currently stored in",
+    )
+    convert_parser.add_argument(
+        "--target-precision",
+        choices=precisions,
+        help="Precision to convert to, defaults to EMBEDDING_PRECISION",
+    )
+    convert_parser.set_defaults(func=convert_embeddings)
+
+    fetch_parser = subparsers.add_parser(
+        "fetch-model",
+        help="Download the model and tokenizer into MODEL_DIR for offline use",
+    )
+    fetch_parser.add_argument("--model-id", help="Defaults to MODEL_ID")
+    fetch_parser.add_argument("--model-dir", help="Defaults to MODEL_DIR")
+    fetch_parser.set_defaults(func=fetch_embedding_model)
+
+    verify_parser = subparsers.add_parser(
+        "verify-model", help="Check the MODEL_DIR files against their manifest"
+    )
+    verify_parser.add_argument(
+        "--full", action="store_true", help="Hash every file, not only changed ones"
+    )
+    verify_parser.set_defaults(func=verify_embedding_model)
+
+    quantize_parser = subparsers.add_parser(
+        "quantize-model",
+        help="Create the dynamically quantized int8 variant of the model",
+    )
+    quantize_parser.add_argument(
+        "--overwrite", action="store_true", help="Replace an existing variant"
+    )
+    quantize_parser.set_defaults(func=quantize_embedding_model)
+
+    compare_parser = subparsers.add_parser(
+        "compare-quantization",
+        help="Compare the int8 and float32 models embeddings and latency",
+    )
+    compare_parser.add_argument(
+        "--texts-file",
+        help="File with one text per line, defaults to the stored chunks",
+    )
+    compare_parser.add_argument("--n-texts", type=int, default=256)
+    compare_parser.add_argument("--batch-size", type=int, default=32)
+    compare_parser.set_defaults(func=compare_quantization)
+
+    compact_parser = subparsers.add_parser(
+        "compact-embedding-store",
+        help="Reclaim the embedding store space of deleted chunks",
+    )
+    compact_parser.set_defaults(func=compact_embedding_store)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,54 @@
-from typing import List
+from typing import List, Literal, Tuple
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_CACHE_SIZE_KIB: int = 65536
     MODEL_ID: str
     MODEL_DIR: str
     MODEL_PROVIDERS: List[str] = ["CPUExecutionProvider"]
     TOKENIZER_MAX_LENGTH: int
+    MODEL_QUANTIZATION: Literal["none", "int8"] = "none"
+    EMBEDDING_WORKERS: int = 0
+    EMBEDDING_THREADS_PER_WORKER: int = 1
+    ORT_INTRA_OP_NUM_THREADS: int = 0
+    ORT_INTER_OP_NUM_THREADS: int = 0
+    ORT_EXECUTION_MODE: Literal["sequential", "parallel"] = "sequential"
+    ORT_GRAPH_OPTIMIZATION_LEVEL: Literal["disable", "basic", "extended", "all"] = "all"
+    ORT_ENABLE_CPU_MEM_ARENA: bool = True
+    ORT_ENABLE_MEM_PATTERN: bool = True
+    ORT_OPTIMIZED_MODEL_DIR: str = ""
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_TOKEN_BUDGET: int = 8192
+    EMBEDDING_PAD_TO_MULTIPLE_OF: int = 8
+    EMBEDDING_PRECISION: Literal["float32", "float16", "int8"] = "float32"
+    EMBEDDING_WARMUP_SHAPES: List[Tuple[int, int]] = [(1, 32), (32, 128)]
+    BACKGROUND_LOADING: bool = False
+    CHUNK_STRATEGY: Literal["lines", "sentences", "window"] = "lines"
+    CHUNK_OVERLAP_TOKENS: int = 32
+    PDF_EXTRACTION_WORKERS: int = 0
+    CHUNK_INSERT_BATCH_SIZE: int = 1000
+    INGESTION_WORKERS: int = 2
+    INGESTION_QUEUE_SIZE: int = 16
+    SYNC_UPLOAD_MAX_BYTES: int = 1048576
+    QUERY_BATCH_MAX_WAIT_MS: float = 2.0
+    QUERY_BATCH_MAX_SIZE: int = 32
+    CHAT_BATCH_MAX_QUERIES: int = 256
+    QUERY_CACHE_MAX_ENTRIES: int = 1024
+    QUERY_CACHE_MAX_BYTES: int = 0
+    QUERY_CACHE_TTL_SECONDS: float = 0
+    SEARCH_TRUNCATE_DIM: int = 0
+    SEARCH_CANDIDATE_MULTIPLIER: int = 4
+    VECTOR_INDEX_MODE: Literal["exact", "ivf"] = "exact"
+    IVF_N_LISTS: int = 256
+    IVF_N_PROBE: int = 8
+    IVF_INDEX_PATH: str = ""
+    EMBEDDING_STORE_DIR: str = ""
+    METRICS_ENABLED: bool = True
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
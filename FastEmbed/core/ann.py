@@ -0,0 +1,220 @@
+import os
+from typing import List, Optional, Sequence
+import numpy as np
+
+# Minimum number of vectors per list required to train the index
+MIN_TRAINING_POINTS_PER_LIST = 8
+
+# Maximum number of vectors per list sampled to train the index
+MAX_TRAINING_POINTS_PER_LIST = 256
+
+# Number of vectors assigned to lists per matrix product
+ASSIGNMENT_BLOCK_SIZE = 65536
+
+
+class IVFIndex:
+    """
+    Inverted file (IVF) approximate nearest neighbour index.
+
+    The embedding space is partitioned with spherical k-means, every chunk ID
+    is stored in the list of its nearest centroid and a query only visits
+    the n_probe lists whose centroids are the most similar to it. The
+    embeddings themselves are not stored, the caller scores the candidates.
+    """
+
+    def __init__(self, n_lists: int = 256, n_probe: int = 8, seed: int = 0) -> None:
+        """
+        Initialize an untrained IVFIndex.
+
+        Args:
+            n_lists (int, optional): The number of k-means partitions.
+                Defaults to 256.
+            n_probe (int, optional): The default number of lists visited per
+                query, higher values trade latency for recall. Defaults to 8.
+            seed (int, optional): Seed of the k-means initialization.
+                Defaults to 0.
+        """
+        self._n_lists = n_lists
+        self._n_probe = n_probe
+        self._seed = seed
+
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def dim(self) -> int:
+        return 0 if self._centroids is None else self._centroids.shape[1]
+
+    @property
+    def n_lists(self) -> int:
+        return self._n_lists
+
+    @property
+    def n_probe(self) -> int:
+        return self._n_probe
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._lists)
+
+    def ids(self) -> np.ndarray:
+        """Get every chunk ID stored in the index."""
+        if not self._lists:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(self._lists)
+
+    def can_train(self, n_vectors: int) -> bool:
+        """Whether n_vectors are enough to train the index."""
+        return n_vectors >= self._n_lists * MIN_TRAINING_POINTS_PER_LIST
+
+    def train(
+        self, embeddings: np.ndarray, ids: Sequence[int], n_iterations: int = 20
+    ) -> None:
+        """
+        Compute the centroids with spherical k-means and assign the embeddings.
+
+        Args:
+            embeddings (np.ndarray): The embeddings, one row per ID.
+            ids (Sequence[int]): The chunk IDs.
+            n_iterations (int, optional): The number of k-means iterations.
+                Defaults to 20.
+        """
+        rng = np.random.default_rng(self._seed)
+        n_lists = min(self._n_lists, len(embeddings))
+
+        # Train on a sample, the centroids converge long before all points
+        sample_size = min(len(embeddings), n_lists * MAX_TRAINING_POINTS_PER_LIST)
+        sample = embeddings[np.sort(rng.choice(len(embeddings), sample_size, False))]
+        sample = _normalize(np.asarray(sample, dtype=np.float32))
+
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+        for _ in range(n_iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+            lists, starts = np.unique(assignments[order], return_index=True)
+
+            sums = np.zeros_like(centroids)
+            sums[lists] = np.add.reduceat(sample[order], starts)
+
+            # Reseed the empty lists with random points
+            empty = np.setdiff1d(np.arange(n_lists), lists)
+            sums[empty] = sample[rng.choice(len(sample), len(empty))]
+
+            centroids = _normalize(sums)
+
+        self._n_lists = n_lists
+        self._centroids = np.ascontiguousarray(centroids)
+        self._lists = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self.add(embeddings, ids)
+
+    def add(self, embeddings: np.ndarray, ids: Sequence[int]) -> None:
+        """
+        Assign embeddings to the lists of their nearest centroid.
+
+        Args:
+            embeddings (np.ndarray): The embeddings, one row per ID.
+            ids (Sequence[int]): The chunk IDs.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if not self.is_trained or len(ids) == 0:
+            return
+
+        assignments = np.concatenate(
+            [
+                np.argmax(
+                    np.asarray(embeddings[start : start + ASSIGNMENT_BLOCK_SIZE])
+                    @ self._centroids.T,
+                    axis=1,
+                )
+                for start in range(0, len(ids), ASSIGNMENT_BLOCK_SIZE)
+            ]
+        )
+        order = np.argsort(assignments, kind="stable")
+        lists, starts = np.unique(assignments[order], return_index=True)
+
+        for list_index, list_ids in zip(lists, np.split(ids[order], starts[1:])):
+            self._lists[list_index] = np.concatenate(
+                [self._lists[list_index], list_ids]
+            )
+
+    def remove(self, ids: Sequence[int]) -> None:
+        """
+        Remove chunk IDs from the index.
+
+        Args:
+            ids (Sequence[int]): The chunk IDs to remove.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        self._lists = [list_ids[~np.isin(list_ids, ids)] for list_ids in self._lists]
+
+    def reset(self) -> None:
+        """Remove every chunk ID but keep the trained centroids."""
+        self._lists = [np.empty(0, dtype=np.int64) for _ in self._lists]
+
+    def probe(
+        self, query_embedding: np.ndarray, n_probe: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Get the candidate chunk IDs for a query.
+
+        Args:
+            query_embedding (np.ndarray): The embedding of the query.
+            n_probe (Optional[int], optional): The number of lists to visit.
+                Defaults to the index n_probe.
+
+        Returns:
+            np.ndarray: The chunk IDs of the visited lists.
+        """
+        n_probe = min(n_probe or self._n_probe, len(self._lists))
+        centroid_scores = self._centroids @ np.ravel(query_embedding)
+        probed_lists = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+
+        return np.concatenate([self._lists[i] for i in probed_lists])
+
+    def save(self, path: str) -> None:
+        """
+        Save the trained index to disk.
+
+        Args:
+            path (str): The file path, written atomically.
+        """
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            np.savez(
+                file,
+                centroids=self._centroids,
+                ids=self.ids(),
+                list_sizes=np.array([len(ids) for ids in self._lists], dtype=np.int64),
+                n_probe=np.array(self._n_probe),
+            )
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str, n_probe: Optional[int] = None) -> "IVFIndex":
+        """
+        Load an index saved with save.
+
+        Args:
+            path (str): The file path.
+            n_probe (Optional[int], optional): Overrides the saved n_probe.
+
+        Returns:
+            IVFIndex: The loaded index.
+        """
+        with np.load(path) as data:
+            index = cls(
+                n_lists=len(data["centroids"]),
+                n_probe=n_probe or int(data["n_probe"]),
+            )
+            index._centroids = data["centroids"]
+            index._lists = np.split(data["ids"], np.cumsum(data["list_sizes"])[:-1])
+
+        return index
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
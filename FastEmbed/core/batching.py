@@ -0,0 +1,127 @@
+import asyncio
+from typing import List, Optional, Set, Tuple
+import numpy as np
+
+from FastEmbed.config import Config
+from FastEmbed.core.embedding import EmbeddingEngine, get_embedding_engine
+from FastEmbed.core.metrics import add_request_timings, run_with_timings
+
+
+class QueryBatcher:
+    """
+    Dynamic micro-batching of query embeddings.
+
+    Concurrent callers are queued for up to max_wait_ms milliseconds or until
+    max_batch_size queries are pending, then the whole batch is embedded with
+    a single inference call in a worker thread and every caller receives its
+    own row. The stage durations of the batch are added to the timings of
+    every request of the batch.
+    """
+
+    def __init__(
+        self,
+        embedding_engine: EmbeddingEngine,
+        max_wait_ms: float = 2.0,
+        max_batch_size: int = 32,
+    ) -> None:
+        """
+        Initialize the QueryBatcher.
+
+        Args:
+            embedding_engine (EmbeddingEngine): The engine used to embed batches.
+            max_wait_ms (float, optional): Maximum time a query waits for
+                other queries to join its batch. Defaults to 2.0.
+            max_batch_size (int, optional): Maximum number of queries per batch.
+                Defaults to 32.
+        """
+        self._embedding_engine = embedding_engine
+        self._max_wait = max(max_wait_ms, 0) / 1000
+        self._max_batch_size = max(max_batch_size, 1)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._running_batches: Set[asyncio.Task] = set()
+
+    async def embed_query_text(self, query_text: str) -> np.ndarray:
+        """
+        Embed the given query text as part of the next batch.
+
+        Args:
+            query_text (str): The query text to embed.
+
+        Returns:
+            np.ndarray: The embedded array of the query.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pending state belongs to a previous event loop
+            self._loop = loop
+            self._pending = []
+            self._flush_handle = None
+
+        future = loop.create_future()
+        self._pending.append((query_text, future))
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._max_wait, self._flush)
+
+        embedding, timings = await future
+        add_request_timings(timings)
+        return embedding
+
+    def _flush(self) -> None:
+        """Start embedding the pending queries."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._run_batch(batch))
+            self._running_batches.add(task)
+            task.add_done_callback(self._running_batches.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """
+        Embed a batch of queries and resolve the callers futures with their
+        embedding and the stage durations of the batch.
+
+        Args:
+            batch (List[Tuple[str, asyncio.Future]]): The queries and their futures.
+        """
+        query_texts = [query_text for query_text, _ in batch]
+        try:
+            # Executor threads do not inherit the context of the requests
+            embeddings, timings = await asyncio.get_running_loop().run_in_executor(
+                None,
+                run_with_timings,
+                self._embedding_engine.embed_queries,
+                query_texts,
+            )
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result((embeddings[i : i + 1], timings))
+
+
+query_batcher = None
+
+
+def get_query_batcher() -> QueryBatcher:
+    """Get the query batcher singleton instance."""
+    global query_batcher
+    if query_batcher is None:
+        query_batcher = QueryBatcher(
+            get_embedding_engine(),
+            max_wait_ms=Config.QUERY_BATCH_MAX_WAIT_MS,
+            max_batch_size=Config.QUERY_BATCH_MAX_SIZE,
+        )
+    return query_batcher
@@ -0,0 +1,226 @@
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+import numpy as np
+
+from FastEmbed.config import Config
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of embeddings with optional expiration.
+
+    The cache is bounded by number of entries and/or by the total size in
+    bytes of the cached arrays, the least recently used entries are evicted
+    first.
+    """
+
+    def __init__(
+        self, max_entries: int = 1024, max_bytes: int = 0, ttl_seconds: float = 0
+    ) -> None:
+        """
+        Initialize the EmbeddingCache.
+
+        Args:
+            max_entries (int, optional): Maximum number of cached embeddings,
+                0 means unbounded. Defaults to 1024.
+            max_bytes (int, optional): Maximum total size of the cached
+                embeddings, 0 means unbounded. Defaults to 0.
+            ttl_seconds (float, optional): Time after which an entry expires,
+                0 means entries never expire. Defaults to 0.
+        """
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, Tuple[np.ndarray, float]] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        """
+        Get a cached embedding and mark it as recently used.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            Optional[np.ndarray]: The cached embedding, None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry):
+                self._pop(key)
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, embedding: np.ndarray) -> None:
+        """
+        Cache an embedding, evicting the least recently used entries if needed.
+
+        Args:
+            key (Hashable): The cache key.
+            embedding (np.ndarray): The embedding to cache.
+        """
+        # Cached arrays are shared between callers
+        embedding = np.array(embedding, copy=True)
+        embedding.setflags(write=False)
+
+        if self._max_bytes and embedding.nbytes > self._max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+            self._entries[key] = (embedding, time.monotonic())
+            self._bytes += embedding.nbytes
+
+            while (self._max_entries and len(self._entries) > self._max_entries) or (
+                self._max_bytes and self._bytes > self._max_bytes
+            ):
+                self._pop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get the cache usage counters.
+
+        Returns:
+            Dict[str, float]: The hit, miss and eviction counters and the
+                current and maximum size of the cache.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self._max_entries,
+                "max_bytes": self._max_bytes,
+                "ttl_seconds": self._ttl_seconds,
+            }
+
+    def _is_expired(self, entry: Tuple[np.ndarray, float]) -> bool:
+        return bool(self._ttl_seconds) and (
+            time.monotonic() - entry[1] > self._ttl_seconds
+        )
+
+    def _pop(self, key: Hashable) -> None:
+        embedding, _ = self._entries.pop(key)
+        self._bytes -= embedding.nbytes
+
+
+def normalize_query_text(query_text: str) -> str:
+    """
+    Normalize a query so trivially different spellings share a cache entry.
+
+    Applies Unicode NFKC normalization and collapses whitespace.
+
+    Args:
+        query_text (str): The query text.
+
+    Returns:
+        str: The normalized query text.
+    """
+    return " ".join(unicodedata.normalize("NFKC", query_text).split())
+
+
+def query_cache_key(query_text: str) -> Tuple[str, str, int, str]:
+    """
+    Build the query embedding cache key for the configured model.
+
+    Args:
+        query_text (str): The query text.
+
+    Returns:
+        Tuple[str, str, int, str]: The model ID, model quantization,
+            tokenizer max length and the normalized query text.
+    """
+    return (
+        Config.MODEL_ID,
+        Config.MODEL_QUANTIZATION,
+        Config.TOKENIZER_MAX_LENGTH,
+        normalize_query_text(query_text),
+    )
+
+
+def chunk_cache_key(
+    model_id: str,
+    prefix: str,
+    text: str,
+    quantization: str = "none",
+    precision: str = "float32",
+) -> str:
+    """
+    Build the persistent chunk embedding cache key.
+
+    The quantization and storage precision are only hashed when they are
+    not the defaults, so the keys of the embeddings cached before they were
+    part of the key stay valid.
+
+    Args:
+        model_id (str): The ID of the embedding model.
+        prefix (str): The prefix prepended to the text before embedding.
+        text (str): The chunk text.
+        quantization (str, optional): The quantization of the model.
+            Defaults to "none".
+        precision (str, optional): The precision of the cached serialized
+            embedding. Defaults to "float32".
+
+    Returns:
+        str: The hex SHA-256 digest of the model ID, quantization, precision,
+            prefix and text.
+    """
+    parts = [model_id, prefix, text]
+    if precision != "float32":
+        parts.insert(1, f"precision={precision}")
+    if quantization != "none":
+        parts.insert(1, quantization)
+
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+query_cache = None
+
+
+def get_query_cache() -> EmbeddingCache:
+    """Get the query embedding cache singleton instance."""
+    global query_cache
+    if query_cache is None:
+        query_cache = EmbeddingCache(
+            max_entries=Config.QUERY_CACHE_MAX_ENTRIES,
+            max_bytes=Config.QUERY_CACHE_MAX_BYTES,
+            ttl_seconds=Config.QUERY_CACHE_TTL_SECONDS,
+        )
+    return query_cache
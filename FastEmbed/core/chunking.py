@@ -0,0 +1,229 @@
+import re
+from typing import Iterable, Iterator, List, Literal, NamedTuple, Optional, Tuple
+
+from transformers import PreTrainedTokenizerBase
+
+ChunkStrategy = Literal["lines", "sentences", "window"]
+
+# A sentence ends with punctuation followed by whitespace, at a blank line
+# or at the end of the text
+SENTENCE_PATTERN = re.compile(r"\S.*?(?:[.!?](?=\s)|(?=\n\s*\n)|$)", re.DOTALL)
+
+
+class Chunk(NamedTuple):
+    text: str
+    line_number: int
+    page_number: Optional[int]
+
+
+class Segment(NamedTuple):
+    """A line or sentence, the unit the chunks are built from."""
+
+    text: str
+    line_number: int
+    page_number: Optional[int]
+    word_count: int
+    token_count: int
+
+
+class Chunker:
+    """
+    Token-aware document chunker.
+
+    Pages are split in segments, lines or sentences, and consecutive
+    segments shorter than min_word_count words are merged until the chunk
+    has min_word_count words. The segments of a page are tokenized in one
+    batch and the word and token counts of the chunk being built are kept
+    as running totals, so chunking is linear in the document length. No
+    chunk is longer than max_tokens tokens: longer segments are split on
+    token boundaries, and as token counts do not add up exactly across
+    segment boundaries, merged chunks are counted again and split if needed.
+
+    The window strategy ignores the document structure and cuts every page
+    in windows of max_tokens tokens overlapping by overlap_tokens tokens.
+    """
+
+    def __init__(
+        self,
+        tokenizer: PreTrainedTokenizerBase,
+        max_tokens: int,
+        strategy: ChunkStrategy = "lines",
+        min_word_count: int = 30,
+        overlap_tokens: int = 32,
+    ) -> None:
+        """
+        Initialize the Chunker.
+
+        Args:
+            tokenizer (PreTrainedTokenizerBase): The tokenizer of the model.
+            max_tokens (int): The maximum number of tokens per chunk,
+                special and prefix tokens excluded.
+            strategy (ChunkStrategy, optional): "lines", "sentences" or
+                "window". Defaults to "lines".
+            min_word_count (int, optional): The minimum word count of a chunk,
+                smaller segments are merged. Defaults to 30.
+            overlap_tokens (int, optional): The number of tokens shared by
+                consecutive windows. Defaults to 32.
+        """
+        if strategy not in ("lines", "sentences", "window"):
+            raise ValueError(f"Unsupported chunk strategy: {strategy}")
+
+        self._tokenizer = tokenizer
+        self._max_tokens = max(max_tokens, 1)
+        self._strategy = strategy
+        self._min_word_count = min_word_count
+        self._overlap_tokens = min(max(overlap_tokens, 0), self._max_tokens - 1)
+
+    def chunk_pages(
+        self, pages: Iterable[Tuple[Optional[int], str]]
+    ) -> Iterator[Chunk]:
+        """
+        Split pages into chunks, consuming the pages lazily.
+
+        Args:
+            pages (Iterable[Tuple[Optional[int], str]]): The page numbers
+                and texts.
+
+        Yields:
+            Chunk: The non-empty chunks with the line and page number of their
+                first segment. Line numbers count from the start of the document.
+        """
+        if self._strategy == "window":
+            yield from self._window_chunks(pages)
+        else:
+            yield from self._merge_segments(self._segments(pages))
+
+    def _segments(
+        self, pages: Iterable[Tuple[Optional[int], str]]
+    ) -> Iterator[Segment]:
+        first_line_number = 1
+        for page_number, page_text in pages:
+            if self._strategy == "lines":
+                lines = page_text.splitlines()
+                texts = (
+                    (line_number, line.strip())
+                    for line_number, line in enumerate(lines, start=first_line_number)
+                )
+                first_line_number += len(lines)
+            else:
+                texts = self._sentences(page_text, first_line_number)
+                first_line_number += len(page_text.splitlines())
+
+            texts = [(line_number, text) for line_number, text in texts if text]
+            token_counts = self._token_counts([text for _, text in texts])
+            for (line_number, text), token_count in zip(texts, token_counts):
+                yield Segment(
+                    text, line_number, page_number, len(text.split()), token_count
+                )
+
+    def _sentences(
+        self, text: str, first_line_number: int
+    ) -> Iterator[Tuple[int, str]]:
+        # Count the line breaks between consecutive sentences only once
+        line_number = first_line_number
+        position = 0
+        for match in SENTENCE_PATTERN.finditer(text):
+            line_number += text.count("\n", position, match.start())
+            position = match.start()
+            yield line_number, " ".join(match.group().split())
+
+    def _merge_segments(self, segments: Iterable[Segment]) -> Iterator[Chunk]:
+        buffer: List[Segment] = []
+        buffer_words = 0
+        buffer_tokens = 0
+        for segment in segments:
+            # Flush the buffer once it is long enough or the segment does not fit
+            if buffer and (
+                buffer_words >= self._min_word_count
+                or segment.word_count >= self._min_word_count
+                or buffer_tokens + segment.token_count > self._max_tokens
+            ):
+                yield from self._flush(buffer)
+                buffer, buffer_words, buffer_tokens = [], 0, 0
+
+            if segment.token_count > self._max_tokens:
+                yield from self._split_segment(segment)
+            elif segment.word_count >= self._min_word_count:
+                yield Chunk(segment.text, segment.line_number, segment.page_number)
+            else:
+                buffer.append(segment)
+                buffer_words += segment.word_count
+                buffer_tokens += segment.token_count
+
+        if buffer:
+            yield from self._flush(buffer)
+
+    def _flush(self, segments: List[Segment]) -> Iterator[Chunk]:
+        chunk = self._join(segments)
+        if len(segments) == 1 or (
+            self._token_counts([chunk.text])[0] <= self._max_tokens
+        ):
+            yield chunk
+            return
+
+        # The joined text has more tokens than the segments, split it in halves
+        middle = len(segments) // 2
+        yield from self._flush(segments[:middle])
+        yield from self._flush(segments[middle:])
+
+    def _split_segment(self, segment: Segment) -> Iterator[Chunk]:
+        offsets = self._token_offsets(segment.text)
+        for start in range(0, len(offsets), self._max_tokens):
+            window = offsets[start : start + self._max_tokens]
+            yield Chunk(
+                segment.text[window[0][0] : window[-1][1]].strip(),
+                segment.line_number,
+                segment.page_number,
+            )
+
+    def _window_chunks(
+        self, pages: Iterable[Tuple[Optional[int], str]]
+    ) -> Iterator[Chunk]:
+        stride = self._max_tokens - self._overlap_tokens
+        first_line_number = 1
+        for page_number, page_text in pages:
+            offsets = self._token_offsets(page_text)
+
+            # The last window ends at the end of the page, no short tail
+            starts = list(range(0, max(len(offsets) - self._overlap_tokens, 1), stride))
+            if len(offsets) > self._max_tokens:
+                starts[-1] = len(offsets) - self._max_tokens
+
+            line_number = first_line_number
+            position = 0
+            for start in starts:
+                window = offsets[start : start + self._max_tokens]
+                if not window:
+                    break
+
+                start_char = window[0][0]
+                line_number += page_text.count("\n", position, start_char)
+                position = start_char
+
+                text = " ".join(page_text[start_char : window[-1][1]].split())
+                yield Chunk(text, line_number, page_number)
+
+            first_line_number += len(page_text.splitlines())
+
+    def _token_counts(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        return [
+            len(input_ids)
+            for input_ids in self._tokenizer(texts, add_special_tokens=False)[
+                "input_ids"
+            ]
+        ]
+
+    def _token_offsets(self, text: str) -> List[Tuple[int, int]]:
+        return self._tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True
+        )["offset_mapping"]
+
+    @staticmethod
+    def _join(segments: List[Segment]) -> Chunk:
+        return Chunk(
+            " ".join(segment.text for segment in segments),
+            segments[0].line_number,
+            segments[0].page_number,
+        )
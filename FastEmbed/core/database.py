@@ -1,3 +1,5 @@
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import make_url
 from sqlmodel import SQLModel, Session, create_engine
 
 
@@ -8,23 +10,76 @@ def get_database_url():
     return Config.DATABASE_URL
 
 
+def create_database_engine() -> Engine:
+    """
+    Creates a pooled database engine for the configured database URL.
+
+    SQLite connections use WAL journaling, so readers are not blocked by
+    ingest writes, and relaxed fsync with a larger page cache and mmap.
+    Other databases are used with the driver defaults.
+    """
+    url = make_url(get_database_url())
+    is_sqlite = url.get_backend_name() == "sqlite"
+    engine_args = {}
+    if is_sqlite:
+        engine_args["connect_args"] = {"check_same_thread": False}
+    if url.database and url.database != ":memory:":
+        # In-memory databases use a single connection pool
+        engine_args["pool_size"] = Config.DATABASE_POOL_SIZE
+        engine_args["max_overflow"] = Config.DATABASE_MAX_OVERFLOW
+
+    engine = create_engine(url, **engine_args)
+    if not is_sqlite:
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={Config.SQLITE_MMAP_SIZE}")
+        # Negative cache sizes are expressed in KiB
+        cursor.execute(f"PRAGMA cache_size=-{Config.SQLITE_CACHE_SIZE_KIB}")
+        cursor.close()
+
+    return engine
+
+
+db_engine = None
+
+
+def get_database_engine() -> Engine:
+    """Get the database engine singleton instance."""
+    global db_engine
+    if db_engine is None:
+        db_engine = create_database_engine()
+    return db_engine
+
+
+def init_database_engine() -> Engine:
+    """Create the database engine singleton instance."""
+    return get_database_engine()
+
+
+def dispose_database_engine() -> None:
+    """Close every pooled connection of the database engine."""
+    global db_engine
+    if db_engine is not None:
+        db_engine.dispose()
+        db_engine = None
+
+
 async def init_database():
     """
     Creates all tables in the database using the definitions in the SQLModel metadata.
     """
     print("Initializing database...")
-    db_engine = create_engine(
-        get_database_url(), connect_args={"check_same_thread": False}
-    )
-    SQLModel.metadata.create_all(db_engine)
+    SQLModel.metadata.create_all(get_database_engine())
 
 
 async def get_session():
     """
     Returns a database session object which can be used to interact with the database.
     """
-    db_engine = create_engine(
-        get_database_url(), connect_args={"check_same_thread": False}
-    )
-    with Session(db_engine) as session:
+    with Session(get_database_engine()) as session:
         yield session
@@ -1,10 +1,24 @@
-from typing import Tuple
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 import numpy as np
 import onnxruntime as ort
-from huggingface_hub import hf_hub_download
-from transformers import AutoTokenizer
+from transformers import AutoTokenizer, PreTrainedTokenizerBase
 
 from FastEmbed.config import Config
+from FastEmbed.core.jobs import ProgressCallback
+from FastEmbed.core.metrics import get_metrics
+from FastEmbed.core.model_files import resolve_model_files
+from FastEmbed.core.model_quantization import ModelQuantization, quantize_model
+from FastEmbed.core.onnx_session import (
+    create_inference_session,
+    create_session_options,
+)
+from FastEmbed.core.precision import Precision, decode_embedding, encode_embedding
+
+# Word repeated to build the warmup texts, a single token for most tokenizers
+WARMUP_WORD = "a"
+
+metrics = get_metrics()
 
 
 class EmbeddingEngine:
@@ -23,43 +37,144 @@ class EmbeddingEngine:
         model_dir: str,
         tokenizer_max_length: int = 512,
         providers: list[str] = ["CPUExecutionProvider"],
+        batch_size: int = 32,
+        embedding_precision: Precision = "float32",
+        token_budget: int = 0,
+        pad_to_multiple_of: Optional[int] = None,
+        session_options: Optional[ort.SessionOptions] = None,
+        optimized_model_dir: Optional[str] = None,
+        quantization: ModelQuantization = "none",
     ) -> None:
         """
         Initialize the EmbeddingEngine with the given model ID.
 
-        The model will be downloaded from the Hugging Face Hub and stored
-        in the local directory specified by model_dir.
+        The model is loaded from model_dir, without network access, when
+        it was fetched there with `python -m FastEmbed.cli fetch-model`.
+        Otherwise it is downloaded from the Hugging Face Hub.
 
         The providers list specifies the providers to use for the ONNX
         inference session. The default is ["CPUExecutionProvider"].
 
         Args:
             model_id (str): The ID of the model.
-            model_dir (str): Local directory to store the model.
+            model_dir (str): The local directory of the fetched model.
             tokenizer_max_length (int, optional):
                 The maximum length of the tokenizer.
                 The input will be truncated to this length.
                 Defaults to 512.
             providers (list[str], optional): The list of providers to use.
                                                 Defaults to ["CPUExecutionProvider"].
+            batch_size (int, optional): The number of texts embedded per
+                inference call when embedding many texts. Defaults to 32.
+            embedding_precision (Precision, optional): The precision of the
+                serialized embeddings, "float32", "float16" or "int8".
+                Defaults to "float32".
+            token_budget (int, optional): The maximum number of padded tokens
+                per inference call when embedding many documents, 0 batches
+                by batch_size only. Defaults to 0.
+            pad_to_multiple_of (Optional[int], optional): Round the padded
+                length up to a multiple of this value.
+            session_options (Optional[ort.SessionOptions], optional): The ONNX
+                Runtime session options.
+            optimized_model_dir (Optional[str], optional): The directory where
+                the optimized model is cached, None disables the cache.
+            quantization (ModelQuantization, optional): "int8" runs the
+                dynamically quantized variant of the model, created on first
+                use. Defaults to "none".
         """
         # Store instance variables
         self._model_id = model_id
         self._model_dir = model_dir
         self._tokenizer_max_length = tokenizer_max_length
         self._providers = providers
-
-        # Download ONNX artifacts
-        self._model_path = hf_hub_download(
-            self._model_id, subfolder="onnx", filename="model.onnx"
+        self._batch_size = batch_size
+        self._embedding_precision = embedding_precision
+        self._token_budget = token_budget
+        self._pad_to_multiple_of = pad_to_multiple_of
+        self._quantization = quantization
+
+        # Number of real and padded tokens sent to the model
+        self._token_count = 0
+        self._padded_token_count = 0
+
+        # Locate the ONNX artifacts and tokenizer, in model_dir or on the hub
+        self._model_path, tokenizer_path = resolve_model_files(
+            self._model_id, self._model_dir
         )
-        hf_hub_download(self._model_id, subfolder="onnx", filename="model.onnx_data")
+        if quantization == "int8":
+            self._model_path = quantize_model(self._model_path)
 
         # Create an ONNX session and tokenizer
-        self._session = ort.InferenceSession(
-            self._model_path, providers=self._providers
+        self._session = self._create_session(session_options, optimized_model_dir)
+        self._tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+
+    def _create_session(
+        self,
+        session_options: Optional[ort.SessionOptions],
+        optimized_model_dir: Optional[str],
+    ) -> Optional[ort.InferenceSession]:
+        return create_inference_session(
+            self._model_path,
+            self._providers,
+            session_options=session_options,
+            optimized_model_dir=optimized_model_dir,
+        )
+
+    def close(self) -> None:
+        """Release the resources of the engine."""
+
+    @property
+    def model_id(self) -> str:
+        """The ID of the embedding model."""
+        return self._model_id
+
+    @property
+    def quantization(self) -> ModelQuantization:
+        """The quantization of the model, "none" or "int8"."""
+        return self._quantization
+
+    @property
+    def embedding_precision(self) -> Precision:
+        """The precision of the serialized embeddings."""
+        return self._embedding_precision
+
+    @property
+    def dim(self) -> int:
+        """The dimension of the embeddings."""
+        dim = self._session.get_outputs()[1].shape[-1]
+        if not isinstance(dim, int):
+            # Symbolic output dimension, embed a text to find it
+            dim = self._embed_texts(["dimension"]).shape[1]
+        return dim
+
+    @property
+    def batch_size(self) -> int:
+        """The default number of texts per inference call."""
+        return self._batch_size
+
+    @property
+    def tokenizer(self) -> PreTrainedTokenizerBase:
+        return self._tokenizer
+
+    def max_document_tokens(self, title: str = "none") -> int:
+        """
+        Get the number of document text tokens embedded without truncation.
+
+        Args:
+            title (str, optional): The document title to use for embedding.
+                Defaults to "none".
+
+        Returns:
+            int: The model window minus the special and prefix tokens.
+        """
+        prefix_tokens = self._tokenizer(
+            self.document_prefix(title), add_special_tokens=False
+        )["input_ids"]
+        return (
+            self._tokenizer_max_length
+            - self._tokenizer.num_special_tokens_to_add()
+            - len(prefix_tokens)
         )
-        self._tokenizer = AutoTokenizer.from_pretrained(self._model_id)
 
     def _embed_text(self, text: str) -> np.ndarray:
         """
@@ -71,22 +186,94 @@ class EmbeddingEngine:
         Returns:
             np.ndarray: The embedded array of the text.
         """
-        inputs = self._tokenizer(
-            text,
-            padding=True,
-            truncation=True,
-            max_length=self._tokenizer_max_length,
-            return_tensors="np",
-        )
+        return self._embed_texts([text])
 
-        output = self._session.run(None, inputs.data)
-        embedding = output[1].astype(np.float32)
+    def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a batch of texts with a single ONNX inference call.
 
-        return embedding
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            np.ndarray: The embedded arrays of the texts, one row per text.
+        """
+        with metrics.timer("tokenize"):
+            inputs = self._tokenizer(
+                texts,
+                padding=True,
+                truncation=True,
+                max_length=self._tokenizer_max_length,
+                pad_to_multiple_of=self._pad_to_multiple_of,
+                return_tensors="np",
+            )
+
+        return self._run_session(inputs.data)
+
+    def _run_session(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Run the ONNX model on a padded batch of tokenized texts.
+
+        Args:
+            inputs (Dict[str, np.ndarray]): The model inputs.
+
+        Returns:
+            np.ndarray: The embedded arrays of the texts, one row per text.
+        """
+        token_count = int(inputs["attention_mask"].sum())
+        padded_token_count = inputs["attention_mask"].size
+        self._token_count += token_count
+        self._padded_token_count += padded_token_count
+
+        with metrics.timer("inference"):
+            output = self._session.run(None, inputs)
+        embeddings = output[1].astype(np.float32)
+
+        metrics.observe_batch_size(len(embeddings))
+        metrics.increment("tokens_embedded_total", token_count)
+        metrics.increment("padded_tokens_embedded_total", padded_token_count)
+
+        return embeddings
+
+    def padding_stats(self) -> Dict[str, float]:
+        """
+        Get the number of real and padded tokens sent to the model.
+
+        Returns:
+            Dict[str, float]: The token counts and the fraction of padding.
+        """
+        token_count = self._token_count
+        padded_token_count = self._padded_token_count
+        return {
+            "tokens": token_count,
+            "padded_tokens": padded_token_count,
+            "padding_ratio": (
+                1 - token_count / padded_token_count if padded_token_count else 0.0
+            ),
+        }
+
+    def warmup(self, shapes: Iterable[Tuple[int, int]]) -> None:
+        """
+        Run the model once per batch shape, before serving requests.
+
+        The first runs of a shape pay for the memory allocation and kernel
+        selection of ONNX Runtime. Warmup runs are not counted in the
+        padding stats.
+
+        Args:
+            shapes (Iterable[Tuple[int, int]]): The batch sizes and sequence
+                lengths, in tokens, to run.
+        """
+        for batch_size, sequence_length in shapes:
+            self._embed_texts(warmup_texts(batch_size, sequence_length))
+
+        self._token_count = 0
+        self._padded_token_count = 0
 
     def serialize_embedding(self, embedding_array: np.ndarray) -> bytes:
         """
-        Serialize the given embedding array into bytes.
+        Serialize the given embedding array into bytes,
+        in the embedding precision of the engine.
 
         Args:
             embedding_array (np.ndarray): The embedding array to serialize.
@@ -94,11 +281,11 @@ class EmbeddingEngine:
         Returns:
             bytes: The serialized embedding array.
         """
-        return embedding_array.astype(np.float32).tobytes()
+        return encode_embedding(embedding_array, self._embedding_precision)
 
     def deserialize_embedding(self, embedding_binary: bytes) -> np.ndarray:
         """
-        Deserialize the given embedding bytes into a numpy array.
+        Deserialize the given embedding bytes into a float32 numpy array.
 
         Args:
             embedding_binary (bytes): The serialized embedding bytes.
@@ -106,7 +293,7 @@ class EmbeddingEngine:
         Returns:
             np.ndarray: The deserialized embedding array.
         """
-        return np.frombuffer(embedding_binary, dtype=np.float32)
+        return decode_embedding(embedding_binary, self._embedding_precision)
 
     def embed_query_text(self, query_text: str) -> np.ndarray:
         """
@@ -120,6 +307,20 @@ class EmbeddingEngine:
         """
         return self._embed_text(self.PREFIXES["query"] + query_text)
 
+    def embed_queries(self, query_texts: List[str]) -> np.ndarray:
+        """
+        Embed many query texts with a single inference call.
+
+        Args:
+            query_texts (List[str]): The query texts to embed.
+
+        Returns:
+            np.ndarray: The embedded arrays of the queries, one row per query.
+        """
+        return self._embed_texts(
+            [self.PREFIXES["query"] + query_text for query_text in query_texts]
+        )
+
     def embed_document_text(
         self, document_text: str, document_title: str = "none"
     ) -> np.ndarray:
@@ -134,8 +335,126 @@ class EmbeddingEngine:
         Returns:
             np.ndarray: The embedded array of the document.
         """
-        prefix = self.PREFIXES["document"].format(title=document_title)
-        return self._embed_text(prefix + document_text)
+        return self._embed_text(self.document_prefix(document_title) + document_text)
+
+    def document_prefix(self, document_title: str = "none") -> str:
+        """
+        Get the prefix prepended to document texts before embedding.
+
+        Args:
+            document_title (str, optional): The document title. Defaults to "none".
+
+        Returns:
+            str: The document prefix.
+        """
+        return self.PREFIXES["document"].format(title=document_title)
+
+    def embed_documents(
+        self,
+        texts: List[str],
+        title: str = "none",
+        batch_size: Optional[int] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> np.ndarray:
+        """
+        Embed many document texts, running the model in batches.
+
+        Args:
+            texts (List[str]): The document texts to embed.
+            title (str, optional): The document title to use for embedding.
+                Defaults to "none".
+            batch_size (Optional[int], optional): The number of texts per
+                inference call. Defaults to the engine batch size.
+            progress_callback (Optional[ProgressCallback], optional): Called
+                with the number of embedded texts out of the total after
+                every inference call.
+
+        Returns:
+            np.ndarray: The embedded arrays of the texts, one row per text.
+        """
+        batch_size = batch_size or self._batch_size
+        prefix = self.document_prefix(title)
+        prefixed_texts = [prefix + text for text in texts]
+
+        if not prefixed_texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        if not self._token_budget:
+            batches = []
+            for start in range(0, len(prefixed_texts), batch_size):
+                batches.append(
+                    self._embed_texts(prefixed_texts[start : start + batch_size])
+                )
+                if progress_callback:
+                    progress_callback(
+                        min(start + batch_size, len(prefixed_texts)),
+                        len(prefixed_texts),
+                    )
+            return np.concatenate(batches)
+
+        # Tokenize once, then batch texts of similar length together
+        with metrics.timer("tokenize"):
+            encodings = self._tokenizer(
+                prefixed_texts, truncation=True, max_length=self._tokenizer_max_length
+            )
+        lengths = np.array([len(input_ids) for input_ids in encodings["input_ids"]])
+        order = np.argsort(lengths, kind="stable")
+
+        embeddings = None
+        embedded_count = 0
+        for bucket in self._length_buckets(lengths[order], batch_size):
+            rows = order[bucket]
+            with metrics.timer("tokenize"):
+                inputs = self._tokenizer.pad(
+                    {
+                        name: [values[row] for row in rows]
+                        for name, values in encodings.items()
+                    },
+                    padding=True,
+                    pad_to_multiple_of=self._pad_to_multiple_of,
+                    return_tensors="np",
+                )
+            bucket_embeddings = self._run_session(dict(inputs))
+
+            # Restore the order of the texts
+            if embeddings is None:
+                embeddings = np.empty(
+                    (len(prefixed_texts), bucket_embeddings.shape[1]), dtype=np.float32
+                )
+            embeddings[rows] = bucket_embeddings
+
+            embedded_count += len(rows)
+            if progress_callback:
+                progress_callback(embedded_count, len(prefixed_texts))
+
+        return embeddings
+
+    def _length_buckets(
+        self, sorted_lengths: np.ndarray, batch_size: int
+    ) -> Iterator[slice]:
+        """
+        Split texts sorted by token length into batches under the token budget.
+
+        Args:
+            sorted_lengths (np.ndarray): The token lengths, in ascending order.
+            batch_size (int): The maximum number of texts per batch.
+
+        Yields:
+            slice: The positions of the batch texts in sorted_lengths.
+        """
+        multiple = self._pad_to_multiple_of or 1
+        start = 0
+        for end in range(1, len(sorted_lengths) + 1):
+            # Every text of the batch is padded to the length of the last one
+            padded_length = -(-int(sorted_lengths[end - 1]) // multiple) * multiple
+            if end - start > 1 and (
+                end - start > batch_size
+                or (end - start) * padded_length > self._token_budget
+            ):
+                yield slice(start, end - 1)
+                start = end - 1
+
+        yield slice(start, len(sorted_lengths))
 
     def _compute_similarity(
         self, query_embedding_array: np.ndarray, documents_embeddings_array: np.ndarray
@@ -169,11 +488,12 @@ class EmbeddingEngine:
             Tuple[np.ndarray, np.ndarray]:
                 The similarity scores and the indices of the ranked documents.
         """
-        similarity_scores = self._compute_similarity(
-            query_embedding, documents_embeddings
-        )[0]
+        with metrics.timer("rank"):
+            similarity_scores = self._compute_similarity(
+                query_embedding, documents_embeddings
+            )[0]
 
-        sorted_indices = np.argsort(-similarity_scores)[:k]
+            sorted_indices = np.argsort(-similarity_scores)[:k]
 
         return similarity_scores[sorted_indices], sorted_indices
 
@@ -188,21 +508,91 @@ class EmbeddingEngine:
         return similarity_scores[sorted_indices], sorted_indices
 
 
+def warmup_texts(batch_size: int, sequence_length: int) -> List[str]:
+    """Build a batch of texts of about sequence_length tokens."""
+    return [" ".join([WARMUP_WORD] * sequence_length)] * batch_size
+
+
 embedding_engine = None
+embedding_engine_lock = threading.Lock()
+
+
+def engine_settings() -> Dict[str, Any]:
+    """Get the EmbeddingEngine arguments set in the settings, but session_options."""
+    return dict(
+        model_id=Config.MODEL_ID,
+        model_dir=Config.MODEL_DIR,
+        providers=Config.MODEL_PROVIDERS,
+        tokenizer_max_length=Config.TOKENIZER_MAX_LENGTH,
+        batch_size=Config.EMBEDDING_BATCH_SIZE,
+        token_budget=Config.EMBEDDING_TOKEN_BUDGET,
+        pad_to_multiple_of=Config.EMBEDDING_PAD_TO_MULTIPLE_OF or None,
+        embedding_precision=Config.EMBEDDING_PRECISION,
+        optimized_model_dir=Config.ORT_OPTIMIZED_MODEL_DIR or None,
+        quantization=Config.MODEL_QUANTIZATION,
+    )
+
+
+def session_settings() -> Dict[str, Any]:
+    """Get the ONNX Runtime session options set in the settings."""
+    return dict(
+        intra_op_num_threads=Config.ORT_INTRA_OP_NUM_THREADS,
+        inter_op_num_threads=Config.ORT_INTER_OP_NUM_THREADS,
+        execution_mode=Config.ORT_EXECUTION_MODE,
+        graph_optimization_level=Config.ORT_GRAPH_OPTIMIZATION_LEVEL,
+        enable_cpu_mem_arena=Config.ORT_ENABLE_CPU_MEM_ARENA,
+        enable_mem_pattern=Config.ORT_ENABLE_MEM_PATTERN,
+    )
+
+
+def create_embedding_engine(**overrides) -> EmbeddingEngine:
+    """
+    Create an embedding engine configured from the settings.
+
+    Args:
+        **overrides: EmbeddingEngine arguments replacing the settings.
+
+    Returns:
+        EmbeddingEngine: The embedding engine.
+    """
+    options = engine_settings()
+    options["session_options"] = create_session_options(**session_settings())
+    options.update(overrides)
+    return EmbeddingEngine(**options)
 
 
 def get_embedding_engine() -> EmbeddingEngine:
-    """Get the embedding engine singleton instance."""
+    """
+    Get the embedding engine singleton instance, loading it on first use.
+
+    With EMBEDDING_WORKERS set, the instance is a pool of worker processes
+    with the same API.
+    """
     global embedding_engine
-    if embedding_engine is None:
-        embedding_engine = EmbeddingEngine(
-            model_id=Config.MODEL_ID,
-            model_dir=Config.MODEL_DIR,
-            providers=Config.MODEL_PROVIDERS,
-            tokenizer_max_length=Config.TOKENIZER_MAX_LENGTH,
-        )
+    # Concurrent first requests load the model once
+    with embedding_engine_lock:
+        if embedding_engine is None:
+            if Config.EMBEDDING_WORKERS > 0:
+                # The pool module depends on this one
+                from FastEmbed.core.inference_pool import create_embedding_pool
+
+                embedding_engine = create_embedding_pool()
+            else:
+                embedding_engine = create_embedding_engine()
     return embedding_engine
 
 
 def init_embedding_engine() -> EmbeddingEngine:
-    return get_embedding_engine()
+    """Load the embedding engine singleton and warm it up."""
+    engine = get_embedding_engine()
+    engine.warmup(Config.EMBEDDING_WARMUP_SHAPES)
+
+    # Warmup runs are not traffic, the metrics of other requests are kept
+    metrics.reset_engine()
+    return engine
+
+
+def close_embedding_engine() -> None:
+    """Release the embedding engine singleton instance resources."""
+    if embedding_engine is not None:
+        embedding_engine.close()
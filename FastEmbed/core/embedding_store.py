@@ -0,0 +1,425 @@
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from sqlmodel import Session, select
+
+from FastEmbed.QAnswers.models.document import DocumentChunk
+from FastEmbed.config import Config
+from FastEmbed.core.precision import (
+    Precision,
+    check_embedding_sizes,
+    decode_embeddings,
+)
+
+HEADER_FILENAME = "header.json"
+IDS_FILENAME = "ids.bin"
+EMBEDDINGS_FILENAME = "embeddings.bin"
+SCALES_FILENAME = "scales.bin"
+
+FORMAT_VERSION = 1
+
+EMBEDDING_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+    "int8": np.dtype("i1"),
+}
+ID_DTYPE = np.dtype("<i8")
+SCALE_DTYPE = np.dtype("<f4")
+
+# Number of missing chunk embeddings read from the database per query
+SYNC_BATCH_SIZE = 500
+
+StoreData = Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]
+
+# The chunk IDs, the mapped columns and the rows of the IDs in them
+SyncedStoreData = Tuple[
+    np.ndarray, np.ndarray, Optional[np.ndarray], Optional[np.ndarray]
+]
+
+
+class EmbeddingStore:
+    """
+    Append-only memory-mapped store of the chunk embeddings.
+
+    The store is a directory holding a small JSON header with the dimension,
+    storage precision and model ID, and fixed-width columns: the chunk IDs,
+    the embeddings matrix in the storage precision and, for int8, the
+    per-row scales. Columns are memory-mapped when read, so loading the
+    index does not copy the embeddings.
+
+    SQLite stays the source of truth: rows of deleted chunks are left in the
+    store until it is compacted, and chunks missing from the store, such as
+    the ones of an interrupted ingest, are appended again at startup.
+
+    SQLite reuses the IDs of deleted chunks, so the last row of an ID wins
+    and removing chunks appends tombstones, rows with the negated chunk ID.
+    """
+
+    def __init__(self, path: str, precision: Precision, model_id: str) -> None:
+        """
+        Initialize the EmbeddingStore.
+
+        Args:
+            path (str): The store directory.
+            precision (Precision): The storage precision of the embeddings.
+            model_id (str): The ID of the model the embeddings come from.
+        """
+        self._path = path
+        self._precision = precision
+        self._model_id = model_id
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def precision(self) -> Precision:
+        return self._precision
+
+    def header(self) -> Optional[Dict[str, Any]]:
+        """Read the store header, None if the store does not exist."""
+        try:
+            with open(self._file_path(HEADER_FILENAME), encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def is_compatible(self, dim: Optional[int] = None) -> bool:
+        """Check that the store was written with the same settings."""
+        header = self.header()
+        return (
+            header is not None
+            and header["version"] == FORMAT_VERSION
+            and header["precision"] == self._precision
+            and header["model_id"] == self._model_id
+            and (dim is None or header["dim"] == dim)
+        )
+
+    def reset(self, dim: int) -> None:
+        """
+        Remove every row and write a new header.
+
+        Args:
+            dim (int): The embedding dimension.
+        """
+        with self._lock:
+            _write_columns(
+                self._path,
+                {"dim": dim, "precision": self._precision, "model_id": self._model_id},
+                np.empty(0, dtype=ID_DTYPE),
+                np.empty((0, dim), dtype=EMBEDDING_DTYPES[self._precision]),
+                np.empty(0, dtype=SCALE_DTYPE),
+            )
+
+    def append(
+        self,
+        ids: np.ndarray,
+        embeddings: np.ndarray,
+        scales: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Append rows to the store, created on the first call.
+
+        The embedding columns are synced to disk before the IDs, so a crash
+        can only leave rows without an ID, which are ignored.
+
+        Args:
+            ids (np.ndarray): The chunk IDs.
+            embeddings (np.ndarray): The embeddings in the storage precision.
+            scales (Optional[np.ndarray], optional): The per-row int8 scales.
+        """
+        if len(ids) == 0:
+            return
+
+        dim = embeddings.shape[1]
+        if not self.is_compatible():
+            self.reset(dim)
+        elif self.header()["dim"] != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match the store")
+
+        with self._lock:
+            columns = [
+                (EMBEDDINGS_FILENAME, embeddings, EMBEDDING_DTYPES[self._precision])
+            ]
+            if self._precision == "int8":
+                columns.append((SCALES_FILENAME, scales, SCALE_DTYPE))
+            columns.append((IDS_FILENAME, ids, ID_DTYPE))
+
+            for filename, values, dtype in columns:
+                with open(self._file_path(filename), "ab") as file:
+                    file.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                    file.flush()
+                    os.fsync(file.fileno())
+
+    def read(self) -> StoreData:
+        """
+        Memory-map the store columns, without copying them.
+
+        Returns:
+            StoreData: The chunk IDs, the embeddings in the storage precision
+                and the per-row int8 scales.
+        """
+        dtype = EMBEDDING_DTYPES[self._precision]
+        header = self.header()
+        if header is None:
+            return (
+                np.empty(0, dtype=ID_DTYPE),
+                np.empty((0, 0), dtype=dtype),
+                np.empty(0, dtype=SCALE_DTYPE) if self._precision == "int8" else None,
+            )
+
+        dim = header["dim"]
+        n_rows = self._row_count(dim)
+        ids = self._map(IDS_FILENAME, ID_DTYPE, (n_rows,))
+        embeddings = self._map(EMBEDDINGS_FILENAME, dtype, (n_rows, dim))
+        scales = None
+        if self._precision == "int8":
+            scales = self._map(SCALES_FILENAME, SCALE_DTYPE, (n_rows,))
+        return ids, embeddings, scales
+
+    def remove(self, ids: np.ndarray) -> None:
+        """
+        Mark chunks as removed by appending a tombstone row for every ID.
+
+        Args:
+            ids (np.ndarray): The IDs of the removed chunks.
+        """
+        header = self.header()
+        if len(ids) == 0 or header is None or not self.is_compatible():
+            return
+
+        ids = np.asarray(ids, dtype=np.int64)
+        dtype = EMBEDDING_DTYPES[self._precision]
+        self.append(
+            -ids,
+            np.zeros((len(ids), header["dim"]), dtype=dtype),
+            np.zeros(len(ids), dtype=SCALE_DTYPE),
+        )
+
+    def clear(self) -> None:
+        """Remove every row, open memory maps keep reading the old files."""
+        header = self.header()
+        if header is None:
+            return
+
+        self._replace_columns(
+            header,
+            np.empty(0, dtype=ID_DTYPE),
+            np.empty((0, header["dim"]), dtype=EMBEDDING_DTYPES[header["precision"]]),
+            np.empty(0, dtype=SCALE_DTYPE),
+        )
+
+    def truncate_partial_rows(self) -> None:
+        """Drop the trailing bytes left by an interrupted append."""
+        header = self.header()
+        if header is None:
+            return
+
+        with self._lock:
+            n_rows = self._row_count(header["dim"])
+            for filename, row_size in self._row_sizes(header["dim"]).items():
+                with open(self._file_path(filename), "ab") as file:
+                    file.truncate(n_rows * row_size)
+
+    def compact(self, ids: np.ndarray) -> int:
+        """
+        Rewrite the store with only the given chunk IDs, sorted by ID.
+
+        The compacted columns are written to a new directory which then
+        replaces the store, open memory maps keep reading the old files.
+        Rows appended while compacting are dropped, the next startup appends
+        them again from the database.
+
+        Args:
+            ids (np.ndarray): The IDs of the chunks to keep.
+
+        Returns:
+            int: The number of removed rows.
+        """
+        header = self.header()
+        if header is None:
+            return 0
+
+        store_ids, embeddings, scales = self.read()
+        rows = _live_rows(store_ids, ids)
+        self._replace_columns(
+            header,
+            store_ids[rows],
+            embeddings[rows],
+            None if scales is None else scales[rows],
+        )
+
+        return len(store_ids) - len(rows)
+
+    def _replace_columns(
+        self,
+        header: Dict[str, Any],
+        ids: np.ndarray,
+        embeddings: np.ndarray,
+        scales: Optional[np.ndarray],
+    ) -> None:
+        """Write the columns to a new directory which then replaces the store."""
+        temporary_path = f"{self._path}.{os.getpid()}.tmp"
+        _write_columns(temporary_path, header, ids, embeddings, scales)
+
+        with self._lock:
+            old_path = f"{self._path}.{os.getpid()}.old"
+            os.replace(self._path, old_path)
+            os.replace(temporary_path, self._path)
+            shutil.rmtree(old_path)
+
+    def _row_count(self, dim: int) -> int:
+        return min(
+            os.path.getsize(self._file_path(filename)) // row_size
+            for filename, row_size in self._row_sizes(dim).items()
+        )
+
+    def _row_sizes(self, dim: int) -> Dict[str, int]:
+        row_sizes = {
+            IDS_FILENAME: ID_DTYPE.itemsize,
+            EMBEDDINGS_FILENAME: dim * EMBEDDING_DTYPES[self._precision].itemsize,
+        }
+        if self._precision == "int8":
+            row_sizes[SCALES_FILENAME] = SCALE_DTYPE.itemsize
+        return row_sizes
+
+    def _map(self, filename: str, dtype: np.dtype, shape: Tuple[int, ...]):
+        if 0 in shape:
+            return np.empty(shape, dtype=dtype)
+
+        # A plain ndarray view of the mapping, results are not memmaps
+        return np.asarray(
+            np.memmap(self._file_path(filename), dtype=dtype, mode="r", shape=shape)
+        )
+
+    def _file_path(self, filename: str) -> str:
+        return os.path.join(self._path, filename)
+
+
+def _write_columns(
+    path: str,
+    header: Dict[str, Any],
+    ids: np.ndarray,
+    embeddings: np.ndarray,
+    scales: Optional[np.ndarray],
+) -> None:
+    """Write a complete store directory."""
+    os.makedirs(path, exist_ok=True)
+    ids.astype(ID_DTYPE).tofile(os.path.join(path, IDS_FILENAME))
+    embeddings.tofile(os.path.join(path, EMBEDDINGS_FILENAME))
+    if header["precision"] == "int8":
+        scales.astype(SCALE_DTYPE).tofile(os.path.join(path, SCALES_FILENAME))
+
+    with open(os.path.join(path, HEADER_FILENAME), "w", encoding="utf-8") as file:
+        json.dump({**header, "version": FORMAT_VERSION}, file)
+
+
+def _live_rows(store_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """
+    Get the rows of the given IDs sorted by ID, the last row of every ID.
+
+    Rows of a reused ID are superseded by the later ones, and an ID whose
+    last row is a tombstone has no row.
+    """
+    unique_ids, reversed_rows = np.unique(np.abs(store_ids[::-1]), return_index=True)
+    rows = len(store_ids) - 1 - reversed_rows
+    return rows[(store_ids[rows] > 0) & np.isin(unique_ids, ids)]
+
+
+def stored_chunk_ids(session: Session) -> np.ndarray:
+    """Get the sorted IDs of the chunks with an embedding."""
+    return np.array(
+        session.exec(
+            select(DocumentChunk.id)
+            .where(DocumentChunk.embedding.is_not(None))
+            .order_by(DocumentChunk.id)
+        ).all(),
+        dtype=np.int64,
+    )
+
+
+def sync_embedding_store(
+    store: EmbeddingStore, session: Session, dim: Optional[int] = None
+) -> SyncedStoreData:
+    """
+    Bring the store in line with the database and map its content.
+
+    The store is rebuilt if it was written for another precision, model or
+    dimension, and the chunks missing from it are appended. The returned
+    columns are always the memory-mapped store columns: when some stored
+    rows belong to deleted chunks or are out of ID order, the rows of the
+    chunk IDs are returned instead of copying the live rows.
+
+    Args:
+        store (EmbeddingStore): The embedding store.
+        session (Session): The database session.
+        dim (Optional[int], optional): The embedding dimension of the model,
+            the sizes of the read blobs are checked against it when given.
+
+    Raises:
+        ValueError: If the blobs are not stored in the store precision.
+
+    Returns:
+        SyncedStoreData: The sorted chunk IDs, the embeddings in the storage
+            precision, the per-row int8 scales and the rows of the chunk IDs
+            in them, None when every row belongs to a chunk, in ID order.
+    """
+    chunk_ids = stored_chunk_ids(session)
+    if len(chunk_ids):
+        blob = session.get(DocumentChunk, int(chunk_ids[0])).embedding
+        if dim is not None:
+            check_embedding_sizes([blob], dim, store.precision)
+        embeddings, _ = decode_embeddings([blob], store.precision)
+        if not store.is_compatible(embeddings.shape[1]):
+            store.reset(embeddings.shape[1])
+
+    store.truncate_partial_rows()
+    store_ids, _, _ = store.read()
+    live_ids = store_ids[_live_rows(store_ids, chunk_ids)]
+    missing_ids = np.setdiff1d(chunk_ids, live_ids)
+    for start in range(0, len(missing_ids), SYNC_BATCH_SIZE):
+        batch_ids = missing_ids[start : start + SYNC_BATCH_SIZE].tolist()
+        rows = session.exec(
+            select(DocumentChunk.id, DocumentChunk.embedding)
+            .where(DocumentChunk.id.in_(batch_ids))
+            .order_by(DocumentChunk.id)
+        ).all()
+        blobs = [row[1] for row in rows]
+        if dim is not None:
+            check_embedding_sizes(blobs, dim, store.precision)
+        store.append(
+            np.array([row[0] for row in rows], dtype=np.int64),
+            *decode_embeddings(blobs, store.precision),
+        )
+
+    store_ids, embeddings, scales = store.read()
+    if np.array_equal(store_ids, chunk_ids):
+        return store_ids, embeddings, scales, None
+
+    # Deleted chunks, reused IDs or out of order appends, only select the
+    # live rows, copying them would defeat the memory mapping
+    rows = _live_rows(store_ids, chunk_ids)
+    return store_ids[rows], embeddings, scales, rows
+
+
+embedding_store = None
+
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """
+    Get the embedding store singleton instance.
+
+    Returns None when EMBEDDING_STORE_DIR is not set, the index is then
+    loaded from the database blobs.
+    """
+    global embedding_store
+    if embedding_store is None and Config.EMBEDDING_STORE_DIR:
+        embedding_store = EmbeddingStore(
+            Config.EMBEDDING_STORE_DIR, Config.EMBEDDING_PRECISION, Config.MODEL_ID
+        )
+    return embedding_store
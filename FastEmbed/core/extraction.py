@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import BinaryIO, Deque, Iterator, List, Optional, Tuple
+
+import pdfplumber
+
+from FastEmbed.config import Config
+
+# Number of consecutive pages extracted by a single pool task
+PAGES_PER_TASK = 8
+
+# Number of pool tasks in flight per worker, bounds the extracted text in memory
+TASKS_PER_WORKER = 2
+
+
+def extract_pdf_pages(
+    file: BinaryIO,
+    executor: Optional[ProcessPoolExecutor] = None,
+    max_pending_tasks: int = 4,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Extract the text of a PDF file one page at a time.
+
+    Pages are yielded as soon as they are extracted, so the caller can chunk
+    and embed them without holding the whole document in memory. With an
+    executor, ranges of pages are extracted in parallel worker processes and
+    yielded in page order.
+
+    Args:
+        file (BinaryIO): The PDF file.
+        executor (Optional[ProcessPoolExecutor], optional): The process pool
+            used to extract pages in parallel.
+        max_pending_tasks (int, optional): The maximum number of page ranges
+            extracted ahead of the caller. Defaults to 4.
+
+    Yields:
+        Tuple[int, str]: The 1-based page number and its text, empty for
+            pages without text.
+    """
+    if executor is None:
+        with pdfplumber.open(file) as pdf:
+            for page_number, page in enumerate(pdf.pages, start=1):
+                yield page_number, page.extract_text() or ""
+                # Release the parsed page objects
+                page.close()
+        return
+
+    # Worker processes reopen the PDF from a file path
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as copy:
+        shutil.copyfileobj(file, copy)
+        copy.flush()
+
+        with pdfplumber.open(copy.name) as pdf:
+            n_pages = len(pdf.pages)
+
+        pending: Deque[Tuple[int, Future]] = deque()
+        for start in range(0, n_pages, PAGES_PER_TASK):
+            stop = min(start + PAGES_PER_TASK, n_pages)
+            pending.append(
+                (start, executor.submit(_extract_page_range, copy.name, start, stop))
+            )
+            if len(pending) >= max_pending_tasks:
+                yield from _page_range_texts(*pending.popleft())
+
+        while pending:
+            yield from _page_range_texts(*pending.popleft())
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of the pages [start, stop) of a PDF file."""
+    with pdfplumber.open(path, pages=range(start + 1, stop + 1)) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+def _page_range_texts(start: int, future: Future) -> Iterator[Tuple[int, str]]:
+    for offset, text in enumerate(future.result()):
+        yield start + offset + 1, text
+
+
+def extract_pdf_file_pages(file: BinaryIO) -> Iterator[Tuple[int, str]]:
+    """Extract the pages of a PDF file with the configured process pool."""
+    return extract_pdf_pages(
+        file,
+        get_pdf_executor(),
+        max_pending_tasks=Config.PDF_EXTRACTION_WORKERS * TASKS_PER_WORKER,
+    )
+
+
+pdf_executor = None
+
+
+def get_pdf_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Get the PDF extraction process pool singleton instance.
+
+    Returns None when PDF_EXTRACTION_WORKERS is below 2, pages are then
+    extracted in the calling thread.
+    """
+    global pdf_executor
+    if pdf_executor is None and Config.PDF_EXTRACTION_WORKERS > 1:
+        pdf_executor = ProcessPoolExecutor(max_workers=Config.PDF_EXTRACTION_WORKERS)
+    return pdf_executor
+
+
+def shutdown_pdf_executor() -> None:
+    """Stop the PDF extraction worker processes."""
+    global pdf_executor
+    if pdf_executor is not None:
+        pdf_executor.shutdown()
+        pdf_executor = None
@@ -0,0 +1,379 @@
+import itertools
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import onnxruntime as ort
+
+from FastEmbed.config import Config
+from FastEmbed.core.embedding import (
+    EmbeddingEngine,
+    engine_settings,
+    metrics,
+    session_settings,
+    warmup_texts,
+)
+from FastEmbed.core.jobs import ProgressCallback
+from FastEmbed.core.onnx_session import create_session_options
+
+# Text used to warm up the workers and find the embedding dimension
+WARMUP_TEXT = "warmup"
+
+# Seconds between two checks of the worker processes while waiting for results
+WORKER_POLL_INTERVAL = 0.5
+
+
+class EmbeddingPool(EmbeddingEngine):
+    """
+    Embedding engine running the model in a pool of worker processes.
+
+    Every worker owns its tokenizer and ONNX session, pinned to a fixed
+    number of threads, so tokenization and inference of concurrent calls do
+    not contend for the GIL of the API process. Texts are split across the
+    workers, which write the embeddings straight into a shared memory buffer
+    instead of pickling them back.
+
+    The API is the one of EmbeddingEngine, the API process only keeps the
+    tokenizer, used to count tokens.
+
+    Workers are spawned, as forking the threads of the API process could
+    leave their locks held in the workers. A worker that dies, killed by the
+    OOM killer for instance, fails the pending calls and the pool is started
+    again on the next call.
+    """
+
+    def __init__(
+        self,
+        n_workers: int,
+        threads_per_worker: int = 1,
+        session_settings: Optional[Dict[str, Any]] = None,
+        **engine_options,
+    ) -> None:
+        """
+        Initialize the EmbeddingPool and wait for the workers to load the model.
+
+        Args:
+            n_workers (int): The number of worker processes.
+            threads_per_worker (int, optional): The ONNX Runtime intra-op
+                threads of each worker. Defaults to 1.
+            session_settings (Optional[Dict[str, Any]], optional): The
+                create_session_options arguments of the worker sessions.
+            **engine_options: The EmbeddingEngine arguments, but session_options.
+        """
+        self._n_workers = max(n_workers, 1)
+        self._worker_options = dict(engine_options)
+        self._worker_session_settings = {
+            **(session_settings or {}),
+            "intra_op_num_threads": threads_per_worker,
+            "inter_op_num_threads": 1,
+        }
+        super().__init__(**engine_options)
+
+    def _create_session(
+        self,
+        session_options: Optional[ort.SessionOptions],
+        optimized_model_dir: Optional[str],
+    ) -> None:
+        self._context = multiprocessing.get_context("spawn")
+        self._task_ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._workers: List[multiprocessing.Process] = []
+        self._start_workers()
+
+        return None
+
+    def _start_workers(self) -> None:
+        # Workers share the shared memory tracker of the API process
+        resource_tracker.ensure_running()
+
+        # Queues of crashed workers may be left locked, every start gets new ones
+        tasks = self._context.Queue()
+        results = self._context.Queue()
+        workers = [
+            self._context.Process(
+                target=_run_worker,
+                args=(
+                    tasks,
+                    results,
+                    self._worker_options,
+                    self._worker_session_settings,
+                ),
+                name=f"embedding-worker-{index}",
+                daemon=True,
+            )
+            for index in range(self._n_workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        # Every worker reports the embedding dimension once the model is loaded
+        try:
+            dims = {_wait_result(results, workers)[1] for _ in workers}
+            if any(isinstance(dim, str) for dim in dims):
+                raise RuntimeError(f"Embedding worker failed to start: {dims}")
+        except RuntimeError:
+            _terminate_workers(workers)
+            raise
+        self._dim = dims.pop()
+
+        self._tasks, self._results, self._workers = tasks, results, workers
+        self._result_reader = threading.Thread(
+            target=self._read_results,
+            args=(results, workers),
+            name="embedding-results",
+            daemon=True,
+        )
+        self._result_reader.start()
+
+    @property
+    def dim(self) -> int:
+        """The dimension of the embeddings, reported by the workers."""
+        return self._dim
+
+    def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        return self._dispatch("texts", [texts])
+
+    def warmup(self, shapes: Iterable[Tuple[int, int]]) -> None:
+        """
+        Run the model once per batch shape in the worker processes.
+
+        One batch per worker is queued for every shape, idle workers take
+        them, so every worker is usually warmed up.
+
+        Args:
+            shapes (Iterable[Tuple[int, int]]): The batch sizes and sequence
+                lengths, in tokens, to run.
+        """
+        for batch_size, sequence_length in shapes:
+            texts = warmup_texts(batch_size, sequence_length)
+            self._dispatch("texts", [texts] * self._n_workers)
+
+        self._token_count = 0
+        self._padded_token_count = 0
+
+    def embed_documents(
+        self,
+        texts: List[str],
+        title: str = "none",
+        batch_size: Optional[int] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> np.ndarray:
+        """
+        Embed many document texts, split across the worker processes.
+
+        Args:
+            texts (List[str]): The document texts to embed.
+            title (str, optional): The document title to use for embedding.
+                Defaults to "none".
+            batch_size (Optional[int], optional): The minimum number of texts
+                sent to a worker. Defaults to the engine batch size.
+            progress_callback (Optional[ProgressCallback], optional): Called
+                with the number of embedded texts out of the total as the
+                workers finish their slices.
+
+        Returns:
+            np.ndarray: The embedded arrays of the texts, one row per text.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Contiguous slices keep the length bucketing of the workers effective
+        slice_size = max(
+            batch_size or self._batch_size, -(-len(texts) // self._n_workers)
+        )
+        slices = [
+            texts[start : start + slice_size]
+            for start in range(0, len(texts), slice_size)
+        ]
+        return self._dispatch("documents", slices, title, progress_callback)
+
+    def close(self) -> None:
+        """Stop the worker processes, they are started again on the next call."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+
+        # The result reader may be failing the calls of a crashed worker
+        if workers:
+            for _ in workers:
+                self._tasks.put(None)
+            for worker in workers:
+                worker.join()
+            self._results.put(None)
+            self._result_reader.join()
+
+    def _dispatch(
+        self,
+        method: str,
+        slices: List[List[str]],
+        title: str = "none",
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> np.ndarray:
+        n_texts = sum(len(texts) for texts in slices)
+        buffer = SharedMemory(create=True, size=max(n_texts * self._dim * 4, 1))
+        try:
+            futures = []
+            start = 0
+            with self._lock:
+                if not self._workers:
+                    self._start_workers()
+
+                # Queued with the lock held, a crash fails every queued task
+                for texts in slices:
+                    future = Future()
+                    task_id = next(self._task_ids)
+                    self._pending[task_id] = future
+                    self._tasks.put(
+                        (task_id, method, texts, title, buffer.name, n_texts, start)
+                    )
+                    futures.append(future)
+                    start += len(texts)
+
+            # Worker metrics stay in the workers, the round trip is recorded here
+            with metrics.timer("inference"):
+                completed = 0
+                for texts, future in zip(slices, futures):
+                    token_count, padded_token_count = future.result()
+                    completed += len(texts)
+                    if progress_callback:
+                        progress_callback(completed, n_texts)
+                    self._token_count += token_count
+                    self._padded_token_count += padded_token_count
+                    metrics.increment("tokens_embedded_total", token_count)
+                    metrics.increment(
+                        "padded_tokens_embedded_total", padded_token_count
+                    )
+
+            for texts in slices:
+                metrics.observe_batch_size(len(texts))
+
+            return np.ndarray(
+                (n_texts, self._dim), dtype=np.float32, buffer=buffer.buf
+            ).copy()
+        finally:
+            buffer.close()
+            buffer.unlink()
+
+    def _read_results(
+        self, results: multiprocessing.Queue, workers: List[multiprocessing.Process]
+    ) -> None:
+        while True:
+            try:
+                result = _wait_result(results, workers)
+            except RuntimeError as error:
+                self._fail_workers(workers, error)
+                return
+
+            if result is None:
+                return
+
+            task_id, error, token_counts = result
+            with self._lock:
+                future = self._pending.pop(task_id, None)
+            if future is None:
+                continue
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(token_counts)
+
+    def _fail_workers(
+        self, workers: List[multiprocessing.Process], error: Exception
+    ) -> None:
+        """Stop the workers after a crash and fail the pending calls."""
+        _terminate_workers(workers)
+        with self._lock:
+            if self._workers is workers:
+                self._workers = []
+            pending, self._pending = self._pending, {}
+
+        for future in pending.values():
+            future.set_exception(error)
+
+
+def _wait_result(
+    results: multiprocessing.Queue, workers: List[multiprocessing.Process]
+) -> Any:
+    """Get the next result, raising a RuntimeError once a worker has crashed."""
+    while True:
+        try:
+            return results.get(timeout=WORKER_POLL_INTERVAL)
+        except queue.Empty:
+            for worker in workers:
+                if worker.exitcode not in (None, 0):
+                    raise RuntimeError(
+                        f"Embedding worker {worker.name} exited with code "
+                        f"{worker.exitcode}"
+                    )
+
+
+def _terminate_workers(workers: List[multiprocessing.Process]) -> None:
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        worker.join()
+
+
+def _run_worker(
+    tasks: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    engine_options: Dict[str, Any],
+    worker_session_settings: Dict[str, Any],
+) -> None:
+    """Embed the texts of the tasks until a None task is received."""
+    try:
+        engine = EmbeddingEngine(
+            **engine_options,
+            session_options=create_session_options(**worker_session_settings),
+        )
+        results.put(("ready", engine._embed_texts([WARMUP_TEXT]).shape[1]))
+    except Exception as error:
+        results.put(("ready", repr(error)))
+        return
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+
+        task_id, method, texts, title, buffer_name, n_rows, start = task
+        try:
+            stats = engine.padding_stats()
+            if method == "documents":
+                embeddings = engine.embed_documents(texts, title)
+            else:
+                embeddings = engine._embed_texts(texts)
+
+            buffer = SharedMemory(name=buffer_name)
+            try:
+                output = np.ndarray(
+                    (n_rows, embeddings.shape[1]), dtype=np.float32, buffer=buffer.buf
+                )
+                output[start : start + len(texts)] = embeddings
+                del output
+            finally:
+                buffer.close()
+
+            new_stats = engine.padding_stats()
+            token_counts: Tuple[int, int] = (
+                new_stats["tokens"] - stats["tokens"],
+                new_stats["padded_tokens"] - stats["padded_tokens"],
+            )
+            results.put((task_id, None, token_counts))
+        except Exception as error:
+            results.put((task_id, repr(error), (0, 0)))
+
+
+def create_embedding_pool() -> EmbeddingPool:
+    """Create an embedding pool configured from the settings."""
+    return EmbeddingPool(
+        n_workers=Config.EMBEDDING_WORKERS,
+        threads_per_worker=Config.EMBEDDING_THREADS_PER_WORKER,
+        session_settings=session_settings(),
+        **engine_settings(),
+    )
@@ -0,0 +1,160 @@
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, List, Literal, Optional
+
+from FastEmbed.config import Config
+
+JobStatus = Literal["queued", "running", "completed", "failed"]
+
+# Reports the number of completed items out of the total, None while unknown
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+class Job:
+    """State of a background job, updated by the worker running it."""
+
+    def __init__(self, name: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status: JobStatus = "queued"
+        self.completed = 0
+        self.total: Optional[int] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def report_progress(self, completed: int, total: Optional[int]) -> None:
+        self.completed = completed
+        self.total = total
+
+
+class JobQueue:
+    """
+    Bounded queue of background jobs processed by a pool of worker threads.
+
+    A job is a callable receiving a progress callback. Submitting fails once
+    max_queue_size jobs are waiting, so a burst of uploads is rejected instead
+    of piling up in memory. The state of the last max_finished_jobs finished
+    jobs is kept for status queries.
+    """
+
+    def __init__(
+        self, n_workers: int = 2, max_queue_size: int = 16, max_finished_jobs: int = 256
+    ) -> None:
+        """
+        Initialize the JobQueue, workers are started on the first submit.
+
+        Args:
+            n_workers (int, optional): The number of worker threads. Defaults to 2.
+            max_queue_size (int, optional): The maximum number of waiting jobs.
+                Defaults to 16.
+            max_finished_jobs (int, optional): The number of finished jobs kept
+                for status queries. Defaults to 256.
+        """
+        self._n_workers = max(n_workers, 1)
+        self._max_queue_size = max(max_queue_size, 1)
+        self._max_finished_jobs = max_finished_jobs
+
+        # Bounded by submit, so the stop sentinels never wait for room
+        self._queue: queue.Queue = queue.Queue()
+
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._workers: List[threading.Thread] = []
+
+    def submit(self, name: str, function: Callable[[ProgressCallback], Any]) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            name (str): The job name.
+            function (Callable[[ProgressCallback], Any]): The job, called with
+                a progress callback, its return value is the job result.
+
+        Raises:
+            queue.Full: If the queue is full.
+
+        Returns:
+            Job: The queued job.
+        """
+        job = Job(name)
+        with self._lock:
+            if self._queue.qsize() >= self._max_queue_size:
+                raise queue.Full
+
+            self._start_workers()
+            self._queue.put_nowait((job, function))
+            self._jobs[job.id] = job
+            self._prune_finished_jobs()
+
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID, None if it is unknown or was pruned."""
+        return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        """Stop the workers once the queued jobs are done."""
+        with self._lock:
+            for _ in self._workers:
+                self._queue.put_nowait(None)
+            workers, self._workers = self._workers, []
+
+        for worker in workers:
+            worker.join()
+
+    def _start_workers(self) -> None:
+        while len(self._workers) < self._n_workers:
+            worker = threading.Thread(
+                target=self._run_worker,
+                name=f"job-worker-{len(self._workers)}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _run_worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            job, function = item
+            job.status = "running"
+            try:
+                job.result = function(job.report_progress)
+                job.status = "completed"
+            except Exception as error:
+                job.error = getattr(error, "detail", None) or str(error)
+                job.status = "failed"
+
+    def _prune_finished_jobs(self) -> None:
+        finished_ids = [job.id for job in self._jobs.values() if job.is_finished]
+        n_pruned = max(len(finished_ids) - self._max_finished_jobs, 0)
+        for job_id in finished_ids[:n_pruned]:
+            del self._jobs[job_id]
+
+
+job_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get the ingestion job queue singleton instance."""
+    global job_queue
+    if job_queue is None:
+        job_queue = JobQueue(
+            n_workers=Config.INGESTION_WORKERS,
+            max_queue_size=Config.INGESTION_QUEUE_SIZE,
+        )
+    return job_queue
+
+
+def shutdown_job_queue() -> None:
+    """Wait for the queued ingestion jobs and stop the workers."""
+    if job_queue is not None:
+        job_queue.shutdown()
@@ -0,0 +1,318 @@
+import bisect
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from FastEmbed.config import Config
+
+METRIC_PREFIX = "fastembed"
+
+# Upper bounds, in seconds, of the stage latency histogram buckets
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Upper bounds of the inference batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+COUNTERS = {
+    "texts_embedded_total": "Texts embedded by the model.",
+    "tokens_embedded_total": "Real tokens sent to the model.",
+    "padded_tokens_embedded_total": "Tokens sent to the model, padding included.",
+}
+
+# Stages recorded by the embedding engine, also run by its warmup
+ENGINE_STAGES = ("tokenize", "inference")
+
+GAUGES = {
+    "vector_index_chunks": "Chunk embeddings in the vector index.",
+}
+
+# Stage durations of the current request, in seconds, for Server-Timing
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+# Shared no-op timer of the disabled metrics
+NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket upper bounds."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {self.count}')
+
+        labels = f"{{{labels.rstrip(',')}}}" if labels else ""
+        lines.append(f"{name}_sum{labels} {self.sum}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+class StageTimer:
+    """Context manager recording the duration of a stage."""
+
+    __slots__ = ("_metrics", "_stage", "_start")
+
+    def __init__(self, metrics: "Metrics", stage: str) -> None:
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self) -> "StageTimer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._metrics.observe_stage(self._stage, time.perf_counter() - self._start)
+
+
+class Metrics:
+    """
+    Process-wide latency histograms, counters and gauges of the hot paths.
+
+    Every stage, such as tokenization, inference or ranking, gets its own
+    latency histogram. Stage durations are also added to the timings of the
+    current request, reported in its Server-Timing header. When disabled,
+    timers are a shared no-op context manager and updates return at once.
+
+    The text exposition format of Prometheus is rendered on demand.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        """
+        Initialize the Metrics.
+
+        Args:
+            enabled (bool, optional): Record the metrics. Defaults to True.
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Histogram] = {}
+        self._batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self._counters = {name: 0 for name in COUNTERS}
+        self._gauges = {name: 0.0 for name in GAUGES}
+
+    def timer(self, stage: str) -> ContextManager:
+        """
+        Time a block of code as a stage.
+
+        Args:
+            stage (str): The stage name, the label of its histogram.
+
+        Returns:
+            ContextManager: The stage timer.
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        return StageTimer(self, stage)
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        """Record the duration of a stage."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+        timings = request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def observe_batch_size(self, batch_size: int) -> None:
+        """Record the number of texts of an inference call."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._batch_sizes.observe(batch_size)
+            self._counters["texts_embedded_total"] += batch_size
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Increment one of the COUNTERS."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set one of the GAUGES."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._gauges[name] = value
+
+    def reset(self) -> None:
+        """Forget every recorded value."""
+        with self._lock:
+            self._stages = {}
+            self._batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+            self._counters = {name: 0 for name in COUNTERS}
+            self._gauges = {name: 0.0 for name in GAUGES}
+
+    def reset_engine(self) -> None:
+        """
+        Forget the values recorded by the embedding engine.
+
+        The ENGINE_STAGES, the batch sizes and the COUNTERS are cleared, the
+        other stages and the gauges are kept.
+        """
+        with self._lock:
+            for stage in ENGINE_STAGES:
+                self._stages.pop(stage, None)
+            self._batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+            self._counters = {name: 0 for name in COUNTERS}
+
+    def render(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        with self._lock:
+            name = f"{METRIC_PREFIX}_stage_duration_seconds"
+            lines = [
+                f"# HELP {name} Duration of the request processing stages.",
+                f"# TYPE {name} histogram",
+            ]
+            for stage, histogram in sorted(self._stages.items()):
+                lines += histogram.render(name, f'stage="{stage}",')
+
+            name = f"{METRIC_PREFIX}_inference_batch_size"
+            lines += [
+                f"# HELP {name} Number of texts per inference call.",
+                f"# TYPE {name} histogram",
+                *self._batch_sizes.render(name, ""),
+            ]
+
+            for metrics, help_texts, metric_type in (
+                (self._counters, COUNTERS, "counter"),
+                (self._gauges, GAUGES, "gauge"),
+            ):
+                for metric, value in metrics.items():
+                    name = f"{METRIC_PREFIX}_{metric}"
+                    lines += [
+                        f"# HELP {name} {help_texts[metric]}",
+                        f"# TYPE {name} {metric_type}",
+                        f"{name} {value}",
+                    ]
+
+        return "\n".join(lines) + "\n"
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding the stage durations of a request to its response.
+
+    The Server-Timing header lists the time spent in every stage of the
+    request, in milliseconds, and the total request time.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        metrics = get_metrics()
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        # Threads of sync endpoints run in a copy of the context, sharing the dict
+        timings: Dict[str, float] = {}
+        token = request_timings.set(timings)
+
+        async def send_with_timings(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                entries = [
+                    f"{stage};dur={seconds * 1000:.3f}"
+                    for stage, seconds in timings.items()
+                ]
+                entries.append(f"total;dur={(time.perf_counter() - start) * 1000:.3f}")
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", ", ".join(entries)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            request_timings.reset(token)
+
+
+def run_with_timings(function: Callable, *args) -> Tuple[Any, Dict[str, float]]:
+    """
+    Call a function in a new context, collecting the stage durations it records.
+
+    Used for work shared by several requests, such as a batch of queries.
+
+    Args:
+        function (Callable): The function to call.
+        *args: The function arguments.
+
+    Returns:
+        Tuple[Any, Dict[str, float]]: The function result and the stage
+            durations, in seconds.
+    """
+    timings: Dict[str, float] = {}
+    context = copy_context()
+    context.run(request_timings.set, timings)
+    return context.run(function, *args), timings
+
+
+def add_request_timings(timings: Dict[str, float]) -> None:
+    """Add stage durations recorded in another context to the current request."""
+    current_timings = request_timings.get()
+    if current_timings is not None:
+        for stage, seconds in timings.items():
+            current_timings[stage] = current_timings.get(stage, 0.0) + seconds
+
+
+metrics = None
+
+
+def get_metrics() -> Metrics:
+    """Get the metrics singleton instance."""
+    global metrics
+    if metrics is None:
+        metrics = Metrics(enabled=Config.METRICS_ENABLED)
+    return metrics
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+from huggingface_hub import hf_hub_download
+from transformers import AutoTokenizer
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# ONNX files of the model, relative to the repository and to MODEL_DIR
+MODEL_FILENAME = "onnx/model.onnx"
+MODEL_FILENAMES = [MODEL_FILENAME, "onnx/model.onnx_data"]
+
+# Size of the file chunks read while hashing
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def download_model(model_id: str) -> str:
+    """
+    Download the ONNX model artifacts from the Hugging Face Hub.
+
+    Args:
+        model_id (str): The ID of the model.
+
+    Returns:
+        str: The path of the ONNX model file.
+    """
+    model_path, *_ = [
+        hf_hub_download(model_id, filename=filename) for filename in MODEL_FILENAMES
+    ]
+    return model_path
+
+
+def fetch_model(model_id: str, model_dir: str) -> Dict[str, object]:
+    """
+    Materialize the ONNX files and the tokenizer of a model in a directory.
+
+    The manifest, listing the size, modification time and SHA-256 of every
+    file, is written last, so a directory with a manifest is complete.
+
+    Args:
+        model_id (str): The ID of the model on the Hugging Face Hub.
+        model_dir (str): The directory to write the model to.
+
+    Returns:
+        Dict[str, object]: The manifest.
+    """
+    os.makedirs(os.path.join(model_dir, "onnx"), exist_ok=True)
+    manifest_path = os.path.join(model_dir, MANIFEST_FILENAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    for filename in MODEL_FILENAMES:
+        shutil.copyfile(
+            hf_hub_download(model_id, filename=filename),
+            os.path.join(model_dir, filename),
+        )
+
+    tokenizer_paths = AutoTokenizer.from_pretrained(model_id).save_pretrained(model_dir)
+    return write_manifest(
+        model_dir,
+        model_id,
+        MODEL_FILENAMES
+        + [os.path.relpath(path, model_dir) for path in tokenizer_paths],
+    )
+
+
+def write_manifest(
+    model_dir: str, model_id: str, filenames: List[str]
+) -> Dict[str, object]:
+    """
+    Write the manifest of a model directory.
+
+    Args:
+        model_dir (str): The model directory.
+        model_id (str): The ID of the model.
+        filenames (List[str]): The model files, relative to model_dir.
+            Missing files are skipped.
+
+    Returns:
+        Dict[str, object]: The manifest.
+    """
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "model_id": model_id,
+        "files": {
+            filename: _file_entry(os.path.join(model_dir, filename), hash_file=True)
+            for filename in filenames
+            if os.path.exists(os.path.join(model_dir, filename))
+        },
+    }
+    with open(
+        os.path.join(model_dir, MANIFEST_FILENAME), "w", encoding="utf-8"
+    ) as file:
+        json.dump(manifest, file, indent=2)
+
+    return manifest
+
+
+def read_manifest(model_dir: str) -> Optional[Dict[str, object]]:
+    """Read the manifest of a model directory, None if there is none."""
+    try:
+        with open(os.path.join(model_dir, MANIFEST_FILENAME), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def verify_model_dir(
+    model_dir: str, model_id: Optional[str] = None, full: bool = False
+) -> List[str]:
+    """
+    Check the files of a model directory against its manifest.
+
+    The quick check compares the size and modification time of every file,
+    only files whose modification time changed, e.g. copied without
+    preserving it, are hashed. The full check hashes every file.
+
+    Args:
+        model_dir (str): The model directory.
+        model_id (Optional[str], optional): The expected model ID.
+        full (bool, optional): Hash every file. Defaults to False.
+
+    Returns:
+        List[str]: The problems found, empty if the directory is valid.
+    """
+    manifest = read_manifest(model_dir)
+    if manifest is None:
+        return [f"{MANIFEST_FILENAME} not found in {model_dir}"]
+
+    if manifest["version"] != MANIFEST_VERSION:
+        return [f"Unsupported manifest version {manifest['version']}"]
+
+    problems = []
+    if model_id is not None and manifest["model_id"] != model_id:
+        problems.append(f"Directory holds {manifest['model_id']}, not {model_id}")
+
+    for filename, expected in manifest["files"].items():
+        path = os.path.join(model_dir, filename)
+        if not os.path.exists(path):
+            problems.append(f"{filename} is missing")
+            continue
+
+        actual = _file_entry(path)
+        if actual["size"] != expected["size"]:
+            problems.append(f"{filename} size does not match the manifest")
+        elif (full or actual["mtime_ns"] != expected["mtime_ns"]) and _sha256(
+            path
+        ) != expected["sha256"]:
+            problems.append(f"{filename} checksum does not match the manifest")
+
+    return problems
+
+
+def manifest_entry(path: str) -> Optional[Dict[str, object]]:
+    """
+    Get the manifest entry of a file of a model directory.
+
+    The manifest is looked up in the model directory holding the file, the
+    parent of its "onnx" directory.
+
+    Args:
+        path (str): The path of the model file.
+
+    Returns:
+        Optional[Dict[str, object]]: The size, modification time and SHA-256
+            recorded for the file, None if it is not in a manifest.
+    """
+    path = os.path.abspath(path)
+    model_dir = os.path.dirname(os.path.dirname(path))
+    manifest = read_manifest(model_dir)
+    if manifest is None or manifest["version"] != MANIFEST_VERSION:
+        return None
+
+    filename = os.path.relpath(path, model_dir).replace(os.sep, "/")
+    return manifest["files"].get(filename)
+
+
+def resolve_model_files(model_id: str, model_dir: str) -> Tuple[str, str]:
+    """
+    Locate the ONNX model file and the tokenizer of a model.
+
+    A model directory with a manifest is used without any network access,
+    after a quick check of its files. Otherwise the model is downloaded from
+    the Hugging Face Hub.
+
+    Args:
+        model_id (str): The ID of the model.
+        model_dir (str): The model directory written by fetch_model.
+
+    Returns:
+        Tuple[str, str]: The path of the ONNX model file and the name or
+            path to load the tokenizer from.
+
+    Raises:
+        RuntimeError: If the model directory does not match its manifest.
+    """
+    if not model_dir or read_manifest(model_dir) is None:
+        return download_model(model_id), model_id
+
+    problems = verify_model_dir(model_dir, model_id)
+    if problems:
+        raise RuntimeError(f"Invalid model directory {model_dir}: {problems}")
+
+    return os.path.join(model_dir, MODEL_FILENAME), model_dir
+
+
+def _file_entry(path: str, hash_file: bool = False) -> Dict[str, object]:
+    stat = os.stat(path)
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if hash_file:
+        entry["sha256"] = _sha256(path)
+    return entry
+
+
+def _sha256(path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
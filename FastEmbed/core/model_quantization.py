@@ -0,0 +1,126 @@
+import os
+import time
+from typing import Callable, Dict, List, Literal
+
+import numpy as np
+
+ModelQuantization = Literal["none", "int8"]
+
+# Suffix of the quantized model, saved next to the original model file
+INT8_MODEL_SUFFIX = "_int8.onnx"
+
+
+def quantized_model_path(model_path: str) -> str:
+    """Get the path of the int8 variant of a model file."""
+    return os.path.splitext(model_path)[0] + INT8_MODEL_SUFFIX
+
+
+def quantize_model(model_path: str, overwrite: bool = False) -> str:
+    """
+    Create the dynamically quantized int8 variant of an ONNX model.
+
+    Weights are quantized to int8 ahead of time, activations are quantized
+    at run time, so no calibration data is needed. The variant is written
+    next to the original model and reused by later calls.
+
+    Args:
+        model_path (str): The path of the float32 ONNX model file.
+        overwrite (bool, optional): Quantize again even if the variant
+            already exists. Defaults to False.
+
+    Returns:
+        str: The path of the quantized model file.
+    """
+    output_path = quantized_model_path(model_path)
+    if os.path.exists(output_path) and not overwrite:
+        return output_path
+
+    # Only needed offline, the quantization tools import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    temporary_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        quantize_dynamic(model_path, temporary_path, weight_type=QuantType.QInt8)
+        os.replace(temporary_path, output_path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    return output_path
+
+
+def compare_embeddings(
+    reference_embeddings: np.ndarray, embeddings: np.ndarray
+) -> Dict[str, float]:
+    """
+    Measure how closely embeddings agree with reference embeddings.
+
+    Args:
+        reference_embeddings (np.ndarray): The reference embeddings, one row
+            per text.
+        embeddings (np.ndarray): The embeddings to compare, one row per text.
+
+    Returns:
+        Dict[str, float]: The mean, 5th percentile and minimum cosine
+            similarity between matching rows, and the fraction of texts whose
+            nearest neighbour among the other texts is unchanged.
+    """
+    reference = reference_embeddings / np.linalg.norm(
+        reference_embeddings, axis=1, keepdims=True
+    )
+    compared = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    cosine = np.sum(reference * compared, axis=1)
+
+    def nearest_neighbours(vectors: np.ndarray) -> np.ndarray:
+        similarities = vectors @ vectors.T
+        np.fill_diagonal(similarities, -np.inf)
+        return np.argmax(similarities, axis=1)
+
+    neighbour_agreement = (
+        float(np.mean(nearest_neighbours(reference) == nearest_neighbours(compared)))
+        if len(reference) > 1
+        else 1.0
+    )
+
+    return {
+        "cosine_mean": float(np.mean(cosine)),
+        "cosine_p5": float(np.percentile(cosine, 5)),
+        "cosine_min": float(np.min(cosine)),
+        "nearest_neighbour_agreement": neighbour_agreement,
+    }
+
+
+def measure_throughput(
+    embed_documents: Callable[[List[str]], np.ndarray],
+    texts: List[str],
+    batch_size: int,
+    n_repeats: int = 3,
+) -> Dict[str, float]:
+    """
+    Measure the embedding latency per batch and the throughput.
+
+    Args:
+        embed_documents (Callable[[List[str]], np.ndarray]): The function
+            embedding a batch of texts.
+        texts (List[str]): The texts to embed.
+        batch_size (int): The number of texts per batch.
+        n_repeats (int, optional): The number of passes over the texts.
+            Defaults to 3.
+
+    Returns:
+        Dict[str, float]: The p50 and p99 batch latencies in milliseconds and
+            the number of texts embedded per second.
+    """
+    latencies = []
+    for _ in range(n_repeats):
+        for start in range(0, len(texts), batch_size):
+            batch_start = time.perf_counter()
+            embed_documents(texts[start : start + batch_size])
+            latencies.append(time.perf_counter() - batch_start)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "batch_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "batch_p99_ms": float(np.percentile(latencies_ms, 99)),
+        "texts_per_second": len(texts) * n_repeats / float(np.sum(latencies)),
+    }
@@ -0,0 +1,260 @@
+import hashlib
+import os
+import platform
+import shutil
+from typing import List, Literal, Optional
+
+import onnxruntime as ort
+
+from FastEmbed.core.model_files import manifest_entry
+
+ExecutionMode = Literal["sequential", "parallel"]
+GraphOptimizationLevel = Literal["disable", "basic", "extended", "all"]
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+OPTIMIZED_MODEL_FILENAME = "model.onnx"
+
+# Initializers are stored next to the optimized model, as large models
+# exceed the 2GB protobuf limit
+OPTIMIZED_MODEL_DATA_FILENAME = "model.onnx.data"
+
+# Size of the model file chunks read while hashing
+HASH_CHUNK_SIZE = 1 << 20
+
+# Session options copied before they are changed, config entries cannot be read
+COPIED_SESSION_OPTIONS = (
+    "enable_cpu_mem_arena",
+    "enable_mem_pattern",
+    "enable_mem_reuse",
+    "enable_profiling",
+    "execution_mode",
+    "execution_order",
+    "graph_optimization_level",
+    "inter_op_num_threads",
+    "intra_op_num_threads",
+    "log_severity_level",
+    "log_verbosity_level",
+    "logid",
+    "profile_file_prefix",
+    "use_deterministic_compute",
+)
+
+
+def create_session_options(
+    intra_op_num_threads: int = 0,
+    inter_op_num_threads: int = 0,
+    execution_mode: ExecutionMode = "sequential",
+    graph_optimization_level: GraphOptimizationLevel = "all",
+    enable_cpu_mem_arena: bool = True,
+    enable_mem_pattern: bool = True,
+) -> ort.SessionOptions:
+    """
+    Create ONNX Runtime session options.
+
+    Args:
+        intra_op_num_threads (int, optional): The threads used inside an
+            operator, 0 lets ONNX Runtime choose. Defaults to 0.
+        inter_op_num_threads (int, optional): The threads used to run
+            operators in parallel, 0 lets ONNX Runtime choose. Defaults to 0.
+        execution_mode (ExecutionMode, optional): "sequential" or "parallel".
+            Defaults to "sequential".
+        graph_optimization_level (GraphOptimizationLevel, optional): "disable",
+            "basic", "extended" or "all". Defaults to "all".
+        enable_cpu_mem_arena (bool, optional): Pre-allocate CPU memory in an
+            arena. Defaults to True.
+        enable_mem_pattern (bool, optional): Pre-allocate memory based on the
+            allocations of previous runs. Defaults to True.
+
+    Returns:
+        ort.SessionOptions: The session options.
+    """
+    session_options = ort.SessionOptions()
+    session_options.intra_op_num_threads = intra_op_num_threads
+    session_options.inter_op_num_threads = inter_op_num_threads
+    session_options.execution_mode = EXECUTION_MODES[execution_mode]
+    session_options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[
+        graph_optimization_level
+    ]
+    session_options.enable_cpu_mem_arena = enable_cpu_mem_arena
+    session_options.enable_mem_pattern = enable_mem_pattern
+    return session_options
+
+
+def optimized_model_key(
+    model_path: str, session_options: ort.SessionOptions, providers: List[str]
+) -> str:
+    """
+    Get the cache key of the optimized version of a model.
+
+    The optimized graph depends on the model file and its external data
+    files, named after it, the ONNX Runtime version, the optimization level,
+    the execution providers and the CPU architecture.
+
+    The model files are not read: files of a MODEL_DIR are identified by
+    their manifest checksum, checked at startup, and other files by their
+    path, size and modification time.
+
+    Args:
+        model_path (str): The path of the ONNX model file.
+        session_options (ort.SessionOptions): The session options.
+        providers (List[str]): The execution providers.
+
+    Returns:
+        str: The cache key.
+    """
+    model_dir, model_filename = os.path.split(model_path)
+    data_filenames = sorted(
+        filename
+        for filename in os.listdir(model_dir or ".")
+        if filename.startswith(model_filename) and filename != model_filename
+    )
+
+    model_hash = hashlib.sha256()
+    for filename in [model_filename, *data_filenames]:
+        model_hash.update(filename.encode())
+        model_hash.update(model_file_fingerprint(os.path.join(model_dir, filename)))
+
+    key = "|".join(
+        [
+            model_hash.hexdigest(),
+            ort.__version__,
+            str(session_options.graph_optimization_level),
+            ",".join(providers),
+            platform.machine(),
+        ]
+    )
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def model_file_fingerprint(path: str) -> bytes:
+    """
+    Identify the content of a model file, without reading it when possible.
+
+    Args:
+        path (str): The path of the model file.
+
+    Returns:
+        bytes: The manifest checksum of a MODEL_DIR file, the path, size and
+            modification time of a file outside any manifest, or the SHA-256
+            of a file whose size no longer matches its manifest.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    entry = manifest_entry(path)
+    if entry is None:
+        return f"stat:{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+
+    if entry["size"] == stat.st_size:
+        return f"sha256:{entry['sha256']}".encode()
+
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as model_file:
+        while chunk := model_file.read(HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+    return f"sha256:{file_hash.hexdigest()}".encode()
+
+
+def create_inference_session(
+    model_path: str,
+    providers: List[str],
+    session_options: Optional[ort.SessionOptions] = None,
+    optimized_model_dir: Optional[str] = None,
+) -> ort.InferenceSession:
+    """
+    Create an ONNX Runtime inference session, reusing the optimized model.
+
+    The first boot saves the graph optimized by ONNX Runtime in
+    optimized_model_dir. Later boots load it with graph optimizations
+    disabled, skipping the optimization pass. The given session options are
+    copied before they are changed.
+
+    Args:
+        model_path (str): The path of the ONNX model file.
+        providers (List[str]): The execution providers.
+        session_options (Optional[ort.SessionOptions], optional): The session
+            options, defaults to the ONNX Runtime defaults.
+        optimized_model_dir (Optional[str], optional): The optimized model
+            cache directory, None disables the cache.
+
+    Returns:
+        ort.InferenceSession: The inference session.
+    """
+    session_options = session_options or ort.SessionOptions()
+    if (
+        not optimized_model_dir
+        or session_options.graph_optimization_level
+        == ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+    ):
+        return ort.InferenceSession(
+            model_path, sess_options=session_options, providers=providers
+        )
+
+    cache_path = os.path.join(
+        optimized_model_dir,
+        optimized_model_key(model_path, session_options, providers),
+    )
+    cached_model_path = os.path.join(cache_path, OPTIMIZED_MODEL_FILENAME)
+    session_options = copy_session_options(session_options)
+    if os.path.exists(cached_model_path):
+        session_options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        )
+        return ort.InferenceSession(
+            cached_model_path, sess_options=session_options, providers=providers
+        )
+
+    # Optimize into a temporary directory, then publish it atomically
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(temporary_path, exist_ok=True)
+    except OSError:
+        # Read-only cache, optimize in memory
+        return ort.InferenceSession(
+            model_path, sess_options=session_options, providers=providers
+        )
+
+    session_options.optimized_model_filepath = os.path.join(
+        temporary_path, OPTIMIZED_MODEL_FILENAME
+    )
+    session_options.add_session_config_entry(
+        "session.optimized_model_external_initializers_file_name",
+        OPTIMIZED_MODEL_DATA_FILENAME,
+    )
+    session = ort.InferenceSession(
+        model_path, sess_options=session_options, providers=providers
+    )
+
+    try:
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        # Another process published the same model first
+        shutil.rmtree(temporary_path, ignore_errors=True)
+
+    return session
+
+
+def copy_session_options(session_options: ort.SessionOptions) -> ort.SessionOptions:
+    """
+    Copy session options, which cannot be pickled or copied.
+
+    Args:
+        session_options (ort.SessionOptions): The session options.
+
+    Returns:
+        ort.SessionOptions: New options with the COPIED_SESSION_OPTIONS values.
+    """
+    copied_options = ort.SessionOptions()
+    for name in COPIED_SESSION_OPTIONS:
+        setattr(copied_options, name, getattr(session_options, name))
+    return copied_options
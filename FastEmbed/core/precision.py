@@ -0,0 +1,175 @@
+from typing import List, Literal, Optional, Tuple
+import numpy as np
+
+Precision = Literal["float32", "float16", "int8"]
+
+# Size of the float32 scale stored in front of every int8 embedding
+INT8_SCALE_BYTES = 4
+
+# Size in bytes of an embedding component in every precision
+COMPONENT_BYTES = {"float32": 4, "float16": 2, "int8": 1}
+
+
+def quantize_embeddings(
+    embeddings: np.ndarray, precision: Precision
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Convert float32 embeddings to the storage precision.
+
+    int8 embeddings are scaled per vector so the largest absolute component
+    maps to 127, float embeddings have no scale.
+
+    Args:
+        embeddings (np.ndarray): The (n, dim) float32 embeddings.
+        precision (Precision): The storage precision.
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray]]:
+            The quantized embeddings and the per-vector scales.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if precision == "float32":
+        return np.ascontiguousarray(embeddings), None
+
+    if precision == "float16":
+        return embeddings.astype(np.float16), None
+
+    if precision == "int8":
+        scales = np.abs(embeddings).max(axis=-1, initial=0) / 127
+        scales[scales == 0] = 1
+        values = np.rint(embeddings / scales[..., None]).astype(np.int8)
+        return values, scales.astype(np.float32)
+
+    raise ValueError(f"Unsupported embedding precision: {precision}")
+
+
+def dequantize_embeddings(
+    values: np.ndarray, scales: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Convert quantized embeddings back to float32.
+
+    Args:
+        values (np.ndarray): The quantized embeddings.
+        scales (Optional[np.ndarray], optional): The per-vector int8 scales.
+
+    Returns:
+        np.ndarray: The float32 embeddings.
+    """
+    embeddings = values.astype(np.float32)
+    if scales is not None:
+        embeddings *= scales[..., None]
+    return embeddings
+
+
+def encode_embedding(embedding: np.ndarray, precision: Precision) -> bytes:
+    """
+    Serialize an embedding in the storage precision.
+
+    int8 embeddings are prefixed with their float32 scale.
+
+    Args:
+        embedding (np.ndarray): The float32 embedding.
+        precision (Precision): The storage precision.
+
+    Returns:
+        bytes: The serialized embedding.
+    """
+    values, scales = quantize_embeddings(np.ravel(embedding)[None], precision)
+    if scales is None:
+        return values.tobytes()
+    return scales.tobytes() + values.tobytes()
+
+
+def decode_embeddings(
+    blobs: List[bytes], precision: Precision
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Deserialize same-length embeddings without dequantizing them.
+
+    Args:
+        blobs (List[bytes]): The serialized embeddings.
+        precision (Precision): The storage precision of the blobs.
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray]]:
+            The (n, dim) quantized embeddings and the per-vector scales.
+    """
+    buffer = b"".join(blobs)
+    if precision == "float32":
+        return np.frombuffer(buffer, dtype=np.float32).reshape(len(blobs), -1), None
+
+    if precision == "float16":
+        return np.frombuffer(buffer, dtype=np.float16).reshape(len(blobs), -1), None
+
+    if precision == "int8":
+        dim = len(blobs[0]) - INT8_SCALE_BYTES
+        records = np.frombuffer(
+            buffer, dtype=np.dtype([("scale", "<f4"), ("values", "i1", (dim,))])
+        )
+        return np.ascontiguousarray(records["values"]), records["scale"].copy()
+
+    raise ValueError(f"Unsupported embedding precision: {precision}")
+
+
+def embedding_size(dim: int, precision: Precision) -> int:
+    """Get the size in bytes of a serialized embedding."""
+    size = dim * COMPONENT_BYTES[precision]
+    return size + INT8_SCALE_BYTES if precision == "int8" else size
+
+
+def check_embedding_sizes(blobs: List[bytes], dim: int, precision: Precision) -> None:
+    """
+    Check that serialized embeddings hold dim components in the precision.
+
+    Blobs carry no precision marker, embeddings stored before a change of
+    EMBEDDING_PRECISION would be decoded as garbage.
+
+    Args:
+        blobs (List[bytes]): The serialized embeddings.
+        dim (int): The embedding dimension of the model.
+        precision (Precision): The expected storage precision.
+
+    Raises:
+        ValueError: If a blob has another size.
+    """
+    expected_size = embedding_size(dim, precision)
+    sizes = {len(blob) for blob in blobs} - {expected_size}
+    if not sizes:
+        return
+
+    size = sizes.pop()
+    source_precisions = [
+        source_precision
+        for source_precision in COMPONENT_BYTES
+        if embedding_size(dim, source_precision) == size
+    ]
+    if not source_precisions:
+        raise ValueError(
+            f"Stored embeddings of {size} bytes do not have {dim} components, "
+            "they were computed by another model"
+        )
+
+    raise ValueError(
+        f"Stored embeddings are {source_precisions[0]}, not {precision}. "
+        "Convert them to EMBEDDING_PRECISION with `python -m FastEmbed.cli "
+        f"convert-embeddings --source-precision {source_precisions[0]}`"
+    )
+
+
+def decode_embedding(blob: bytes, precision: Precision) -> np.ndarray:
+    """
+    Deserialize an embedding and dequantize it to float32.
+
+    Args:
+        blob (bytes): The serialized embedding.
+        precision (Precision): The storage precision of the blob.
+
+    Returns:
+        np.ndarray: The float32 embedding.
+    """
+    if precision == "float32":
+        return np.frombuffer(blob, dtype=np.float32)
+
+    values, scales = decode_embeddings([blob], precision)
+    return dequantize_embeddings(values, scales)[0]
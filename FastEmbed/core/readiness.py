@@ -0,0 +1,92 @@
+import threading
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+from FastEmbed.config import Config
+
+# Resources loaded at startup before the application can serve traffic
+COMPONENTS = ("model", "index")
+
+
+class Readiness:
+    """
+    Startup state of the resources needed to serve requests.
+
+    Liveness only tells that the process answers, readiness tells that the
+    embedding model is loaded and warmed up and the vector index is loaded,
+    so traffic can be routed to the instance.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ready = {component: False for component in COMPONENTS}
+        self._error: Optional[str] = None
+
+    def mark_ready(self, component: str) -> None:
+        with self._lock:
+            self._ready[component] = True
+
+    def mark_failed(self, error: Exception) -> None:
+        with self._lock:
+            self._error = repr(error)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ready = {component: False for component in COMPONENTS}
+            self._error = None
+
+    @property
+    def is_ready(self) -> bool:
+        return all(self._ready.values())
+
+    def status(self) -> Dict[str, object]:
+        """
+        Get the readiness of every component.
+
+        Returns:
+            Dict[str, object]: "ready", "loading" or "failed", the readiness
+                of each component and the startup error, if any.
+        """
+        with self._lock:
+            if self._error is not None:
+                status = "failed"
+            elif all(self._ready.values()):
+                status = "ready"
+            else:
+                status = "loading"
+            return {"status": status, **self._ready, "error": self._error}
+
+
+readiness = None
+
+
+def get_readiness() -> Readiness:
+    """Get the readiness singleton instance."""
+    global readiness
+    if readiness is None:
+        readiness = Readiness()
+    return readiness
+
+
+def require_ready() -> None:
+    """
+    Dependency of the routes using the model or the vector index.
+
+    With BACKGROUND_LOADING, requests are served while the resources load:
+    queries would find an empty index and the loaded index would replace
+    the chunks added meanwhile, so these routes answer 503 until ready.
+
+    Raises:
+        HTTPException: 503 while the resources are loading or if they failed.
+    """
+    if not Config.BACKGROUND_LOADING:
+        return
+
+    status = get_readiness().status()
+    if status["status"] != "ready":
+        raise HTTPException(
+            status_code=503,
+            detail=f"The model and the vector index are {status['status']}",
+            headers={"Retry-After": "1"},
+        )
@@ -0,0 +1,36 @@
+from typing import Iterable, Iterator
+
+from fastapi.responses import StreamingResponse
+from sqlmodel import SQLModel
+
+
+def iter_json_array(items: Iterable[SQLModel]) -> Iterator[str]:
+    """
+    Serialize models as a JSON array, one element at a time.
+
+    Args:
+        items (Iterable[SQLModel]): The models to serialize.
+
+    Yields:
+        str: The parts of the JSON array.
+    """
+    separator = "["
+    for item in items:
+        yield separator + item.model_dump_json()
+        separator = ","
+
+    # An empty array still needs its opening bracket
+    yield "]" if separator == "," else "[]"
+
+
+def json_array_response(items: Iterable[SQLModel]) -> StreamingResponse:
+    """
+    Stream models as a JSON array, without holding them all in memory.
+
+    Args:
+        items (Iterable[SQLModel]): The models to stream.
+
+    Returns:
+        StreamingResponse: The streamed JSON response.
+    """
+    return StreamingResponse(iter_json_array(items), media_type="application/json")
@@ -0,0 +1,945 @@
+import os
+import threading
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+import numpy as np
+from sqlmodel import Session, select
+
+from FastEmbed.QAnswers.models.document import DocumentChunk
+from FastEmbed.config import Config
+from FastEmbed.core.ann import IVFIndex
+from FastEmbed.core.embedding_store import get_embedding_store, sync_embedding_store
+from FastEmbed.core.precision import (
+    Precision,
+    check_embedding_sizes,
+    decode_embeddings,
+    dequantize_embeddings,
+    quantize_embeddings,
+)
+
+# Number of quantized rows converted to float32 at once while scoring
+SCORING_BLOCK_SIZE = 16384
+
+
+# Document ID of the chunks loaded without one
+UNKNOWN_DOCUMENT_ID = -1
+
+
+class IndexData(NamedTuple):
+    """
+    Immutable snapshot of the content of an index segment.
+
+    Memory-mapped embeddings and scales are never copied: embedding_rows
+    holds the row of every ID in them, None when they are aligned with the
+    IDs. The other arrays are always aligned with the IDs.
+    """
+
+    ids: np.ndarray
+    document_ids: np.ndarray
+    embeddings: np.ndarray
+    scales: Optional[np.ndarray]
+    prefixes: Optional[np.ndarray] = None
+    prefix_scales: Optional[np.ndarray] = None
+    embedding_rows: Optional[np.ndarray] = None
+
+
+class Partitions(NamedTuple):
+    """Rows of the index grouped by document."""
+
+    document_ids: np.ndarray
+    offsets: np.ndarray
+    rows: np.ndarray
+
+
+class VectorIndex:
+    """
+    Process-resident index of the document chunk embeddings.
+
+    Holds a single contiguous matrix with one row per chunk, stored in the
+    configured precision, and a parallel array with the chunk IDs sorted in
+    ascending order, so ranking a query costs one matrix product instead of
+    a full table scan. Quantized rows are scored against the float32 query
+    without dequantizing the whole matrix.
+
+    An optional IVF index restricts the scored rows to the most promising
+    partitions; exact search is used until it is trained.
+
+    With a truncation dimension, Matryoshka embeddings are ranked in two
+    stages: every row is scored with its renormalized prefix, then only the
+    best candidates are rescored at full dimension.
+
+    Rows are partitioned by document, so a search restricted to some
+    documents only scores the rows of their partitions.
+
+    Memory-mapped embeddings, loaded from the embedding store, stay mapped:
+    removed chunks are only dropped from the row selection and added chunks
+    go to an in-memory tail segment searched alongside the mapped base. They
+    are merged when the store is compacted and mapped again at startup.
+    """
+
+    def __init__(
+        self,
+        precision: Precision = "float32",
+        ann_index: Optional[IVFIndex] = None,
+        truncate_dim: int = 0,
+        candidate_multiplier: int = 4,
+    ) -> None:
+        """
+        Initialize an empty VectorIndex.
+
+        Args:
+            precision (Precision, optional): The storage precision of the
+                embeddings. Defaults to "float32".
+            ann_index (Optional[IVFIndex], optional): The approximate index.
+            truncate_dim (int, optional): The prefix dimension of the first
+                ranking stage, 0 disables two-stage ranking. Defaults to 0.
+            candidate_multiplier (int, optional): The first stage keeps
+                k * candidate_multiplier candidates. Defaults to 4.
+        """
+        # Readers take a snapshot of the data tuple, writers build new
+        # arrays and swap the reference under the lock.
+        self._lock = threading.Lock()
+        self._precision = precision
+        self._truncate_dim = truncate_dim
+        self._candidate_multiplier = max(candidate_multiplier, 1)
+        self._data = self._empty_data()
+        self._tail = self._empty_data()
+        self._ann_index = ann_index
+
+        # Built on the first document-scoped search after every change,
+        # keyed by the document IDs array of the base and tail segments
+        self._partitions: List[Optional[Tuple[np.ndarray, Partitions]]] = [
+            None,
+            None,
+        ]
+
+    def __len__(self) -> int:
+        return len(self._data.ids) + len(self._tail.ids)
+
+    @property
+    def ids(self) -> np.ndarray:
+        """The sorted chunk IDs of every segment."""
+        data, tail = self._data, self._tail
+        if len(tail.ids) == 0:
+            return data.ids
+        return np.sort(np.concatenate([data.ids, tail.ids]))
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """
+        The embeddings matrix of the base segment in the storage precision.
+
+        Memory-mapped embeddings are returned as they were loaded, with
+        the rows of the removed chunks, the added chunks are in the tail.
+        """
+        return self._data.embeddings
+
+    @property
+    def precision(self) -> Precision:
+        return self._precision
+
+    @property
+    def ann_index(self) -> Optional[IVFIndex]:
+        """The approximate nearest neighbour index, if any."""
+        return self._ann_index
+
+    def load(
+        self,
+        ids: Sequence[int],
+        embeddings: np.ndarray,
+        document_ids: Optional[Sequence[int]] = None,
+    ) -> None:
+        """
+        Replace the content of the index.
+
+        Args:
+            ids (Sequence[int]): The chunk IDs.
+            embeddings (np.ndarray): The float32 chunk embeddings, one row per ID.
+            document_ids (Optional[Sequence[int]], optional): The document ID
+                of every chunk.
+        """
+        self._load_data(self._as_data(ids, embeddings, document_ids))
+
+    def load_from_database(self, session: Session, dim: Optional[int] = None) -> None:
+        """
+        Load every stored chunk embedding from the database.
+
+        Only the ID, document ID and embedding columns are fetched, and the
+        blobs are decoded in a single pass, without dequantizing them.
+
+        Args:
+            session (Session): The database session.
+            dim (Optional[int], optional): The embedding dimension of the
+                model, the blob sizes are checked against it when given.
+
+        Raises:
+            ValueError: If the blobs are not stored in the index precision.
+        """
+        rows = session.exec(
+            select(DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.embedding)
+            .where(DocumentChunk.embedding.is_not(None))
+            .order_by(DocumentChunk.id)
+        ).all()
+
+        if not rows:
+            self.clear()
+            return
+
+        blobs = [row[2] for row in rows]
+        if dim is not None:
+            check_embedding_sizes(blobs, dim, self._precision)
+
+        embeddings, scales = decode_embeddings(blobs, self._precision)
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        document_ids = np.array([row[1] for row in rows], dtype=np.int64)
+        self.load_quantized(ids, embeddings, scales, document_ids)
+
+    def load_quantized(
+        self,
+        ids: np.ndarray,
+        embeddings: np.ndarray,
+        scales: Optional[np.ndarray],
+        document_ids: Optional[np.ndarray] = None,
+        embedding_rows: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Replace the content of the index with embeddings in the storage precision.
+
+        The arrays are used as they are, so memory-mapped embeddings are not
+        copied.
+
+        Args:
+            ids (np.ndarray): The chunk IDs.
+            embeddings (np.ndarray): The embeddings in the storage precision.
+            scales (Optional[np.ndarray]): The per-row int8 scales.
+            document_ids (Optional[np.ndarray], optional): The document ID of
+                every chunk.
+            embedding_rows (Optional[np.ndarray], optional): The row of every
+                chunk in the embeddings and scales, defaults to aligned rows.
+        """
+        if len(ids) == 0:
+            self.clear()
+            return
+
+        if embedding_rows is not None and not is_memory_mapped(embeddings):
+            embeddings = embeddings[embedding_rows]
+            scales = None if scales is None else scales[embedding_rows]
+            embedding_rows = None
+
+        prefixes, prefix_scales = None, None
+        if self._truncate_dim:
+            # Only the prefix columns are dequantized to build the first stage
+            prefix_rows = slice(None) if embedding_rows is None else embedding_rows
+            prefixes, prefix_scales = self._quantize_prefixes(
+                dequantize_embeddings(
+                    embeddings[prefix_rows, : self._truncate_dim],
+                    None if scales is None else scales[prefix_rows],
+                )
+            )
+
+        self._load_data(
+            IndexData(
+                ids,
+                _as_document_ids(document_ids, len(ids)),
+                embeddings,
+                scales,
+                prefixes,
+                prefix_scales,
+                embedding_rows,
+            )
+        )
+
+    def add(
+        self,
+        ids: Sequence[int],
+        embeddings: np.ndarray,
+        document_ids: Optional[Sequence[int]] = None,
+    ) -> None:
+        """
+        Append chunk embeddings to the index.
+
+        The embeddings are added to the tail segment when the base is
+        memory-mapped, so the mapping is kept, and to the base otherwise.
+        Trains the approximate index once enough embeddings are available.
+
+        Args:
+            ids (Sequence[int]): The chunk IDs.
+            embeddings (np.ndarray): The float32 chunk embeddings, one row per ID.
+            document_ids (Optional[Sequence[int]], optional): The document ID
+                of every chunk.
+        """
+        new_data = self._as_data(ids, embeddings, document_ids)
+        if len(new_data.ids) == 0:
+            return
+
+        with self._lock:
+            if is_memory_mapped(self._data.embeddings):
+                self._tail = self._concatenate(self._tail, new_data)
+            else:
+                self._data = self._concatenate(self._data, new_data)
+
+            if self._ann_index is not None:
+                if self._ann_index.is_trained:
+                    self._ann_index.add(new_data.embeddings, new_data.ids)
+                elif self._ann_index.can_train(len(self)):
+                    self._ann_index.train(*self._segment_rows())
+
+    def remove(self, ids: Sequence[int]) -> None:
+        """
+        Remove chunk embeddings from the index.
+
+        Args:
+            ids (Sequence[int]): The IDs of the chunks to remove.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            for attribute in ("_data", "_tail"):
+                data = getattr(self, attribute)
+                keep = np.flatnonzero(~np.isin(data.ids, ids))
+                if len(keep) < len(data.ids):
+                    setattr(self, attribute, self._take(data, keep))
+
+            if self._ann_index is not None:
+                self._ann_index.remove(ids)
+
+    def clear(self) -> None:
+        """Remove every embedding from the index."""
+        self._load_data(self._empty_data())
+
+    def set_ann_index(self, ann_index: IVFIndex) -> None:
+        """
+        Use an approximate index, reconciling it with the current content.
+
+        A trained index loaded from disk keeps its centroids but every
+        current embedding is assigned to its lists again: the lists only hold
+        chunk IDs, and SQLite reuses the IDs of deleted chunks. An untrained
+        index is trained if there are enough embeddings.
+
+        Args:
+            ann_index (IVFIndex): The approximate index.
+        """
+        with self._lock:
+            embeddings, ids = self._segment_rows()
+            if (
+                ann_index.is_trained
+                and len(ids)
+                and ann_index.dim != embeddings.shape[1]
+            ):
+                # Trained for another model, start over
+                ann_index = IVFIndex(ann_index.n_lists, ann_index.n_probe)
+
+            if ann_index.is_trained:
+                ann_index.reset()
+                ann_index.add(embeddings, ids)
+            elif ann_index.can_train(len(ids)):
+                ann_index.train(embeddings, ids)
+
+            self._ann_index = ann_index
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        k: int = 5,
+        n_probe: Optional[int] = None,
+        exact: bool = False,
+        document_ids: Optional[Sequence[int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the chunks most similar to the query embedding.
+
+        Args:
+            query_embedding (np.ndarray): The embedding of the query.
+            k (int, optional): The number of chunks to return. Defaults to 5.
+            n_probe (Optional[int], optional): The number of IVF lists to visit,
+                defaults to the n_probe of the approximate index.
+            exact (bool, optional): Score every chunk even if an approximate
+                index is available. Defaults to False.
+            document_ids (Optional[Sequence[int]], optional): Only search the
+                chunks of these documents, scored exactly. Defaults to every
+                document.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]:
+                The similarity scores and the IDs of the best chunks,
+                sorted by descending similarity.
+        """
+        if len(self) == 0 or k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        query_embedding = np.ravel(query_embedding).astype(np.float32)
+
+        ann_index = self._ann_index
+        candidate_ids = None
+        if (
+            document_ids is None
+            and not exact
+            and ann_index is not None
+            and ann_index.is_trained
+        ):
+            # Only score the chunks of the probed IVF lists
+            candidate_ids = ann_index.probe(query_embedding, n_probe)
+
+        return merge_top_k(
+            [
+                self._search_segment(
+                    segment, data, query_embedding, k, candidate_ids, document_ids
+                )
+                for segment, data in enumerate((self._data, self._tail))
+                if len(data.ids)
+            ],
+            k,
+        )
+
+    def _search_segment(
+        self,
+        segment: int,
+        data: IndexData,
+        query_embedding: np.ndarray,
+        k: int,
+        candidate_ids: Optional[np.ndarray],
+        document_ids: Optional[Sequence[int]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the best chunks of one segment, as returned by search."""
+        if document_ids is not None:
+            rows = self._document_rows(segment, data, document_ids)
+        elif candidate_ids is not None:
+            rows = np.searchsorted(data.ids, candidate_ids)
+            found = data.ids[np.minimum(rows, len(data.ids) - 1)] == candidate_ids
+            rows = rows[found]
+        else:
+            rows = None
+
+        if rows is not None and len(rows) == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        if data.prefixes is not None:
+            # Keep the best candidates of the truncated embeddings
+            n_candidates = k * self._candidate_multiplier
+            if n_candidates < (len(data.ids) if rows is None else len(rows)):
+                coarse_scores = score_embeddings(
+                    data.prefixes,
+                    data.prefix_scales,
+                    truncate_embeddings(query_embedding, self._truncate_dim),
+                    rows,
+                )
+                candidates = select_top_k(coarse_scores, n_candidates)
+                rows = candidates if rows is None else rows[candidates]
+
+        similarity_scores = score_rows(data, query_embedding, rows)
+        top_indices = select_top_k(similarity_scores, k)
+        top_rows = top_indices if rows is None else rows[top_indices]
+
+        return similarity_scores[top_indices], data.ids[top_rows]
+
+    def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        k: int = 5,
+        n_probe: Optional[int] = None,
+        exact: bool = False,
+        document_ids: Optional[Sequence[int]] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Find the chunks most similar to each of many query embeddings.
+
+        With exact search, every query is scored with a single product of
+        the query matrix by the embeddings matrix, followed by a per-row top
+        k selection. Queries are searched one by one when an approximate
+        index or two-stage ranking restricts the rows, as every query then
+        scores different rows.
+
+        Args:
+            query_embeddings (np.ndarray): The (n_queries, dim) embeddings.
+            k (int, optional): The number of chunks per query. Defaults to 5.
+            n_probe (Optional[int], optional): The number of IVF lists to visit,
+                defaults to the n_probe of the approximate index.
+            exact (bool, optional): Score every chunk even if an approximate
+                index is available. Defaults to False.
+            document_ids (Optional[Sequence[int]], optional): Only search the
+                chunks of these documents, for every query.
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: The similarity scores and
+                the IDs of the best chunks of every query, sorted by
+                descending similarity, as returned by search.
+        """
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        ann_index = self._ann_index
+        ann_trained = ann_index is not None and ann_index.is_trained
+        if (
+            len(self) == 0
+            or k <= 0
+            or (ann_trained and not exact and document_ids is None)
+            or self._truncate_dim
+        ):
+            return [
+                self.search(
+                    query_embedding,
+                    k=k,
+                    n_probe=n_probe,
+                    exact=exact,
+                    document_ids=document_ids,
+                )
+                for query_embedding in query_embeddings
+            ]
+
+        results = []
+        for segment, data in enumerate((self._data, self._tail)):
+            if len(data.ids) == 0:
+                continue
+
+            rows = None
+            if document_ids is not None:
+                rows = self._document_rows(segment, data, document_ids)
+
+            similarity_scores = score_rows(data, query_embeddings, rows)
+            top_indices = select_top_k(similarity_scores, k)
+            top_rows = top_indices if rows is None else rows[top_indices]
+            results.append(
+                (
+                    np.take_along_axis(similarity_scores, top_indices, axis=-1),
+                    data.ids[top_rows],
+                )
+            )
+
+        return list(zip(*merge_top_k(results, k)))
+
+    def _document_rows(
+        self, segment: int, data: IndexData, document_ids: Sequence[int]
+    ) -> np.ndarray:
+        """Get the sorted rows of the chunks of the given documents."""
+        cached = self._partitions[segment]
+        if cached is not None and cached[0] is data.document_ids:
+            partitions = cached[1]
+        else:
+            partitions = build_partitions(data.document_ids)
+            self._partitions[segment] = (data.document_ids, partitions)
+
+        return partition_rows(partitions, document_ids)
+
+    def _load_data(self, data: IndexData) -> None:
+        if np.any(data.ids[1:] < data.ids[:-1]):
+            data = self._take(data, np.argsort(data.ids, kind="stable"))
+
+        with self._lock:
+            self._data = data
+            self._tail = self._empty_data()
+            if self._ann_index is not None:
+                self._ann_index.reset()
+                self._ann_index.add(*self._segment_rows())
+
+    def _segment_rows(self) -> Tuple["SegmentRows", np.ndarray]:
+        """Get the embeddings and IDs of every segment, without copying them."""
+        segments = [data for data in (self._data, self._tail) if len(data.ids)]
+        ids = [data.ids for data in segments]
+        return SegmentRows(segments), np.concatenate(
+            ids or [np.empty(0, dtype=np.int64)]
+        )
+
+    def _as_data(
+        self,
+        ids: Sequence[int],
+        embeddings: np.ndarray,
+        document_ids: Optional[Sequence[int]] = None,
+    ) -> IndexData:
+        ids_array = np.asarray(ids, dtype=np.int64)
+        if len(ids_array) == 0:
+            return self._empty_data()
+
+        embeddings_array = np.asarray(embeddings, dtype=np.float32)
+        if embeddings_array.shape[0] != len(ids_array):
+            raise ValueError("The number of IDs and embeddings must match")
+
+        return IndexData(
+            ids_array,
+            _as_document_ids(document_ids, len(ids_array)),
+            *quantize_embeddings(embeddings_array, self._precision),
+            *self._quantize_prefixes(embeddings_array),
+        )
+
+    def _empty_data(self) -> IndexData:
+        embeddings = np.empty((0, 0), dtype=np.float32)
+        return IndexData(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            *quantize_embeddings(embeddings, self._precision),
+            *self._quantize_prefixes(embeddings),
+        )
+
+    def _quantize_prefixes(
+        self, embeddings: np.ndarray
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Build the first stage embeddings from float32 embeddings."""
+        if not self._truncate_dim:
+            return None, None
+
+        return quantize_embeddings(
+            truncate_embeddings(embeddings, self._truncate_dim), self._precision
+        )
+
+    def _concatenate(self, data: IndexData, new_data: IndexData) -> IndexData:
+        """Append rows to an in-memory segment, keeping the IDs sorted."""
+        if len(data.ids) == 0:
+            data = new_data
+        else:
+            data = IndexData(
+                *(
+                    None if current is None else np.concatenate([current, new])
+                    for current, new in zip(data, new_data)
+                )
+            )
+
+        # The IDs are only out of order when concurrent uploads finish in a
+        # different order
+        if np.any(data.ids[1:] < data.ids[:-1]):
+            data = self._take(data, np.argsort(data.ids, kind="stable"))
+        return data
+
+    @staticmethod
+    def _take(data: IndexData, rows: np.ndarray) -> IndexData:
+        if not is_memory_mapped(data.embeddings):
+            return IndexData(
+                *(None if array is None else array[rows] for array in data)
+            )
+
+        # Only select the mapped rows, the arrays aligned with the IDs are
+        # in memory
+        return data._replace(
+            **{
+                field: None if array is None else array[rows]
+                for field, array in zip(data._fields, data)
+                if field not in ("embeddings", "scales", "embedding_rows")
+            },
+            embedding_rows=rows
+            if data.embedding_rows is None
+            else data.embedding_rows[rows],
+        )
+
+
+class SegmentRows:
+    """
+    Embeddings of the index segments as one sequence of rows.
+
+    Rows are gathered from the segments when accessed, in increasing order,
+    so the memory-mapped embeddings are not copied as a whole.
+    """
+
+    def __init__(self, segments: Sequence[IndexData]) -> None:
+        self._segments = list(segments)
+        self._offsets = np.cumsum([0] + [len(data.ids) for data in segments])
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        dim = self._segments[0].embeddings.shape[1] if self._segments else 0
+        return len(self), dim
+
+    def __getitem__(self, key: Union[slice, np.ndarray]) -> np.ndarray:
+        if isinstance(key, slice):
+            positions = np.arange(*key.indices(len(self)))
+        else:
+            positions = np.asarray(key)
+        blocks = []
+        for data, start, stop in zip(
+            self._segments, self._offsets[:-1], self._offsets[1:]
+        ):
+            rows = positions[(positions >= start) & (positions < stop)] - start
+            if data.embedding_rows is not None:
+                rows = data.embedding_rows[rows]
+            blocks.append(data.embeddings[rows])
+        return np.concatenate(blocks)
+
+
+def is_memory_mapped(array: np.ndarray) -> bool:
+    """Whether the array is a view of a memory-mapped file."""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def _as_document_ids(
+    document_ids: Optional[Sequence[int]], n_chunks: int
+) -> np.ndarray:
+    if document_ids is None:
+        return np.full(n_chunks, UNKNOWN_DOCUMENT_ID, dtype=np.int64)
+
+    document_ids = np.asarray(document_ids, dtype=np.int64)
+    if len(document_ids) != n_chunks:
+        raise ValueError("The number of IDs and document IDs must match")
+    return document_ids
+
+
+def build_partitions(document_ids: np.ndarray) -> Partitions:
+    """
+    Group the rows of the index by document.
+
+    Args:
+        document_ids (np.ndarray): The document ID of every row.
+
+    Returns:
+        Partitions: The sorted distinct document IDs, the offsets of their
+            rows and the rows ordered by document.
+    """
+    # Rows of a document stay in ID order
+    rows = np.argsort(document_ids, kind="stable")
+    partition_ids, starts = np.unique(document_ids[rows], return_index=True)
+    return Partitions(partition_ids, np.append(starts, len(rows)), rows)
+
+
+def partition_rows(partitions: Partitions, document_ids: Sequence[int]) -> np.ndarray:
+    """
+    Get the rows of some documents, without scanning the other partitions.
+
+    Args:
+        partitions (Partitions): The partitions of the index.
+        document_ids (Sequence[int]): The IDs of the documents.
+
+    Returns:
+        np.ndarray: The sorted rows of the chunks of the documents.
+    """
+    document_ids = np.unique(np.asarray(document_ids, dtype=np.int64))
+    positions = np.searchsorted(partitions.document_ids, document_ids)
+    found = positions < len(partitions.document_ids)
+    found[found] = partitions.document_ids[positions[found]] == document_ids[found]
+    positions = positions[found]
+    return np.sort(
+        np.concatenate(
+            [
+                partitions.rows[partitions.offsets[i] : partitions.offsets[i + 1]]
+                for i in positions
+            ]
+            + [np.empty(0, dtype=np.int64)]
+        )
+    )
+
+
+def score_embeddings(
+    embeddings: np.ndarray,
+    scales: Optional[np.ndarray],
+    query_embedding: np.ndarray,
+    rows: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Compute the dot product between float32 queries and stored embeddings.
+
+    Quantized embeddings are converted to float32 one block at a time, so
+    the full-precision matrix is never materialized.
+
+    Args:
+        embeddings (np.ndarray): The stored embeddings.
+        scales (Optional[np.ndarray]): The per-row int8 scales.
+        query_embedding (np.ndarray): The (dim,) float32 query embedding, or
+            a (n_queries, dim) matrix of query embeddings.
+        rows (Optional[np.ndarray], optional): The rows to score,
+            defaults to every row.
+
+    Returns:
+        np.ndarray: The similarity scores, one per scored row, with one row
+            of scores per query for a query matrix.
+    """
+    if rows is not None:
+        embeddings = embeddings[rows]
+        scales = None if scales is None else scales[rows]
+
+    if embeddings.dtype == np.float32:
+        similarity_scores = query_embedding @ embeddings.T
+    else:
+        similarity_scores = np.empty(
+            query_embedding.shape[:-1] + (len(embeddings),), dtype=np.float32
+        )
+        for start in range(0, len(embeddings), SCORING_BLOCK_SIZE):
+            block = embeddings[start : start + SCORING_BLOCK_SIZE]
+            similarity_scores[..., start : start + len(block)] = (
+                query_embedding @ block.astype(np.float32).T
+            )
+
+    if scales is not None:
+        similarity_scores *= scales
+
+    return similarity_scores
+
+
+def score_rows(
+    data: IndexData, query_embedding: np.ndarray, rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Score the rows of an index segment, as score_embeddings.
+
+    Without a row selection, every mapped row is scored, the rows of removed
+    chunks included, and the scores of the chunk IDs are then selected, as
+    selecting the rows first would copy the mapped embeddings.
+
+    Args:
+        data (IndexData): The index segment.
+        query_embedding (np.ndarray): The float32 query embedding or matrix.
+        rows (Optional[np.ndarray], optional): The rows of the chunk IDs to
+            score, defaults to every chunk.
+
+    Returns:
+        np.ndarray: The similarity scores, one per scored row.
+    """
+    if data.embedding_rows is None:
+        return score_embeddings(data.embeddings, data.scales, query_embedding, rows)
+
+    if rows is None:
+        return score_embeddings(data.embeddings, data.scales, query_embedding)[
+            ..., data.embedding_rows
+        ]
+
+    return score_embeddings(
+        data.embeddings, data.scales, query_embedding, data.embedding_rows[rows]
+    )
+
+
+def merge_top_k(
+    results: Sequence[Tuple[np.ndarray, np.ndarray]], k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge the best chunks of several segments.
+
+    Args:
+        results (Sequence[Tuple[np.ndarray, np.ndarray]]): The similarity
+            scores and chunk IDs of every segment, along the last axis.
+        k (int): The number of chunks to keep.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The k best scores and chunk IDs,
+            sorted by descending similarity.
+    """
+    if not results:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    if len(results) == 1:
+        return results[0]
+
+    scores = np.concatenate([scores for scores, _ in results], axis=-1)
+    ids = np.concatenate([ids for _, ids in results], axis=-1)
+    top_indices = select_top_k(scores, k)
+    return (
+        np.take_along_axis(scores, top_indices, axis=-1),
+        np.take_along_axis(ids, top_indices, axis=-1),
+    )
+
+
+def truncate_embeddings(embeddings: np.ndarray, dim: int) -> np.ndarray:
+    """
+    Truncate Matryoshka embeddings to their first dimensions and renormalize.
+
+    Args:
+        embeddings (np.ndarray): The float32 embeddings, one per row or a
+            single (dim,) embedding.
+        dim (int): The number of dimensions to keep.
+
+    Returns:
+        np.ndarray: The truncated unit-norm embeddings.
+    """
+    prefixes = np.array(embeddings[..., :dim], dtype=np.float32)
+    norms = np.linalg.norm(prefixes, axis=-1, keepdims=True)
+    return prefixes / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def select_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Select the indices of the k highest scores, sorted by descending score.
+
+    Uses a partial partition so only the selected scores are sorted. A 2D
+    array of scores is selected row by row.
+
+    Args:
+        scores (np.ndarray): The scores to select from, along the last axis.
+        k (int): The number of indices to select.
+
+    Returns:
+        np.ndarray: The indices of the k highest scores.
+    """
+    n_scores = scores.shape[-1]
+    k = min(k, n_scores)
+    if k < n_scores:
+        top_indices = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        top_indices = np.broadcast_to(np.arange(n_scores), scores.shape)
+
+    order = np.argsort(
+        -np.take_along_axis(scores, top_indices, axis=-1), axis=-1, kind="stable"
+    )
+    return np.take_along_axis(top_indices, order, axis=-1)
+
+
+vector_index = None
+
+
+def get_vector_index() -> VectorIndex:
+    """Get the vector index singleton instance."""
+    global vector_index
+    if vector_index is None:
+        vector_index = VectorIndex(
+            precision=Config.EMBEDDING_PRECISION,
+            truncate_dim=Config.SEARCH_TRUNCATE_DIM,
+            candidate_multiplier=Config.SEARCH_CANDIDATE_MULTIPLIER,
+        )
+    return vector_index
+
+
+def init_vector_index(session: Session, dim: Optional[int] = None) -> VectorIndex:
+    """
+    Load the vector index singleton from the database.
+
+    When the embedding dimension of the model is given, the stored blobs
+    are checked to be in EMBEDDING_PRECISION, loading fails otherwise.
+
+    With EMBEDDING_STORE_DIR set, the embeddings are memory-mapped from the
+    embedding store, synced with the database first.
+
+    In "ivf" mode the approximate index is loaded from IVF_INDEX_PATH when
+    it exists, otherwise it is trained from the loaded embeddings.
+    """
+    index = get_vector_index()
+    embedding_store = get_embedding_store()
+    if embedding_store is None:
+        index.load_from_database(session, dim)
+    else:
+        ids, embeddings, scales, rows = sync_embedding_store(
+            embedding_store, session, dim
+        )
+        index.load_quantized(
+            ids, embeddings, scales, chunk_document_ids(session, ids), rows
+        )
+
+    if Config.VECTOR_INDEX_MODE == "ivf":
+        if Config.IVF_INDEX_PATH and os.path.exists(Config.IVF_INDEX_PATH):
+            ann_index = IVFIndex.load(Config.IVF_INDEX_PATH, n_probe=Config.IVF_N_PROBE)
+        else:
+            ann_index = IVFIndex(n_lists=Config.IVF_N_LISTS, n_probe=Config.IVF_N_PROBE)
+        index.set_ann_index(ann_index)
+
+    return index
+
+
+def chunk_document_ids(session: Session, ids: np.ndarray) -> np.ndarray:
+    """
+    Get the document IDs of chunks.
+
+    Args:
+        session (Session): The database session.
+        ids (np.ndarray): The sorted chunk IDs.
+
+    Returns:
+        np.ndarray: The document ID of every chunk.
+    """
+    rows = session.exec(
+        select(DocumentChunk.id, DocumentChunk.document_id).order_by(DocumentChunk.id)
+    ).all()
+    chunk_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    document_ids = np.array([row[1] for row in rows], dtype=np.int64)
+
+    # Every stored chunk is in the database, the store is synced with it
+    return document_ids[np.searchsorted(chunk_ids, ids)]
+
+
+def save_vector_index() -> None:
+    """Persist the trained approximate index to IVF_INDEX_PATH."""
+    ann_index = get_vector_index().ann_index
+    if Config.IVF_INDEX_PATH and ann_index is not None and ann_index.is_trained:
+        ann_index.save(Config.IVF_INDEX_PATH)
@@ -0,0 +1,99 @@
+"""
+Recall@k and latency of the IVF index against exact search.
+
+Usage:
+    python -m benchmarks.ann_recall --n-vectors 100000 --n-lists 256
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from FastEmbed.core.ann import IVFIndex
+from FastEmbed.core.vector_index import VectorIndex
+
+
+def clustered_embeddings(
+    n_vectors: int, centers: np.ndarray, noise: float, rng: np.random.Generator
+) -> np.ndarray:
+    """Generate normalized embeddings grouped around the topic centers."""
+    vectors = centers[rng.integers(len(centers), size=n_vectors)]
+    vectors += noise * rng.standard_normal(vectors.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def run(args: argparse.Namespace) -> dict:
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.n_clusters, args.dim)).astype(np.float32)
+    embeddings = clustered_embeddings(args.n_vectors, centers, args.noise, rng)
+    queries = clustered_embeddings(args.n_queries, centers, args.noise, rng)
+
+    index = VectorIndex(ann_index=IVFIndex(n_lists=args.n_lists))
+    index.load(np.arange(args.n_vectors), embeddings)
+
+    start = time.perf_counter()
+    index.set_ann_index(index.ann_index)
+    train_seconds = time.perf_counter() - start
+
+    def timed_search(**kwargs):
+        latencies, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            results.append(index.search(query, k=args.k, **kwargs)[1])
+            latencies.append(time.perf_counter() - start)
+        return results, np.array(latencies) * 1000
+
+    exact_results, exact_latencies = timed_search(exact=True)
+    report = {
+        "n_vectors": args.n_vectors,
+        "dim": args.dim,
+        "n_lists": args.n_lists,
+        "k": args.k,
+        "train_seconds": train_seconds,
+        "exact": {
+            "p50_ms": float(np.percentile(exact_latencies, 50)),
+            "p99_ms": float(np.percentile(exact_latencies, 99)),
+        },
+        "ivf": [],
+    }
+
+    for n_probe in args.n_probe:
+        results, latencies = timed_search(n_probe=n_probe)
+        recall = np.mean(
+            [
+                len(np.intersect1d(exact, approximate)) / args.k
+                for exact, approximate in zip(exact_results, results)
+            ]
+        )
+        report["ivf"].append(
+            {
+                "n_probe": n_probe,
+                "recall_at_k": float(recall),
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+            }
+        )
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-vectors", type=int, default=100_000)
+    parser.add_argument("--n-queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--n-clusters", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=2.0)
+    parser.add_argument("--n-lists", type=int, default=256)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+
+    print(json.dumps(run(parser.parse_args()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
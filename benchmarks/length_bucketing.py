@@ -0,0 +1,71 @@
+"""
+Throughput of fixed-size batches against length-bucketed batches.
+
+Embeds the same synthetic chunks of mixed lengths with both batching modes
+of the configured model and reports the real tokens embedded per second and
+the fraction of padding tokens.
+
+Usage:
+    python -m benchmarks.length_bucketing --n-texts 2000 --token-budget 8192
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from FastEmbed.core.embedding import create_embedding_engine
+
+
+def mixed_length_texts(n_texts: int, rng: np.random.Generator) -> list:
+    """Generate texts whose word counts follow a long-tailed distribution."""
+    vocabulary = np.array(
+        "the model embeds short lines and long paragraphs of every document".split()
+    )
+    word_counts = np.clip(rng.lognormal(3, 1, size=n_texts).astype(int), 1, 400)
+    return [" ".join(rng.choice(vocabulary, size=count)) for count in word_counts]
+
+
+def run(args: argparse.Namespace) -> dict:
+    texts = mixed_length_texts(args.n_texts, np.random.default_rng(args.seed))
+
+    report = {"n_texts": args.n_texts, "batch_size": args.batch_size, "modes": []}
+    for mode, token_budget in (("fixed", 0), ("bucketed", args.token_budget)):
+        engine = create_embedding_engine(
+            batch_size=args.batch_size,
+            token_budget=token_budget,
+            pad_to_multiple_of=args.pad_to_multiple_of or None,
+        )
+
+        start = time.perf_counter()
+        engine.embed_documents(texts)
+        seconds = time.perf_counter() - start
+
+        stats = engine.padding_stats()
+        report["modes"].append(
+            {
+                "mode": mode,
+                "token_budget": token_budget,
+                "seconds": seconds,
+                "tokens_per_second": stats["tokens"] / seconds,
+                "padding_ratio": stats["padding_ratio"],
+            }
+        )
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--token-budget", type=int, default=8192)
+    parser.add_argument("--pad-to-multiple-of", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+
+    print(json.dumps(run(parser.parse_args()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Throughput, latency and memory of the ingest and query paths.
+
+Builds the tiny stand-in model of benchmarks.tiny_model, so the benchmark
+runs offline on CPU, then for every corpus size fills a new SQLite database
+with random chunk embeddings and measures:
+
+    - DocumentService.upload_document on generated text documents,
+    - ChatService.query_question with distinct queries,
+    - EmbeddingEngine.rank_documents_by_similarity over the corpus matrix,
+    - embedding serialization and deserialization.
+
+The JSON report gives the throughput, the p50, p95 and p99 latencies and
+the peak RSS of the process, with the current commit, so runs on different
+commits can be compared. A 1M chunks corpus at 768 dimensions needs about
+8GB of memory and disk.
+
+Usage:
+    python -m benchmarks.service_paths --corpus-sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import resource
+import subprocess
+import tempfile
+import time
+from typing import List, Optional
+
+import numpy as np
+from fastapi import UploadFile
+from sqlalchemy import Engine, insert
+from sqlmodel import Session, SQLModel
+
+from FastEmbed.QAnswers.models.chat import ChatQuery
+from FastEmbed.QAnswers.models.document import Document, DocumentChunk
+from FastEmbed.QAnswers.services.chat import ChatService
+from FastEmbed.QAnswers.services.document import DocumentService
+from FastEmbed.config import Config
+from FastEmbed.core.database import dispose_database_engine, init_database_engine
+from FastEmbed.core.embedding import init_embedding_engine
+from FastEmbed.core.precision import encode_embedding
+from FastEmbed.core.vector_index import get_vector_index
+
+from benchmarks.tiny_model import TINY_MODEL_ID, benchmark_vocabulary, build_tiny_model
+
+# Number of chunks inserted per statement while filling the corpus
+FILL_BATCH_SIZE = 10_000
+
+
+def latency_report(latencies: List[float], n_items: int) -> dict:
+    """Summarize the latencies of n_items processed over several calls."""
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "n_calls": len(latencies),
+        "items_per_second": n_items / float(np.sum(latencies)),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def peak_rss_mib() -> float:
+    """The peak resident set size of the process so far."""
+    # ru_maxrss is expressed in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def random_text(vocabulary: np.ndarray, n_words: int, rng: np.random.Generator) -> str:
+    return " ".join(rng.choice(vocabulary, size=n_words))
+
+
+def fill_corpus(
+    db_engine: Engine, corpus_size: int, dim: int, rng: np.random.Generator
+) -> None:
+    """Insert a document with corpus_size chunks with random unit embeddings."""
+    with Session(db_engine) as session:
+        document = Document(name="corpus.txt")
+        session.add(document)
+        session.commit()
+
+        for start in range(0, corpus_size, FILL_BATCH_SIZE):
+            n_chunks = min(FILL_BATCH_SIZE, corpus_size - start)
+            embeddings = rng.standard_normal((n_chunks, dim)).astype(np.float32)
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+            session.execute(
+                insert(DocumentChunk),
+                [
+                    {
+                        "document_id": document.id,
+                        "line_number": start + row + 1,
+                        "content": f"chunk {start + row}",
+                        "embedding": encode_embedding(
+                            embedding, Config.EMBEDDING_PRECISION
+                        ),
+                    }
+                    for row, embedding in enumerate(embeddings)
+                ],
+            )
+        session.commit()
+
+
+async def benchmark_corpus(
+    args: argparse.Namespace, corpus_size: int, work_dir: str
+) -> dict:
+    rng = np.random.default_rng(args.seed)
+    vocabulary = np.array(benchmark_vocabulary(args.n_words))
+
+    # A new database per corpus size
+    dispose_database_engine()
+    Config.DATABASE_URL = f"sqlite:///{work_dir}/corpus_{corpus_size}.db"
+    db_engine = init_database_engine()
+    SQLModel.metadata.create_all(db_engine)
+
+    report = {"corpus_size": corpus_size}
+
+    start = time.perf_counter()
+    fill_corpus(db_engine, corpus_size, args.dim, rng)
+    report["fill_seconds"] = time.perf_counter() - start
+
+    vector_index = get_vector_index()
+    with Session(db_engine) as session:
+        start = time.perf_counter()
+        vector_index.load_from_database(session)
+        report["index_load_seconds"] = time.perf_counter() - start
+
+        # Ingest documents of upload_lines chunks
+        document_service = DocumentService()
+        latencies = []
+        for index in range(args.n_uploads):
+            text = "\n".join(
+                random_text(vocabulary, args.words_per_line, rng)
+                for _ in range(args.upload_lines)
+            )
+            file = UploadFile(io.BytesIO(text.encode()), filename=f"upload_{index}.txt")
+            start = time.perf_counter()
+            document_service.upload_document(file, session)
+            latencies.append(time.perf_counter() - start)
+        report["upload"] = latency_report(latencies, args.n_uploads * args.upload_lines)
+
+        # Distinct queries, so the query embedding cache never hits
+        chat_service = ChatService()
+        latencies = []
+        for _ in range(args.n_queries):
+            query = ChatQuery(query=random_text(vocabulary, 12, rng), k=args.k)
+            start = time.perf_counter()
+            await chat_service.query_question(query, session)
+            latencies.append(time.perf_counter() - start)
+        report["query"] = latency_report(latencies, args.n_queries)
+
+    engine = init_embedding_engine()
+
+    # The ranking cost does not depend on the int8 scales
+    corpus_embeddings = vector_index.embeddings.astype(np.float32, copy=False)
+    query_embeddings = engine.embed_queries(
+        [random_text(vocabulary, 12, rng) for _ in range(args.n_queries)]
+    )
+    latencies = []
+    for query_embedding in query_embeddings:
+        start = time.perf_counter()
+        engine.rank_documents_by_similarity(
+            query_embedding[None], corpus_embeddings, k=args.k
+        )
+        latencies.append(time.perf_counter() - start)
+    report["rank"] = latency_report(latencies, args.n_queries)
+
+    embeddings = corpus_embeddings[: args.n_serialized]
+    serialize_latencies, deserialize_latencies = [], []
+    for embedding in embeddings:
+        start = time.perf_counter()
+        blob = engine.serialize_embedding(embedding)
+        serialize_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        engine.deserialize_embedding(blob)
+        deserialize_latencies.append(time.perf_counter() - start)
+    report["serialize"] = latency_report(serialize_latencies, len(embeddings))
+    report["deserialize"] = latency_report(deserialize_latencies, len(embeddings))
+
+    report["peak_rss_mib"] = peak_rss_mib()
+    return report
+
+
+async def run(args: argparse.Namespace, work_dir: str) -> dict:
+    Config.MODEL_ID = TINY_MODEL_ID
+    Config.MODEL_DIR = build_tiny_model(
+        f"{work_dir}/model",
+        benchmark_vocabulary(args.n_words),
+        dim=args.dim,
+        n_layers=args.n_layers,
+        seed=args.seed,
+    )
+    init_embedding_engine()
+
+    report = {
+        "commit": current_commit(),
+        "settings": {
+            "dim": args.dim,
+            "n_layers": args.n_layers,
+            "embedding_precision": Config.EMBEDDING_PRECISION,
+            "embedding_batch_size": Config.EMBEDDING_BATCH_SIZE,
+            "n_uploads": args.n_uploads,
+            "upload_lines": args.upload_lines,
+            "n_queries": args.n_queries,
+            "k": args.k,
+            "seed": args.seed,
+        },
+        "corpus_sizes": [],
+    }
+    for corpus_size in args.corpus_sizes:
+        report["corpus_sizes"].append(
+            await benchmark_corpus(args, corpus_size, work_dir)
+        )
+
+    dispose_database_engine()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--corpus-sizes", type=int, nargs="+", default=[1000, 10_000, 100_000]
+    )
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--n-layers", type=int, default=2)
+    parser.add_argument("--n-words", type=int, default=2000)
+    parser.add_argument("--n-uploads", type=int, default=5)
+    parser.add_argument("--upload-lines", type=int, default=200)
+    parser.add_argument("--words-per-line", type=int, default=40)
+    parser.add_argument("--n-queries", type=int, default=200)
+    parser.add_argument("--n-serialized", type=int, default=10_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="Defaults to a temporary directory")
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        report = asyncio.run(run(args, args.work_dir or temporary_dir))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Tiny random stand-in for the embedding model.
+
+Writes a model directory loadable offline by EmbeddingEngine: an ONNX model
+with the input and output signature of the real one (input_ids and
+attention_mask in, last_hidden_state and sentence_embedding out), a word
+level tokenizer and the manifest. Benchmarks then exercise the real code
+paths without network access or a GPU.
+
+Usage:
+    python -m benchmarks.tiny_model --model-dir /tmp/tiny-model --dim 768
+"""
+
+import argparse
+import os
+from typing import List
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import PreTrainedTokenizerFast
+
+from FastEmbed.core.model_files import MODEL_FILENAMES, write_manifest
+
+TINY_MODEL_ID = "benchmarks/tiny-model"
+
+# Opset with ReduceSum axes as an input and ReduceL2 axes as an attribute
+OPSET_VERSION = 17
+
+# Oldest IR version of the opset, loadable by older ONNX Runtime releases
+IR_VERSION = 8
+
+
+def benchmark_vocabulary(n_words: int = 2000) -> List[str]:
+    """The words the tiny tokenizer knows, and the benchmark texts use."""
+    return [f"w{index}" for index in range(n_words)]
+
+
+def build_tiny_model(
+    model_dir: str,
+    vocabulary: List[str],
+    dim: int = 768,
+    n_layers: int = 2,
+    seed: int = 0,
+    model_id: str = TINY_MODEL_ID,
+) -> str:
+    """
+    Write a random model and its tokenizer to a model directory.
+
+    The model embeds every token, runs n_layers dense tanh layers, mean pools
+    the unmasked tokens and normalizes the result.
+
+    Args:
+        model_dir (str): The model directory.
+        vocabulary (List[str]): The tokenizer words.
+        dim (int, optional): The embedding dimension. Defaults to 768.
+        n_layers (int, optional): The number of dense layers. Defaults to 2.
+        seed (int, optional): The seed of the random weights. Defaults to 0.
+        model_id (str, optional): The model ID written to the manifest.
+
+    Returns:
+        str: The model directory.
+    """
+    rng = np.random.default_rng(seed)
+    special_tokens = ["[PAD]", "[UNK]"]
+    n_tokens = len(special_tokens) + len(vocabulary)
+
+    initializers = [
+        numpy_helper.from_array(
+            rng.standard_normal((n_tokens, dim)).astype(np.float32), "embeddings"
+        ),
+        numpy_helper.from_array(np.array([-1], dtype=np.int64), "last_axis"),
+        numpy_helper.from_array(np.array([1], dtype=np.int64), "sequence_axis"),
+        numpy_helper.from_array(np.array(1e-12, dtype=np.float32), "epsilon"),
+    ]
+    nodes = [helper.make_node("Gather", ["embeddings", "input_ids"], ["hidden_0"])]
+    for layer in range(n_layers):
+        weights = (rng.standard_normal((dim, dim)) / np.sqrt(dim)).astype(np.float32)
+        initializers.append(numpy_helper.from_array(weights, f"weights_{layer}"))
+        nodes += [
+            helper.make_node(
+                "MatMul", [f"hidden_{layer}", f"weights_{layer}"], [f"dense_{layer}"]
+            ),
+            helper.make_node("Tanh", [f"dense_{layer}"], [f"hidden_{layer + 1}"]),
+        ]
+
+    nodes += [
+        helper.make_node("Identity", [f"hidden_{n_layers}"], ["last_hidden_state"]),
+        helper.make_node("Unsqueeze", ["attention_mask", "last_axis"], ["mask_3d"]),
+        helper.make_node("Cast", ["mask_3d"], ["mask"], to=TensorProto.FLOAT),
+        helper.make_node("Mul", ["last_hidden_state", "mask"], ["masked"]),
+        helper.make_node(
+            "ReduceSum", ["masked", "sequence_axis"], ["pooled"], keepdims=0
+        ),
+        helper.make_node("ReduceL2", ["pooled"], ["norm"], axes=[-1], keepdims=1),
+        helper.make_node("Add", ["norm", "epsilon"], ["safe_norm"]),
+        helper.make_node("Div", ["pooled", "safe_norm"], ["sentence_embedding"]),
+    ]
+
+    graph = helper.make_graph(
+        nodes,
+        "tiny_embedding_model",
+        [
+            helper.make_tensor_value_info(
+                name, TensorProto.INT64, ["batch", "sequence"]
+            )
+            for name in ("input_ids", "attention_mask")
+        ],
+        [
+            helper.make_tensor_value_info(
+                "last_hidden_state", TensorProto.FLOAT, ["batch", "sequence", dim]
+            ),
+            helper.make_tensor_value_info(
+                "sentence_embedding", TensorProto.FLOAT, ["batch", dim]
+            ),
+        ],
+        initializers,
+    )
+    model = helper.make_model(
+        graph,
+        opset_imports=[helper.make_opsetid("", OPSET_VERSION)],
+        ir_version=IR_VERSION,
+    )
+
+    # Large weights go to the external data file, as in the real model
+    model_path, data_path = (
+        os.path.join(model_dir, filename) for filename in MODEL_FILENAMES
+    )
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    onnx.save_model(
+        model,
+        model_path,
+        save_as_external_data=True,
+        all_tensors_to_one_file=True,
+        location=os.path.basename(data_path),
+    )
+
+    tokenizer = Tokenizer(
+        models.WordLevel(
+            {token: index for index, token in enumerate(special_tokens + vocabulary)},
+            unk_token="[UNK]",
+        )
+    )
+    tokenizer.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    tokenizer_paths = PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, pad_token="[PAD]", unk_token="[UNK]"
+    ).save_pretrained(model_dir)
+
+    write_manifest(
+        model_dir,
+        model_id,
+        MODEL_FILENAMES
+        + [os.path.relpath(path, model_dir) for path in tokenizer_paths],
+    )
+    return model_dir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model-dir", required=True)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--n-layers", type=int, default=2)
+    parser.add_argument("--n-words", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    build_tiny_model(
+        args.model_dir,
+        benchmark_vocabulary(args.n_words),
+        dim=args.dim,
+        n_layers=args.n_layers,
+        seed=args.seed,
+    )
+    print(f"Tiny model written to {args.model_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,70 @@
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import Engine
+from sqlmodel import Session
 from FastEmbed.QAnswers.routes.api import router as api_router
-from FastEmbed.core.database import init_database
-from FastEmbed.core.embedding import init_embedding_engine
+from FastEmbed.config import Config
+from FastEmbed.core.database import dispose_database_engine, init_database_engine
+from FastEmbed.core.embedding import close_embedding_engine, init_embedding_engine
+from FastEmbed.core.extraction import shutdown_pdf_executor
+from FastEmbed.core.jobs import shutdown_job_queue
+from FastEmbed.core.metrics import ServerTimingMiddleware, get_metrics
+from FastEmbed.core.readiness import get_readiness
+from FastEmbed.core.vector_index import (
+    get_vector_index,
+    init_vector_index,
+    save_vector_index,
+)
 
 from contextlib import asynccontextmanager
 
 
+def load_resources(db_engine: Engine) -> None:
+    """Load the embedding model and the vector index, tracking readiness."""
+    readiness = get_readiness()
+    try:
+        # Load the embedding engine and warm it up
+        embedding_engine = init_embedding_engine()
+        readiness.mark_ready("model")
+
+        # Load the chunk embeddings into the in-memory vector index
+        with Session(db_engine) as session:
+            init_vector_index(session, embedding_engine.dim)
+        readiness.mark_ready("index")
+    except Exception as error:
+        readiness.mark_failed(error)
+        raise
+
+
 @asynccontextmanager
 async def application_lifecycle(app: FastAPI):
 
-    # Initialize embedding engine
-    init_embedding_engine()
+    # Initialize the shared database engine
+    db_engine = init_database_engine()
+
+    get_readiness().reset()
+    if Config.BACKGROUND_LOADING:
+        # Serve the healthcheck and readiness endpoints while loading
+        threading.Thread(
+            target=load_resources,
+            args=(db_engine,),
+            name="resource-loader",
+            daemon=True,
+        ).start()
+    else:
+        load_resources(db_engine)
 
     yield
 
     # Clean up after application shutdown
+    shutdown_job_queue()
+    shutdown_pdf_executor()
+    save_vector_index()
+    dispose_database_engine()
+    close_embedding_engine()
 
 
 app = FastAPI(lifespan=application_lifecycle)
@@ -32,6 +81,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ServerTimingMiddleware)
 
 
 @app.get("/")
@@ -39,4 +89,14 @@ async def root():
     return {"message": "Server is running"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics_text():
+    """
+    Metrics in the Prometheus text exposition format.
+    """
+    metrics = get_metrics()
+    metrics.set_gauge("vector_index_chunks", len(get_vector_index()))
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(api_router)
@@ -0,0 +1,77 @@
+import numpy as np
+
+from FastEmbed.core.ann import IVFIndex
+from FastEmbed.core.vector_index import VectorIndex
+
+
+def clustered_embeddings(n_vectors, dim=32, n_clusters=16, seed=0):
+    centers = np.random.default_rng(0).standard_normal((n_clusters, dim))
+    rng = np.random.default_rng(seed)
+    vectors = centers[rng.integers(n_clusters, size=n_vectors)]
+    vectors += 0.3 * rng.standard_normal((n_vectors, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def test_ivf_recall_against_exact_search():
+    # Init
+    embeddings = clustered_embeddings(2000)
+    queries = clustered_embeddings(50, seed=1)
+    index = VectorIndex(ann_index=IVFIndex(n_lists=16, n_probe=4))
+    index.load(np.arange(len(embeddings)), embeddings)
+    index.set_ann_index(index.ann_index)
+
+    # Test
+    recalls = []
+    for query in queries:
+        _, exact_ids = index.search(query, k=10, exact=True)
+        _, approximate_ids = index.search(query, k=10)
+        recalls.append(len(np.intersect1d(exact_ids, approximate_ids)) / 10)
+
+    # Assert
+    assert index.ann_index.is_trained
+    assert np.mean(recalls) >= 0.9
+
+
+def test_ivf_incremental_add_and_persistence(tmp_path):
+    # Init
+    embeddings = clustered_embeddings(600)
+    index = VectorIndex(ann_index=IVFIndex(n_lists=8, n_probe=8))
+
+    # Test
+    index.add(np.arange(500), embeddings[:500])
+    index.add(np.arange(500, 600), embeddings[500:])
+    index.remove([0, 1])
+
+    path = str(tmp_path / "ivf.npz")
+    index.ann_index.save(path)
+    loaded = IVFIndex.load(path)
+
+    # Assert
+    assert len(index.ann_index) == 598
+    assert np.array_equal(np.sort(loaded.ids()), np.arange(2, 600))
+    _, ids = index.search(embeddings[550], k=1)
+    assert ids.tolist() == [550]
+
+
+def test_saved_ivf_reassigns_reused_ids(tmp_path):
+    # Init
+    embeddings = clustered_embeddings(600)
+    index = VectorIndex(ann_index=IVFIndex(n_lists=8, n_probe=1))
+    index.load(np.arange(600), embeddings)
+    index.set_ann_index(index.ann_index)
+    path = str(tmp_path / "ivf.npz")
+    index.ann_index.save(path)
+
+    # Chunk 0 was deleted and its ID reused by a chunk of another cluster
+    far_row = np.argmin(embeddings @ embeddings[0])
+    embeddings[0] = embeddings[far_row]
+
+    # Test
+    reloaded = VectorIndex()
+    reloaded.load(np.arange(600), embeddings)
+    reloaded.set_ann_index(IVFIndex.load(path))
+    _, ids = reloaded.search(embeddings[0], k=2)
+
+    # Assert
+    assert 0 in ids.tolist()
@@ -0,0 +1,75 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from FastEmbed.core.batching import QueryBatcher
+from FastEmbed.core.metrics import get_metrics, request_timings
+
+
+def fake_embed_queries(query_texts):
+    return np.array([[len(text)] for text in query_texts], dtype=np.float32)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_queries_share_batches():
+    # Init
+    engine = MagicMock()
+    engine.embed_queries.side_effect = fake_embed_queries
+    batcher = QueryBatcher(engine, max_wait_ms=50, max_batch_size=3)
+    queries = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    # Test
+    results = await asyncio.gather(*(batcher.embed_query_text(q) for q in queries))
+
+    # Assert
+    assert [len(call.args[0]) for call in engine.embed_queries.call_args_list] == [
+        3,
+        2,
+    ]
+    assert [result.tolist() for result in results] == [[[len(q)]] for q in queries]
+
+
+@pytest.mark.asyncio
+async def test_batch_errors_reach_every_caller():
+    # Init
+    engine = MagicMock()
+    engine.embed_queries.side_effect = RuntimeError("inference failed")
+    batcher = QueryBatcher(engine, max_wait_ms=1, max_batch_size=8)
+
+    # Test
+    results = await asyncio.gather(
+        batcher.embed_query_text("a"),
+        batcher.embed_query_text("b"),
+        return_exceptions=True,
+    )
+
+    # Assert
+    assert engine.embed_queries.call_count == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_batch_stage_timings_reach_every_request():
+    # Init
+    def timed_embed_queries(query_texts):
+        with get_metrics().timer("inference"):
+            return fake_embed_queries(query_texts)
+
+    engine = MagicMock()
+    engine.embed_queries.side_effect = timed_embed_queries
+    batcher = QueryBatcher(engine, max_wait_ms=50, max_batch_size=2)
+
+    async def request(query_text):
+        timings = {}
+        request_timings.set(timings)
+        await batcher.embed_query_text(query_text)
+        return timings
+
+    # Test
+    timings = await asyncio.gather(request("a"), request("bb"))
+
+    # Assert
+    assert engine.embed_queries.call_count == 1
+    assert all("inference" in request_timing for request_timing in timings)
@@ -0,0 +1,68 @@
+import numpy as np
+
+from FastEmbed.config import Config
+from FastEmbed.core.cache import (
+    EmbeddingCache,
+    chunk_cache_key,
+    normalize_query_text,
+    query_cache_key,
+)
+
+
+def test_lru_eviction_and_counters():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("a", np.zeros(4, dtype=np.float32))
+    cache.put("b", np.ones(4, dtype=np.float32))
+
+    assert cache.get("a") is not None
+    cache.put("c", np.ones(4, dtype=np.float32))
+
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+
+
+def test_byte_limit_and_ttl():
+    cache = EmbeddingCache(max_entries=0, max_bytes=32)
+    cache.put("a", np.zeros(4, dtype=np.float32))
+    cache.put("b", np.zeros(4, dtype=np.float32))
+    cache.put("c", np.zeros(4, dtype=np.float32))
+
+    assert len(cache) == 2
+    assert cache.stats()["bytes"] == 32
+
+    expiring_cache = EmbeddingCache(ttl_seconds=1e-9)
+    expiring_cache.put("a", np.zeros(4, dtype=np.float32))
+    assert expiring_cache.get("a") is None
+
+
+def test_normalize_query_text():
+    assert normalize_query_text("  What is\tMars? \n") == "What is Mars?"
+
+
+def test_cache_keys_depend_on_model_quantization(monkeypatch):
+    fp32_chunk_key = chunk_cache_key("model", "prefix", "text")
+    fp32_query_key = query_cache_key("text")
+    monkeypatch.setattr(Config, "MODEL_QUANTIZATION", "int8")
+
+    assert chunk_cache_key("model", "prefix", "text", "int8") != fp32_chunk_key
+    assert query_cache_key("text") != fp32_query_key
+
+
+def test_chunk_cache_key_depends_on_storage_precision():
+    fp32_chunk_key = chunk_cache_key("model", "prefix", "text")
+
+    assert chunk_cache_key("model", "prefix", "text", precision="float32") == (
+        fp32_chunk_key
+    )
+    assert chunk_cache_key("model", "prefix", "text", precision="float16") != (
+        fp32_chunk_key
+    )
+    assert chunk_cache_key("model", "prefix", "text", precision="int8") != (
+        chunk_cache_key("model", "prefix", "text", precision="float16")
+    )
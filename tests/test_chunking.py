@@ -0,0 +1,100 @@
+from tokenizers import Regex, Tokenizer, models, pre_tokenizers
+from transformers import AutoTokenizer, PreTrainedTokenizerFast
+
+from FastEmbed.config import Config
+from FastEmbed.core.chunking import Chunk, Chunker
+
+
+def make_tokenizer():
+    """One token per whitespace separated word."""
+    tokenizer = Tokenizer(models.WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer)
+
+
+def test_lines_are_merged_until_min_word_count():
+    chunker = Chunker(make_tokenizer(), max_tokens=100, min_word_count=4)
+    pages = [(None, "a b\nc d\n\ne f g h i\nj")]
+
+    chunks = list(chunker.chunk_pages(pages))
+
+    assert chunks == [
+        Chunk("a b c d", 1, None),
+        Chunk("e f g h i", 4, None),
+        Chunk("j", 5, None),
+    ]
+
+
+def test_chunks_never_exceed_max_tokens():
+    chunker = Chunker(make_tokenizer(), max_tokens=3, min_word_count=30)
+    pages = [(1, "a b\nc d"), (2, "e f g h i j k")]
+
+    chunks = list(chunker.chunk_pages(pages))
+
+    assert chunks == [
+        Chunk("a b", 1, 1),
+        Chunk("c d", 2, 1),
+        Chunk("e f g", 3, 2),
+        Chunk("h i j", 3, 2),
+        Chunk("k", 3, 2),
+    ]
+
+
+def test_merged_chunks_are_counted_again():
+    # Spaces are tokens, so joining segments adds tokens
+    tokenizer = Tokenizer(models.WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Split(Regex(r"\s+"), "isolated")
+    chunker = Chunker(
+        PreTrainedTokenizerFast(tokenizer_object=tokenizer),
+        max_tokens=5,
+        min_word_count=30,
+    )
+    pages = [(None, "a\nb\nc\nd\ne")]
+
+    chunks = list(chunker.chunk_pages(pages))
+
+    assert chunks == [Chunk("a b", 1, None), Chunk("c d e", 3, None)]
+
+
+def test_chunks_fit_the_model_tokenizer():
+    tokenizer = AutoTokenizer.from_pretrained(Config.MODEL_ID)
+    chunker = Chunker(tokenizer, max_tokens=16, min_word_count=30)
+    lines = ["re", "de-", "co", "op", "http://", "www", ".com", "日本", "語", "1", "2"]
+    pages = [(None, "\n".join(lines * 8))]
+
+    chunks = list(chunker.chunk_pages(pages))
+
+    assert " ".join(chunk.text for chunk in chunks) == " ".join(lines * 8)
+    for chunk in chunks:
+        token_ids = tokenizer(chunk.text, add_special_tokens=False)["input_ids"]
+        assert len(token_ids) <= 16
+
+
+def test_sentences_strategy():
+    chunker = Chunker(
+        make_tokenizer(), max_tokens=100, strategy="sentences", min_word_count=1
+    )
+    pages = [(1, "First sentence. Second one\nspans lines! Third")]
+
+    chunks = list(chunker.chunk_pages(pages))
+
+    assert chunks == [
+        Chunk("First sentence.", 1, 1),
+        Chunk("Second one spans lines!", 1, 1),
+        Chunk("Third", 2, 1),
+    ]
+
+
+def test_window_strategy_overlaps():
+    chunker = Chunker(
+        make_tokenizer(), max_tokens=4, strategy="window", overlap_tokens=2
+    )
+    pages = [(1, "a b c\nd e f g")]
+
+    chunks = list(chunker.chunk_pages(pages))
+
+    assert chunks == [
+        Chunk("a b c d", 1, 1),
+        Chunk("c d e f", 1, 1),
+        Chunk("d e f g", 2, 1),
+    ]
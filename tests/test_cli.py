@@ -0,0 +1,66 @@
+import argparse
+
+import numpy as np
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from FastEmbed import cli
+from FastEmbed.QAnswers.models.document import (
+    ChunkEmbeddingCache,
+    Document,
+    DocumentChunk,
+)
+from FastEmbed.config import Config
+from FastEmbed.core.cache import chunk_cache_key
+from FastEmbed.core.embedding import EmbeddingEngine
+from FastEmbed.core.precision import decode_embedding, encode_embedding
+
+
+def test_converted_cache_entries_are_found_again(tmp_path, monkeypatch):
+    # Init
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(cli, "create_database_engine", lambda: engine)
+    prefix = EmbeddingEngine.PREFIXES["document"].format(title="none")
+    embedding = np.linspace(-1, 1, 8, dtype=np.float32)
+
+    def cache_key(text, precision):
+        return chunk_cache_key(
+            Config.MODEL_ID,
+            prefix,
+            text,
+            quantization=Config.MODEL_QUANTIZATION,
+            precision=precision,
+        )
+
+    with Session(engine) as session:
+        document = Document(name="mars.txt")
+        document.chunks.append(
+            DocumentChunk(
+                line_number=1,
+                content="Mars is red",
+                embedding=encode_embedding(embedding, "float32"),
+            )
+        )
+        session.add(document)
+        for text in ("Mars is red", "Deleted text"):
+            session.add(
+                ChunkEmbeddingCache(
+                    key=cache_key(text, "float32"),
+                    embedding=encode_embedding(embedding, "float32"),
+                )
+            )
+        session.commit()
+
+    # Test
+    cli.convert_embeddings(
+        argparse.Namespace(source_precision="float32", target_precision="int8")
+    )
+
+    # Assert
+    with Session(engine) as session:
+        cache_rows = session.exec(select(ChunkEmbeddingCache)).all()
+
+    assert [row.key for row in cache_rows] == [cache_key("Mars is red", "int8")]
+    assert np.allclose(
+        decode_embedding(cache_rows[0].embedding, "int8"), embedding, atol=1e-2
+    )
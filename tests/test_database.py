@@ -0,0 +1,41 @@
+import sqlalchemy
+from sqlalchemy import text
+
+from FastEmbed.core import database
+
+
+def test_engine_enables_sqlite_pragmas(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        database, "get_database_url", lambda: f"sqlite:///{tmp_path / 'test.db'}"
+    )
+    engine = database.create_database_engine()
+
+    with engine.connect() as connection:
+        journal_mode = connection.execute(text("PRAGMA journal_mode")).scalar()
+        synchronous = connection.execute(text("PRAGMA synchronous")).scalar()
+
+    engine.dispose()
+    assert journal_mode == "wal"
+    # NORMAL
+    assert synchronous == 1
+
+
+def test_engine_skips_sqlite_settings_on_other_databases(tmp_path, monkeypatch):
+    engine_args = {}
+
+    def create_engine(url, **kwargs):
+        engine_args.update(kwargs)
+        return sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+
+    monkeypatch.setattr(
+        database, "get_database_url", lambda: "postgresql://user@localhost/db"
+    )
+    monkeypatch.setattr(database, "create_engine", create_engine)
+    engine = database.create_database_engine()
+
+    with engine.connect() as connection:
+        journal_mode = connection.execute(text("PRAGMA journal_mode")).scalar()
+
+    engine.dispose()
+    assert "connect_args" not in engine_args
+    assert journal_mode == "delete"
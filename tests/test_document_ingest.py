@@ -0,0 +1,207 @@
+import io
+import time
+
+import numpy as np
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from main import app
+
+from FastEmbed.QAnswers.models.document import DocumentChunk
+from FastEmbed.QAnswers.services import document
+from FastEmbed.config import Config
+from FastEmbed.core.database import get_session
+from FastEmbed.core.precision import decode_embedding
+
+
+def test_bulk_inserted_chunks_match_index_rows(tmp_path, monkeypatch):
+    # Init
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(Config, "CHUNK_INSERT_BATCH_SIZE", 2)
+    vector_index = document.vector_index
+    vector_index.clear()
+    text = "\n".join(
+        f"Line {index} talks about planet number {index}" for index in range(5)
+    )
+    file = UploadFile(io.BytesIO(text.encode()), filename="planets.txt")
+
+    # Test
+    with Session(engine) as session:
+        result = document.DocumentService().upload_document(file, session, min_length=1)
+        chunks = session.exec(select(DocumentChunk).order_by(DocumentChunk.id)).all()
+
+        # Assert
+        assert result.chunk_count == 5
+        assert [chunk.document_id for chunk in chunks] == [result.id] * 5
+        assert [chunk.line_number for chunk in chunks] == [1, 2, 3, 4, 5]
+        assert vector_index.ids.tolist() == [chunk.id for chunk in chunks]
+        assert np.allclose(
+            vector_index.embeddings,
+            [
+                decode_embedding(chunk.embedding, Config.EMBEDDING_PRECISION)
+                for chunk in chunks
+            ],
+        )
+
+    vector_index.clear()
+
+
+def test_progress_total_is_unknown_until_extraction_ends(tmp_path, monkeypatch):
+    # Init
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(document, "INGEST_BATCH_SIZE", 2)
+    document.vector_index.clear()
+    text = "\n".join(f"Line {index} is about moon number {index}" for index in range(5))
+    file = UploadFile(io.BytesIO(text.encode()), filename="moons.txt")
+    reports = []
+
+    # Test
+    with Session(engine) as session:
+        document.DocumentService().upload_document(
+            file,
+            session,
+            min_length=1,
+            progress_callback=lambda completed, total: reports.append(
+                (completed, total)
+            ),
+        )
+
+    # Assert
+    assert reports[-1] == (5, 5)
+    assert all(total is None for _, total in reports[:-1])
+    assert [completed for completed, _ in reports] == sorted(
+        completed for completed, _ in reports
+    )
+
+    document.vector_index.clear()
+
+
+def test_ingest_batch_is_bucketed_by_length(tmp_path, monkeypatch):
+    # Init
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    document.vector_index.clear()
+    embedding_engine = document.get_embedding_engine()
+    monkeypatch.setattr(embedding_engine, "_batch_size", 4)
+    monkeypatch.setattr(embedding_engine, "_token_budget", 1_000_000)
+    lines = []
+    for index in range(4):
+        lines.append(f"Comet {index}")
+        lines.append(
+            f"Comet {index} has a long tail of dust and gas that points away from "
+            "the sun and grows brighter as it gets closer to the inner planets"
+        )
+    file = UploadFile(io.BytesIO("\n".join(lines).encode()), filename="comets.txt")
+    padded_lengths = []
+    run_session = embedding_engine._run_session
+
+    def record_run_session(inputs):
+        padded_lengths.append(inputs["input_ids"].shape[1])
+        return run_session(inputs)
+
+    monkeypatch.setattr(embedding_engine, "_run_session", record_run_session)
+
+    # Test
+    with Session(engine) as session:
+        result = document.DocumentService().upload_document(file, session, min_length=1)
+
+    # Assert
+    assert result.chunk_count == 8
+    assert len(padded_lengths) == 2
+    assert min(padded_lengths) < max(padded_lengths)
+
+    document.vector_index.clear()
+
+
+def test_precision_change_does_not_reuse_cached_embeddings(tmp_path, monkeypatch):
+    # Init
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    document.vector_index.clear()
+    embedding_engine = document.get_embedding_engine()
+    text = "\n".join(f"Line {index} is about star number {index}" for index in range(3))
+
+    def upload(session):
+        file = UploadFile(io.BytesIO(text.encode()), filename="stars.txt")
+        return document.DocumentService().upload_document(file, session, min_length=1)
+
+    # Test
+    with Session(engine) as session:
+        monkeypatch.setattr(embedding_engine, "_embedding_precision", "float32")
+        upload(session)
+        monkeypatch.setattr(embedding_engine, "_embedding_precision", "float16")
+        result = upload(session)
+        chunks = session.exec(
+            select(DocumentChunk).where(DocumentChunk.document_id == result.id)
+        ).all()
+
+    # Assert
+    assert result.chunk_count == 3
+    assert result.reused_chunk_count == 0
+    assert np.allclose(
+        [decode_embedding(chunk.embedding, "float16") for chunk in chunks],
+        document.vector_index.embeddings[-3:],
+        atol=1e-3,
+    )
+
+    document.vector_index.clear()
+
+
+def test_cache_insert_statement_compiles_for_every_dialect():
+    def compile_statement(dialect):
+        statement = document.cache_insert_statement(dialect.name)
+        return str(statement.compile(dialect=dialect))
+
+    assert "ON CONFLICT DO NOTHING" in compile_statement(sqlite.dialect())
+    assert "ON CONFLICT DO NOTHING" in compile_statement(postgresql.dialect())
+    assert compile_statement(mysql.dialect()).startswith(
+        "INSERT INTO chunkembeddingcache"
+    )
+
+
+def test_upload_queues_large_files(tmp_path, monkeypatch):
+    # Init
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(document, "get_database_engine", lambda: engine)
+    monkeypatch.setattr(Config, "SYNC_UPLOAD_MAX_BYTES", 64)
+
+    def get_test_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_test_session
+    client = TestClient(app)
+    text = "\n".join(
+        f"Line {index} is about comet number {index}" for index in range(5)
+    )
+
+    def upload(**params):
+        return client.post(
+            "/api/v1/documents/upload",
+            files={"file": ("comets.txt", text.encode())},
+            params={"min_word_count": 1, **params},
+        )
+
+    # Test
+    try:
+        queued_response = upload()
+        job = queued_response.json()
+        while job["status"] in ("queued", "running"):
+            time.sleep(0.05)
+            job = client.get(f"/api/v1/documents/jobs/{job['id']}").json()
+        sync_response = upload(background=False)
+    finally:
+        app.dependency_overrides.clear()
+        document.vector_index.clear()
+
+    # Assert
+    assert queued_response.status_code == 202
+    assert job["status"] == "completed"
+    assert job["total_chunks"] == job["document"]["chunk_count"] == 5
+    assert sync_response.status_code == 200
+    assert sync_response.json()["reused_chunk_count"] == 5
@@ -0,0 +1,28 @@
+import numpy as np
+
+from FastEmbed.core.embedding import get_embedding_engine
+
+
+def test_bucketed_documents_keep_input_order():
+    engine = get_embedding_engine()
+    texts = ["a much longer text " * 20, "short", "medium length text " * 5, "tiny"]
+
+    embeddings = engine.embed_documents(texts, batch_size=2)
+
+    expected = np.concatenate([engine.embed_document_text(text) for text in texts])
+    assert np.allclose(embeddings, expected, atol=1e-5)
+
+
+def test_length_buckets_respect_token_budget(monkeypatch):
+    engine = get_embedding_engine()
+    monkeypatch.setattr(engine, "_token_budget", 64)
+    monkeypatch.setattr(engine, "_pad_to_multiple_of", 8)
+
+    buckets = list(engine._length_buckets(np.array([3, 5, 9, 14, 30, 60]), 8))
+
+    # Four texts padded to 16 tokens, then 32 and 64 tokens alone
+    assert [(bucket.start, bucket.stop) for bucket in buckets] == [
+        (0, 4),
+        (4, 5),
+        (5, 6),
+    ]
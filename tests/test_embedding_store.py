@@ -0,0 +1,102 @@
+import numpy as np
+from sqlmodel import Session, SQLModel, create_engine, delete
+
+from FastEmbed.QAnswers.models.document import Document, DocumentChunk
+from FastEmbed.core.embedding_store import EmbeddingStore, sync_embedding_store
+from FastEmbed.core.precision import encode_embedding, quantize_embeddings
+
+
+def test_append_read_and_compact(tmp_path):
+    # Init
+    store = EmbeddingStore(str(tmp_path / "store"), "int8", "model")
+    embeddings = np.eye(4, dtype=np.float32)
+    store.append(np.array([1, 2]), *quantize_embeddings(embeddings[:2], "int8"))
+    store.append(np.array([3, 4]), *quantize_embeddings(embeddings[2:], "int8"))
+
+    # Test
+    ids, values, scales = store.read()
+    removed_count = store.compact(np.array([2, 4]))
+
+    # Assert
+    assert ids.tolist() == [1, 2, 3, 4]
+    assert isinstance(values.base, np.memmap)
+    assert np.allclose(values * scales[:, None], embeddings)
+    assert removed_count == 2
+    assert store.read()[0].tolist() == [2, 4]
+
+
+def test_sync_appends_missing_chunks_and_skips_deleted(tmp_path):
+    # Init
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    embeddings = np.eye(3, dtype=np.float32)
+    store = EmbeddingStore(str(tmp_path / "store"), "float32", "model")
+
+    with Session(engine) as session:
+        document = Document(name="a.txt")
+        for line_number, embedding in enumerate(embeddings, start=1):
+            document.chunks.append(
+                DocumentChunk(
+                    line_number=line_number,
+                    content=f"line {line_number}",
+                    embedding=encode_embedding(embedding, "float32"),
+                )
+            )
+        session.add(document)
+        session.commit()
+
+        # Chunk 3 was never appended, chunk 9 was deleted
+        store.append(np.array([1, 2, 9]), np.ones((3, 3), dtype=np.float32))
+
+        # Test
+        ids, values, _, rows = sync_embedding_store(store, session)
+
+    # Assert
+    assert ids.tolist() == [1, 2, 3]
+    assert isinstance(values.base, np.memmap)
+    assert np.allclose(values[rows[2]], embeddings[2])
+    assert store.read()[0].tolist() == [1, 2, 9, 3]
+
+
+def test_sync_uses_the_embeddings_of_reused_ids(tmp_path):
+    # Init
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    store = EmbeddingStore(str(tmp_path / "store"), "float32", "model")
+
+    def upload(session, name, value):
+        document = Document(name=name)
+        for line_number in range(1, 4):
+            document.chunks.append(
+                DocumentChunk(
+                    line_number=line_number,
+                    content=f"line {line_number}",
+                    embedding=encode_embedding(np.full(3, value), "float32"),
+                )
+            )
+        session.add(document)
+        session.commit()
+        return [chunk.id for chunk in document.chunks]
+
+    with Session(engine) as session:
+        old_ids = upload(session, "a.txt", 1.0)
+        store.append(np.array(old_ids), np.ones((3, 3), dtype=np.float32))
+        session.exec(delete(DocumentChunk))
+        session.exec(delete(Document))
+        session.commit()
+        store.remove(np.array(old_ids))
+
+        # SQLite reuses the IDs, the ingest stopped before the last append
+        new_ids = upload(session, "b.txt", 2.0)
+        store.append(np.array(new_ids[:2]), np.full((2, 3), 2.0, dtype=np.float32))
+
+        # Test
+        ids, values, _, rows = sync_embedding_store(store, session)
+        removed_count = store.compact(ids)
+
+    # Assert
+    assert new_ids == old_ids
+    assert ids.tolist() == new_ids
+    assert np.allclose(values[rows], 2.0)
+    assert removed_count == 6
+    assert np.allclose(store.read()[1], 2.0)
@@ -0,0 +1,62 @@
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+from FastEmbed.core.extraction import extract_pdf_pages
+
+
+def make_pdf(page_texts):
+    """Build a minimal PDF with one line of text per page, None for no text."""
+    n_pages = len(page_texts)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids ["
+        + b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(n_pages))
+        + b"] /Count %d >>" % n_pages,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        content = (
+            b""
+            if text is None
+            else b"BT /F1 12 Tf 72 720 Td (%s) Tj ET" % (text.encode())
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i)
+        )
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+        )
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+    xref_offset = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    return pdf
+
+
+def test_extract_pdf_pages_streams_pages_in_order():
+    pdf = make_pdf(["First page", None, "Third page"])
+
+    pages = list(extract_pdf_pages(io.BytesIO(pdf)))
+
+    assert pages == [(1, "First page"), (2, ""), (3, "Third page")]
+
+
+def test_parallel_extraction_keeps_page_order():
+    page_texts = [f"Page {i}" for i in range(1, 21)]
+    pdf = make_pdf(page_texts)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        pages = list(extract_pdf_pages(io.BytesIO(pdf), executor, max_pending_tasks=2))
+
+    assert pages == list(enumerate(page_texts, start=1))
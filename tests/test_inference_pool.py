@@ -0,0 +1,45 @@
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from FastEmbed.core.embedding import engine_settings, get_embedding_engine
+from FastEmbed.core.inference_pool import EmbeddingPool
+
+
+def test_pool_matches_engine():
+    # Init
+    engine = get_embedding_engine()
+    pool = EmbeddingPool(n_workers=2, **{**engine_settings(), "batch_size": 2})
+    texts = ["a much longer text " * 20, "short", "medium length text " * 5, "tiny"]
+
+    try:
+        # Test
+        documents = pool.embed_documents(texts)
+        queries = pool.embed_queries(["what is short?"])
+    finally:
+        pool.close()
+
+    # Assert
+    assert np.allclose(documents, engine.embed_documents(texts), atol=1e-5)
+    assert np.allclose(queries, engine.embed_queries(["what is short?"]), atol=1e-5)
+    assert pool.padding_stats()["tokens"] > 0
+
+
+def test_crashed_worker_fails_pending_calls_and_restarts():
+    # Init
+    pool = EmbeddingPool(n_workers=1, **engine_settings())
+    pending = Future()
+    pool._pending[-1] = pending
+
+    try:
+        # Test
+        pool._workers[0].kill()
+        with pytest.raises(RuntimeError, match="exited with code"):
+            pending.result(timeout=10)
+        queries = pool.embed_queries(["still answering?"])
+    finally:
+        pool.close()
+
+    # Assert
+    assert queries.shape == (1, pool._dim)
@@ -0,0 +1,91 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from FastEmbed.core.jobs import JobQueue
+
+
+def test_job_reports_progress_and_result():
+    # Init
+    job_queue = JobQueue(n_workers=1)
+
+    def work(progress_callback):
+        progress_callback(3, 4)
+        return "done"
+
+    # Test
+    job = job_queue.submit("work", work)
+    job_queue.shutdown()
+
+    # Assert
+    assert job_queue.get(job.id) is job
+    assert job.status == "completed"
+    assert job.result == "done"
+    assert (job.completed, job.total) == (3, 4)
+
+
+def test_failed_job_keeps_error():
+    job_queue = JobQueue(n_workers=1)
+
+    def fail(progress_callback):
+        raise ValueError("bad file")
+
+    job = job_queue.submit("fail", fail)
+    job_queue.shutdown()
+
+    assert job.status == "failed"
+    assert job.error == "bad file"
+
+
+def test_submit_fails_when_queue_is_full():
+    # Init
+    job_queue = JobQueue(n_workers=1, max_queue_size=1)
+    started, release = threading.Event(), threading.Event()
+
+    def block(progress_callback):
+        started.set()
+        release.wait()
+
+    # Test
+    job_queue.submit("running", block)
+    started.wait()
+    job_queue.submit("queued", block)
+
+    # Assert
+    with pytest.raises(queue.Full):
+        job_queue.submit("rejected", block)
+
+    release.set()
+    job_queue.shutdown()
+
+
+def test_shutdown_does_not_wait_for_room_in_a_full_queue():
+    # Init
+    job_queue = JobQueue(n_workers=1, max_queue_size=1)
+    started, release = threading.Event(), threading.Event()
+
+    def block(progress_callback):
+        started.set()
+        release.wait()
+
+    job_queue.submit("running", block)
+    started.wait()
+    queued_job = job_queue.submit("queued", block)
+
+    # Test: the stop sentinel is queued behind the waiting job right away
+    shutdown = threading.Thread(target=job_queue.shutdown)
+    shutdown.start()
+    deadline = time.monotonic() + 5
+    while job_queue._queue.qsize() < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    queued_items = job_queue._queue.qsize()
+
+    release.set()
+    shutdown.join(timeout=5)
+
+    # Assert
+    assert queued_items == 2
+    assert not shutdown.is_alive()
+    assert queued_job.status == "completed"
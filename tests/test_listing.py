@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from FastEmbed.QAnswers.models.chat import Chat
+from FastEmbed.QAnswers.models.document import Document, DocumentChunk
+from FastEmbed.QAnswers.services import chat, document
+from FastEmbed.core.streaming import iter_json_array
+
+
+def fill_database(engine, n_documents):
+    with Session(engine) as session:
+        for index in range(n_documents):
+            chunk = DocumentChunk(
+                line_number=index + 1, content=f"line {index}", embedding=b""
+            )
+            session.add(Document(name=f"{index}.txt", chunks=[chunk]))
+            session.add(Chat(query=f"query {index}", source_document=chunk))
+        session.add(Chat(query="orphan"))
+        session.commit()
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_and_export(tmp_path, monkeypatch):
+    # Init
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    fill_database(engine, 5)
+    monkeypatch.setattr(chat, "get_database_engine", lambda: engine)
+    monkeypatch.setattr(document, "get_database_engine", lambda: engine)
+    chat_service = chat.ChatService()
+    document_service = document.DocumentService()
+
+    # Test
+    with Session(engine) as session:
+        first_page = await chat_service.get_all_chats(session, limit=2)
+        second_page = await chat_service.get_all_chats(
+            session, after_id=first_page[-1].id, limit=2
+        )
+        documents = await document_service.get_documents(session, after_id=3, limit=10)
+    exported_chats = json.loads(
+        "".join(iter_json_array(chat_service.iter_all_chats(batch_size=2)))
+    )
+    exported_documents = json.loads(
+        "".join(iter_json_array(document_service.iter_all_documents(batch_size=4)))
+    )
+
+    # Assert
+    assert [c.id for c in first_page + second_page] == [1, 2, 3, 4]
+    assert second_page[0].response == "line 2"
+    assert second_page[0].source_document_name == "2.txt"
+    assert [d.name for d in documents] == ["3.txt", "4.txt"]
+    assert [c["id"] for c in exported_chats] == [1, 2, 3, 4, 5, 6]
+    assert exported_chats[-1]["source_document_name"] == "none"
+    assert len(exported_documents) == 5
+    assert "".join(iter_json_array([])) == "[]"
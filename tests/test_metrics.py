@@ -0,0 +1,96 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from main import app
+from FastEmbed.core.metrics import (
+    NULL_TIMER,
+    Metrics,
+    ServerTimingMiddleware,
+    get_metrics,
+    request_timings,
+)
+
+
+def test_stage_histograms_and_request_timings():
+    metrics = Metrics()
+    timings = {}
+    token = request_timings.set(timings)
+    try:
+        metrics.observe_stage("inference", 0.003)
+        metrics.observe_stage("inference", 0.2)
+        with metrics.timer("tokenize"):
+            pass
+    finally:
+        request_timings.reset(token)
+    metrics.observe_batch_size(8)
+    metrics.increment("tokens_embedded_total", 42)
+
+    text = metrics.render()
+    assert (
+        'fastembed_stage_duration_seconds_bucket{stage="inference",le="0.005"} 1'
+        in text
+    )
+    assert (
+        'fastembed_stage_duration_seconds_bucket{stage="inference",le="+Inf"} 2' in text
+    )
+    assert 'fastembed_stage_duration_seconds_count{stage="tokenize"} 1' in text
+    assert 'fastembed_inference_batch_size_bucket{le="8"} 1' in text
+    assert "fastembed_texts_embedded_total 8" in text
+    assert "fastembed_tokens_embedded_total 42" in text
+    assert set(timings) == {"inference", "tokenize"}
+    assert abs(timings["inference"] - 0.203) < 1e-9
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    assert metrics.timer("inference") is NULL_TIMER
+
+    metrics.observe_stage("inference", 0.1)
+    metrics.increment("tokens_embedded_total", 3)
+    assert "stage=" not in metrics.render()
+    assert "fastembed_tokens_embedded_total 0" in metrics.render()
+
+
+def test_engine_reset_keeps_other_metrics():
+    metrics = Metrics()
+    metrics.observe_stage("inference", 0.1)
+    metrics.observe_stage("fetch_chunks", 0.1)
+    metrics.observe_batch_size(8)
+    metrics.increment("tokens_embedded_total", 3)
+    metrics.set_gauge("vector_index_chunks", 5)
+
+    metrics.reset_engine()
+
+    text = metrics.render()
+    assert 'stage="inference"' not in text
+    assert 'fastembed_stage_duration_seconds_count{stage="fetch_chunks"} 1' in text
+    assert "fastembed_inference_batch_size_count 0" in text
+    assert "fastembed_texts_embedded_total 0" in text
+    assert "fastembed_tokens_embedded_total 0" in text
+    assert "fastembed_vector_index_chunks 5" in text
+
+
+def test_server_timing_header_and_metrics_endpoint():
+    # Init
+    timed_app = FastAPI()
+    timed_app.add_middleware(ServerTimingMiddleware)
+
+    @timed_app.get("/")
+    def timed_endpoint():
+        with get_metrics().timer("test_stage"):
+            pass
+        return {}
+
+    # Test
+    response = TestClient(timed_app).get("/")
+    metrics_response = TestClient(app).get("/metrics")
+
+    # Assert
+    server_timing = response.headers["Server-Timing"]
+    assert server_timing.startswith("test_stage;dur=")
+    assert "total;dur=" in server_timing
+
+    assert metrics_response.status_code == 200
+    assert metrics_response.headers["content-type"].startswith("text/plain")
+    assert 'stage="test_stage"' in metrics_response.text
+    assert "fastembed_vector_index_chunks" in metrics_response.text
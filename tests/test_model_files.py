@@ -0,0 +1,42 @@
+import os
+
+from FastEmbed.config import Config
+from FastEmbed.core.model_files import (
+    fetch_model,
+    resolve_model_files,
+    verify_model_dir,
+)
+
+
+def test_fetched_model_loads_from_directory(tmp_path):
+    # Init
+    model_dir = str(tmp_path / "model")
+    manifest = fetch_model(Config.MODEL_ID, model_dir)
+
+    # Test
+    model_path, tokenizer_path = resolve_model_files(Config.MODEL_ID, model_dir)
+
+    # Assert
+    assert "onnx/model.onnx_data" in manifest["files"]
+    assert model_path == os.path.join(model_dir, "onnx", "model.onnx")
+    assert tokenizer_path == model_dir
+    assert verify_model_dir(model_dir, Config.MODEL_ID, full=True) == []
+
+
+def test_verify_detects_modified_files(tmp_path):
+    # Init
+    model_dir = str(tmp_path / "model")
+    fetch_model(Config.MODEL_ID, model_dir)
+    data_path = os.path.join(model_dir, "onnx", "model.onnx_data")
+
+    # Test: same size, new modification time
+    with open(data_path, "r+b") as file:
+        first_byte = file.read(1)
+        file.seek(0)
+        file.write(bytes([first_byte[0] ^ 1]))
+
+    # Assert
+    assert verify_model_dir(model_dir) == [
+        "onnx/model.onnx_data checksum does not match the manifest"
+    ]
+    assert verify_model_dir(model_dir, "another/model")[0].startswith("Directory")
@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+import onnx
+import onnxruntime as ort
+from onnx import TensorProto, helper, numpy_helper
+
+from FastEmbed.core.model_quantization import compare_embeddings, quantize_model
+
+
+def make_model(path, weights):
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["x", "weights"], ["y"])],
+        "test",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [None, 16])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [None, 16])],
+        initializer=[numpy_helper.from_array(weights, "weights")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+def test_quantized_model_agrees_with_original(tmp_path):
+    # Init
+    rng = np.random.default_rng(0)
+    weights = rng.standard_normal((16, 16)).astype(np.float32)
+    model_path = str(tmp_path / "model.onnx")
+    make_model(model_path, weights)
+    x = rng.standard_normal((32, 16)).astype(np.float32)
+
+    # Test
+    quantized_path = quantize_model(model_path)
+    session = ort.InferenceSession(quantized_path, providers=["CPUExecutionProvider"])
+    agreement = compare_embeddings(x @ weights, session.run(None, {"x": x})[0])
+
+    # Assert
+    assert quantized_path == str(tmp_path / "model_int8.onnx")
+    assert os.path.getsize(quantized_path) < os.path.getsize(model_path)
+    assert quantize_model(model_path) == quantized_path
+    assert agreement["cosine_min"] > 0.99
@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import onnx
+import onnxruntime as ort
+from onnx import TensorProto, helper, numpy_helper
+
+from FastEmbed.core.model_files import MODEL_FILENAMES, write_manifest
+from FastEmbed.core.onnx_session import (
+    create_inference_session,
+    create_session_options,
+    optimized_model_key,
+)
+
+
+def make_model(path, one_value=1.0, external_data=False):
+    """Build a model computing (x + 1) * 2 with a foldable constant."""
+    one = numpy_helper.from_array(np.array([one_value], dtype=np.float32), "one")
+    two = numpy_helper.from_array(np.array([2.0], dtype=np.float32), "two")
+    graph = helper.make_graph(
+        [
+            helper.make_node("Add", ["x", "one"], ["y"]),
+            helper.make_node("Mul", ["y", "two"], ["z"]),
+        ],
+        "test",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [None])],
+        [helper.make_tensor_value_info("z", TensorProto.FLOAT, [None])],
+        initializer=[one, two],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    onnx.save(
+        model,
+        path,
+        save_as_external_data=external_data,
+        location="model.onnx_data",
+        size_threshold=0,
+    )
+
+
+def test_optimized_model_is_cached(tmp_path):
+    # Init
+    model_path = str(tmp_path / "model.onnx")
+    cache_dir = str(tmp_path / "cache")
+    make_model(model_path)
+    providers = ["CPUExecutionProvider"]
+    x = np.array([1.0, 2.0], dtype=np.float32)
+
+    # Test
+    first_session = create_inference_session(
+        model_path, providers, create_session_options(), cache_dir
+    )
+    cached_entries = os.listdir(cache_dir)
+    second_session = create_inference_session(
+        model_path,
+        providers,
+        create_session_options(intra_op_num_threads=1),
+        cache_dir,
+    )
+
+    # Assert
+    assert len(cached_entries) == 1
+    assert os.listdir(cache_dir) == cached_entries
+    assert np.allclose(first_session.run(None, {"x": x})[0], [4.0, 6.0])
+    assert np.allclose(second_session.run(None, {"x": x})[0], [4.0, 6.0])
+
+
+def test_optimized_model_depends_on_external_data(tmp_path):
+    # Init
+    model_path = str(tmp_path / "model.onnx")
+    cache_dir = str(tmp_path / "cache")
+    providers = ["CPUExecutionProvider"]
+    session_options = create_session_options()
+    x = np.array([1.0, 2.0], dtype=np.float32)
+
+    # Test
+    make_model(model_path, external_data=True)
+    first_session = create_inference_session(
+        model_path, providers, session_options, cache_dir
+    )
+    with open(model_path, "rb") as model_file:
+        model_bytes = model_file.read()
+
+    # Only the weights change, saving appends to an existing data file
+    os.remove(str(tmp_path / "model.onnx_data"))
+    make_model(model_path, one_value=2.0, external_data=True)
+    with open(model_path, "rb") as model_file:
+        assert model_file.read() == model_bytes
+    second_session = create_inference_session(
+        model_path, providers, session_options, cache_dir
+    )
+
+    # Assert
+    assert len(os.listdir(cache_dir)) == 2
+    assert np.allclose(first_session.run(None, {"x": x})[0], [4.0, 6.0])
+    assert np.allclose(second_session.run(None, {"x": x})[0], [6.0, 8.0])
+    assert session_options.optimized_model_filepath == ""
+    assert (
+        session_options.graph_optimization_level
+        == ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+
+
+def test_optimized_model_key_does_not_hash_model_files(tmp_path):
+    # Init
+    model_dir = str(tmp_path / "model")
+    os.makedirs(os.path.join(model_dir, "onnx"))
+    model_path = os.path.join(model_dir, "onnx", "model.onnx")
+    data_path = os.path.join(model_dir, "onnx", "model.onnx_data")
+    make_model(model_path, external_data=True)
+    session_options = create_session_options()
+    providers = ["CPUExecutionProvider"]
+    stat_key = optimized_model_key(model_path, session_options, providers)
+    write_manifest(model_dir, "model", MODEL_FILENAMES)
+
+    def key():
+        return optimized_model_key(model_path, session_options, providers)
+
+    # Test: files of a manifest are identified by their recorded checksum
+    manifest_key = key()
+    os.utime(data_path, ns=(0, 0))
+    touched_manifest_key = key()
+    os.remove(os.path.join(model_dir, "manifest.json"))
+    touched_stat_key = key()
+
+    # Assert
+    assert manifest_key != stat_key
+    assert touched_manifest_key == manifest_key
+    assert touched_stat_key not in (stat_key, manifest_key)
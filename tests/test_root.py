@@ -1,7 +1,15 @@
+import threading
+import time
+from types import SimpleNamespace
+
 from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, create_engine
 
+import main
 from main import app
 from FastEmbed.config import Config
+from FastEmbed.core import database
+from FastEmbed.core.readiness import get_readiness
 
 client = TestClient(app)
 
@@ -10,3 +18,69 @@ def test_get_root():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Server is running"}
+
+
+def test_get_readiness(tmp_path, monkeypatch):
+    # Load an empty database and a stand-in for the embedding model
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(database, "get_database_engine", lambda: engine)
+    monkeypatch.setattr(main, "init_embedding_engine", lambda: SimpleNamespace(dim=8))
+
+    # Before startup the model and index are not loaded
+    get_readiness().reset()
+    response = client.get("/api/v1/readiness")
+    assert response.status_code == 503
+    assert response.json()["status"] == "loading"
+
+    # The lifespan loads them
+    with TestClient(app) as started_client:
+        response = started_client.get("/api/v1/readiness")
+    engine.dispose()
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "ready",
+        "model": True,
+        "index": True,
+        "error": None,
+    }
+
+
+def test_routes_wait_for_background_loading(tmp_path, monkeypatch):
+    # Init: the model loads until released
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(database, "get_database_engine", lambda: engine)
+    monkeypatch.setattr(Config, "BACKGROUND_LOADING", True)
+    model_released = threading.Event()
+
+    def init_embedding_engine():
+        model_released.wait(timeout=10)
+        return SimpleNamespace(dim=8)
+
+    monkeypatch.setattr(main, "init_embedding_engine", init_embedding_engine)
+
+    # Test
+    with TestClient(app) as started_client:
+        ask_response = started_client.post("/api/v1/chat/ask", json={"query": "Mars"})
+        upload_response = started_client.post(
+            "/api/v1/documents/upload",
+            files={"file": ("mars.txt", b"Mars is red")},
+        )
+        healthcheck_response = started_client.get("/api/v1/healthcheck")
+
+        model_released.set()
+        while get_readiness().status()["status"] == "loading":
+            time.sleep(0.01)
+        readiness_response = started_client.get("/api/v1/readiness")
+    engine.dispose()
+
+    # Assert
+    assert ask_response.status_code == 503
+    assert ask_response.json() == {
+        "detail": "The model and the vector index are loading"
+    }
+    assert upload_response.status_code == 503
+    assert healthcheck_response.status_code == 200
+    assert readiness_response.status_code == 200
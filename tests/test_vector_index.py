@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from FastEmbed.QAnswers.models.document import Document, DocumentChunk
+from FastEmbed.core.embedding_store import EmbeddingStore
+from FastEmbed.core.precision import encode_embedding, quantize_embeddings
+from FastEmbed.core.vector_index import VectorIndex, select_top_k
+
+
+def test_select_top_k():
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+
+    assert select_top_k(scores, 2).tolist() == [1, 3]
+    assert select_top_k(scores, 10).tolist() == [1, 3, 2, 0]
+
+
+def test_search_returns_chunk_ids():
+    index = VectorIndex()
+    index.load([10, 20, 30], np.eye(3, dtype=np.float32))
+
+    scores, ids = index.search(np.array([[0.0, 1.0, 0.2]], dtype=np.float32), k=2)
+
+    assert ids.tolist() == [20, 30]
+    assert np.allclose(scores, [1.0, 0.2])
+
+
+def test_add_and_remove():
+    index = VectorIndex()
+    index.add([1, 2], np.eye(2, dtype=np.float32))
+    index.add([3], np.array([[1.0, 1.0]], dtype=np.float32))
+    index.remove([1])
+
+    assert len(index) == 2
+    assert index.ids.tolist() == [2, 3]
+
+    index.clear()
+    assert len(index) == 0
+    assert index.search(np.ones(2, dtype=np.float32))[1].size == 0
+
+
+def test_mapped_embeddings_are_not_copied_by_add_and_remove(tmp_path):
+    # Init
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((30, 8)).astype(np.float32)
+    store = EmbeddingStore(str(tmp_path / "store"), "int8", "model")
+    store.append(np.arange(1, 21), *quantize_embeddings(embeddings[:20], "int8"))
+    ids, values, scales = store.read()
+    index = VectorIndex(precision="int8")
+    index.load_quantized(ids[1:], values, scales, embedding_rows=np.arange(1, 20))
+    exact_index = VectorIndex(precision="int8")
+    exact_index.load(np.arange(2, 31), embeddings[1:])
+
+    # Test
+    index.add(np.arange(21, 31), embeddings[20:], document_ids=[3] * 10)
+    index.remove([5, 25])
+    exact_index.remove([5, 25])
+
+    # Assert
+    assert isinstance(index.embeddings.base, np.memmap)
+    assert len(index) == 27
+    assert index.ids.tolist() == exact_index.ids.tolist()
+    for query in embeddings[[0, 4, 24, 27]]:
+        scores, top_ids = index.search(query, k=5)
+        exact_scores, exact_ids = exact_index.search(query, k=5)
+        ((batch_scores, batch_ids),) = index.search_batch(query[None], k=5)
+        assert top_ids.tolist() == exact_ids.tolist() == batch_ids.tolist()
+        assert np.allclose(scores, exact_scores)
+        assert np.allclose(batch_scores, exact_scores)
+    assert index.search(embeddings[27], k=1, document_ids=[3])[1].tolist() == [28]
+
+
+def test_two_stage_search_matches_exact_search():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(200, 64)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids = np.arange(200) + 1
+    query = embeddings[42] + 0.1 * rng.normal(size=64).astype(np.float32)
+
+    exact_index = VectorIndex()
+    exact_index.load(ids, embeddings)
+    two_stage_index = VectorIndex(truncate_dim=16, candidate_multiplier=10)
+    two_stage_index.load(ids, embeddings)
+
+    exact_scores, exact_ids = exact_index.search(query, k=3)
+    scores, top_ids = two_stage_index.search(query, k=3)
+
+    assert two_stage_index.embeddings.shape == (200, 64)
+    assert top_ids[0] == 43
+    assert top_ids.tolist() == exact_ids.tolist()
+    assert np.allclose(scores, exact_scores)
+
+
+def test_search_batch_matches_search():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((50, 8)).astype(np.float32)
+    queries = rng.standard_normal((4, 8)).astype(np.float32)
+    for precision in ("float32", "int8"):
+        index = VectorIndex(precision=precision)
+        index.load(np.arange(100, 150), embeddings)
+
+        results = index.search_batch(queries, k=3)
+
+        assert len(results) == 4
+        for query, (scores, ids) in zip(queries, results):
+            expected_scores, expected_ids = index.search(query, k=3)
+            assert ids.tolist() == expected_ids.tolist()
+            assert np.allclose(scores, expected_scores, atol=1e-5)
+
+
+def test_document_scoped_search():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((30, 8)).astype(np.float32)
+    query = embeddings[4]
+    index = VectorIndex()
+    index.load(np.arange(1, 21), embeddings[:20], document_ids=[1, 2] * 10)
+    index.add(np.arange(21, 31), embeddings[20:], document_ids=[3] * 10)
+
+    _, ids = index.search(query, k=3, document_ids=[2, 3])
+    _, all_ids = index.search(query, k=30)
+    ((_, batch_ids),) = index.search_batch(query[None], k=3, document_ids=[2, 3])
+
+    assert 5 not in ids.tolist()
+    assert ids.tolist() == [i for i in all_ids.tolist() if i % 2 == 0 or i > 20][:3]
+    assert batch_ids.tolist() == ids.tolist()
+    assert index.search(query, document_ids=[9])[1].size == 0
+
+
+def test_load_rejects_embeddings_of_another_precision(tmp_path):
+    # Init
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    index = VectorIndex(precision="int8")
+
+    with Session(engine) as session:
+        document = Document(name="a.txt")
+        document.chunks.append(
+            DocumentChunk(
+                line_number=1,
+                content="line",
+                embedding=encode_embedding(np.ones(8), "float32"),
+            )
+        )
+        session.add(document)
+        session.commit()
+
+        # Test
+        with pytest.raises(ValueError, match="--source-precision float32"):
+            index.load_from_database(session, dim=8)